@@ -0,0 +1,94 @@
+"""
+Tiempo de arranque en frío de la API.
+
+Cada medición corre en un proceso nuevo que importa `main` y ejecuta su lifespan, y
+reporta:
+
+- cuánto cuesta importar `main` y, por separado, NumPy (que `analytics_service`
+  importa recién con la primera analítica, no al arrancar);
+- cuánto tarda en responder la primera petición (`/health/live`);
+- cuánto tarda `/health/ready` en responder 200, es decir, el calentamiento.
+
+Los tiempos se miden desde el inicio del proceso hijo, antes de cualquier importación
+de la aplicación. Este módulo solo importa la biblioteca estándar para no sumar nada
+a la medición. Necesita los mismos servicios que `benchmarks.run`.
+
+Uso:
+    python -m benchmarks.arranque --repeticiones 5
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+_inicio = time.perf_counter()
+
+# Se espera a que /health/ready responda 200 como mucho este tiempo
+ESPERA_MAXIMA_SEGUNDOS = 120
+
+
+async def _medir_proceso() -> dict:
+    """
+    Se ejecuta en el proceso hijo (`--hijo`).
+    """
+    import httpx
+    from main import app
+    importacion_segundos = time.perf_counter() - _inicio
+
+    # Lo que pagará la primera petición de analítica
+    inicio_numpy = time.perf_counter()
+    import numpy  # noqa: F401
+    numpy_segundos = time.perf_counter() - inicio_numpy
+
+    transporte = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transporte, base_url="http://bench") as cliente:
+            (await cliente.get("/health/live")).raise_for_status()
+            primera_peticion_segundos = time.perf_counter() - _inicio
+
+            while (await cliente.get("/health/ready")).status_code != 200:
+                if time.perf_counter() - _inicio > ESPERA_MAXIMA_SEGUNDOS:
+                    raise TimeoutError("La aplicación no quedó lista")
+                await asyncio.sleep(0.01)
+            listo_segundos = time.perf_counter() - _inicio
+
+    return {
+        "importar_numpy": numpy_segundos,
+        "importar_main": importacion_segundos,
+        "primera_peticion": primera_peticion_segundos,
+        "listo": listo_segundos,
+    }
+
+
+def _medir_en_proceso_nuevo() -> dict:
+    salida = subprocess.run(
+        [sys.executable, "-m", "benchmarks.arranque", "--hijo"],
+        capture_output=True, text=True, check=True
+    ).stdout
+    # La última línea es el resultado; lo anterior son logs de la aplicación
+    return json.loads(salida.strip().splitlines()[-1])
+
+
+def _main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Tiempo de arranque en frío de la API")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--hijo", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.hijo:
+        print(json.dumps(asyncio.run(_medir_proceso())))
+        return 0
+
+    mediciones = [_medir_en_proceso_nuevo() for _ in range(args.repeticiones)]
+    for etapa in mediciones[0]:
+        valores = [medicion[etapa] for medicion in mediciones]
+        print(f"  {etapa:<20} mediana {statistics.median(valores) * 1000:8.1f} ms  "
+              f"mín {min(valores) * 1000:8.1f} ms  máx {max(valores) * 1000:8.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(_main())
@@ -0,0 +1,280 @@
+"""
+Generador de datos sintéticos para los benchmarks.
+
+Crea `usuarios` usuarios de prueba (en PostgreSQL y MongoDB) con sus categorías, metas,
+gastos e ingresos, y reconstruye los acumulados. Los datos son deterministas para una
+misma semilla. Todos los usuarios de prueba tienen un id que empieza con `bench-`, así
+que `limpiar` los borra sin tocar a los demás.
+
+Conviene apuntar `MONGO_DB_NAME` y `DATABASE_URL` a bases de datos de prueba: la
+reconstrucción de acumulados recorre las colecciones completas.
+
+Uso:
+    python -m benchmarks.datos --usuarios 100 --gastos 1000000 --ingresos 200000
+    python -m benchmarks.datos --limpiar
+"""
+import argparse
+import asyncio
+import random
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Iterator, List, Optional
+from bson import ObjectId
+from sqlalchemy import delete, select
+from src.db.mongodb.config import mongo_connection
+from src.db.mongodb.indexes import sincronizar_indices
+from src.db.postgresql.config import AsyncSessionLocal, async_engine
+from src.db.postgresql.schema import crear_esquema
+from src.models import user_models
+from src.services.encrypt_service import hash_password
+from src.services.rollup_service import reconstruir_gastos_diarios, reconstruir_resumenes_mensuales
+from src.services.transacciones_service import COLECCIONES_ARCHIVO, COLECCIONES_BUCKETS, insertar_en_lote, origen
+
+PREFIJO = "bench-"
+CONTRASENA = "bench-contrasena"
+TAMANO_LOTE = 10_000
+NOMBRE_PAIS = "Benchmark"
+
+
+@dataclass
+class Parametros:
+    usuarios: int = 10
+    categorias: int = 8
+    metas: int = 3
+    gastos: int = 10_000
+    ingresos: int = 2_000
+    dias: int = 365
+    semilla: int = 42
+
+
+@dataclass
+class UsuarioPrueba:
+    id: str
+    correo: str
+    categorias: List[str] = field(default_factory=list)
+    metas: List[str] = field(default_factory=list)
+
+
+def _id_usuario(indice: int) -> str:
+    return f"{PREFIJO}{indice:08d}"
+
+
+async def limpiar():
+    """
+    Borra todos los datos de los usuarios de prueba.
+    """
+    db = mongo_connection.database
+    filtro = {"usuario_id": {"$regex": f"^{PREFIJO}"}}
+    for nombre in ("gastos", "ingresos", *COLECCIONES_BUCKETS.values(), *COLECCIONES_ARCHIVO.values(), "categorias_gasto", "metas_ahorro",
+                   "usuarios_financieros", "gastos_diarios", "resumenes_mensual"):
+        await db[nombre].delete_many(filtro)
+
+    async with AsyncSessionLocal() as sesion:
+        await sesion.execute(delete(user_models.Usuario).where(user_models.Usuario.id.startswith(PREFIJO)))
+        await sesion.commit()
+
+
+async def _asegurar_geo(sesion) -> tuple:
+    pais = (await sesion.execute(select(user_models.Pais).where(user_models.Pais.nombre == NOMBRE_PAIS))).scalars().first()
+    if pais is None:
+        pais = user_models.Pais(nombre=NOMBRE_PAIS)
+        sesion.add(pais)
+        await sesion.flush()
+    estado = (await sesion.execute(select(user_models.Estado).where(user_models.Estado.pais_id == pais.id))).scalars().first()
+    if estado is None:
+        estado = user_models.Estado(nombre=NOMBRE_PAIS, pais_id=pais.id)
+        sesion.add(estado)
+        await sesion.flush()
+    return pais.id, estado.id
+
+
+async def _crear_usuarios(parametros: Parametros) -> List[UsuarioPrueba]:
+    await crear_esquema()
+
+    contrasena = hash_password(CONTRASENA)
+    usuarios = [UsuarioPrueba(id=_id_usuario(i), correo=f"{_id_usuario(i)}@bench.local") for i in range(parametros.usuarios)]
+
+    async with AsyncSessionLocal() as sesion:
+        pais_id, estado_id = await _asegurar_geo(sesion)
+        sesion.add_all([
+            user_models.Usuario(
+                id=usuario.id,
+                correo=usuario.correo,
+                contrasena=contrasena,
+                fecha_registro=date.today(),
+                nombre="Bench",
+                apellido_paterno="Usuario",
+                pais_id=pais_id,
+                estado_id=estado_id,
+            )
+            for usuario in usuarios
+        ])
+        await sesion.commit()
+
+    await mongo_connection.database["usuarios_financieros"].insert_many([
+        {
+            "usuario_id": usuario.id,
+            "salario": 30_000.0,
+            "divisa": "MXN",
+            "balance_objetivo": 10_000.0,
+            "gasto_limite": 20_000.0,
+        }
+        for usuario in usuarios
+    ])
+    return usuarios
+
+
+async def _crear_categorias_y_metas(parametros: Parametros, usuarios: List[UsuarioPrueba], aleatorio: random.Random):
+    db = mongo_connection.database
+    ahora = datetime.now()
+    categorias, metas = [], []
+    for usuario in usuarios:
+        for i in range(parametros.categorias):
+            documento = {
+                "_id": ObjectId(),
+                "usuario_id": usuario.id,
+                "nombre": f"Categoría {i}",
+                "limite_gasto": float(aleatorio.randrange(1_000, 10_000, 500)),
+                "gasto_total": 0.0,
+                "deleted": 0,
+            }
+            usuario.categorias.append(str(documento["_id"]))
+            categorias.append(documento)
+        for i in range(parametros.metas):
+            documento = {
+                "_id": ObjectId(),
+                "usuario_id": usuario.id,
+                "nombre": f"Meta {i}",
+                "monto_objetivo": float(aleatorio.randrange(10_000, 100_000, 1_000)),
+                "monto_actual": 0.0,
+                "fecha_inicio": ahora - timedelta(days=parametros.dias),
+                "fecha_objetivo": ahora + timedelta(days=aleatorio.randint(30, 720)),
+            }
+            usuario.metas.append(str(documento["_id"]))
+            metas.append(documento)
+
+    if categorias:
+        await db["categorias_gasto"].insert_many(categorias)
+    if metas:
+        await db["metas_ahorro"].insert_many(metas)
+
+
+def _transacciones(cantidad: int, usuarios: List[UsuarioPrueba], dias: int, aleatorio: random.Random, campo: str) -> Iterator[list]:
+    """
+    Genera `cantidad` gastos (`campo="categoria_id"`) o abonos (`campo="meta_id"`)
+    repartidos entre los usuarios, en lotes de `TAMANO_LOTE`.
+    """
+    ahora = datetime.now()
+    segundos = dias * 86_400
+    lote = []
+    for _ in range(cantidad):
+        usuario = aleatorio.choice(usuarios)
+        opciones = usuario.categorias if campo == "categoria_id" else usuario.metas
+        if not opciones:
+            continue
+        lote.append({
+            "usuario_id": usuario.id,
+            campo: aleatorio.choice(opciones),
+            "monto": round(aleatorio.uniform(10, 2_000), 2),
+            "fecha": ahora - timedelta(seconds=aleatorio.randrange(segundos)),
+            "descripcion": "Gasto de prueba" if campo == "categoria_id" else "Abono de prueba",
+        })
+        if len(lote) == TAMANO_LOTE:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+async def _actualizar_totales(usuarios: List[UsuarioPrueba], layout: Optional[str]):
+    """
+    Deja `gasto_total` y `monto_actual` consistentes con los gastos e ingresos generados.
+    """
+    db = mongo_connection.database
+    filtro = {"$match": {"usuario_id": {"$in": [usuario.id for usuario in usuarios]}}}
+
+    coleccion, etapas = origen("gastos", layout=layout)
+    pipeline = [filtro] + etapas + [{"$group": {"_id": "$categoria_id", "total": {"$sum": "$monto"}}}]
+    async for total in db[coleccion].aggregate(pipeline, allowDiskUse=True):
+        await db["categorias_gasto"].update_one({"_id": ObjectId(total["_id"])}, {"$set": {"gasto_total": total["total"]}})
+
+    coleccion, etapas = origen("ingresos", layout=layout)
+    pipeline = [filtro] + etapas + [{"$group": {"_id": "$meta_id", "total": {"$sum": "$monto"}}}]
+    async for total in db[coleccion].aggregate(pipeline, allowDiskUse=True):
+        await db["metas_ahorro"].update_one({"_id": ObjectId(total["_id"])}, {"$set": {"monto_actual": total["total"]}})
+
+
+async def generar(parametros: Parametros, layout: Optional[str] = None) -> List[UsuarioPrueba]:
+    """
+    Reemplaza los datos de prueba por un conjunto nuevo generado con `parametros`.
+    Las transacciones se guardan con `layout` (por defecto, `TRANSACCIONES_LAYOUT`).
+    Requiere que `mongo_connection` ya esté conectado.
+    """
+    aleatorio = random.Random(parametros.semilla)
+    db = mongo_connection.database
+
+    await sincronizar_indices(db)
+    await limpiar()
+
+    usuarios = await _crear_usuarios(parametros)
+    await _crear_categorias_y_metas(parametros, usuarios, aleatorio)
+
+    for lote in _transacciones(parametros.gastos, usuarios, parametros.dias, aleatorio, "categoria_id"):
+        await insertar_en_lote("gastos", lote, layout=layout)
+    for lote in _transacciones(parametros.ingresos, usuarios, parametros.dias, aleatorio, "meta_id"):
+        await insertar_en_lote("ingresos", lote, layout=layout)
+
+    await _actualizar_totales(usuarios, layout)
+    await reconstruir_gastos_diarios()
+    await reconstruir_resumenes_mensuales()
+    return usuarios
+
+
+def agregar_argumentos(parser: argparse.ArgumentParser):
+    defecto = Parametros()
+    parser.add_argument("--usuarios", type=int, default=defecto.usuarios)
+    parser.add_argument("--categorias", type=int, default=defecto.categorias, help="Categorías por usuario")
+    parser.add_argument("--metas", type=int, default=defecto.metas, help="Metas por usuario")
+    parser.add_argument("--gastos", type=int, default=defecto.gastos, help="Gastos en total")
+    parser.add_argument("--ingresos", type=int, default=defecto.ingresos, help="Ingresos en total")
+    parser.add_argument("--dias", type=int, default=defecto.dias, help="Antigüedad máxima de las transacciones")
+    parser.add_argument("--semilla", type=int, default=defecto.semilla)
+
+
+def parametros_de(args: argparse.Namespace) -> Parametros:
+    return Parametros(
+        usuarios=args.usuarios,
+        categorias=args.categorias,
+        metas=args.metas,
+        gastos=args.gastos,
+        ingresos=args.ingresos,
+        dias=args.dias,
+        semilla=args.semilla,
+    )
+
+
+async def _main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Genera datos sintéticos para los benchmarks")
+    agregar_argumentos(parser)
+    parser.add_argument("--limpiar", action="store_true", help="Solo borra los datos de prueba")
+    args = parser.parse_args(argv)
+
+    await mongo_connection.connect()
+    try:
+        if args.limpiar:
+            await limpiar()
+            print("Datos de prueba eliminados")
+            return 0
+
+        inicio = time.perf_counter()
+        usuarios = await generar(parametros_de(args))
+        print(f"{len(usuarios)} usuarios, {args.gastos} gastos y {args.ingresos} ingresos en {time.perf_counter() - inicio:.1f}s")
+        return 0
+    finally:
+        await mongo_connection.close()
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    raise SystemExit(asyncio.run(_main()))
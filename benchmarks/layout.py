@@ -0,0 +1,132 @@
+"""
+Compara el layout plano de `gastos`/`ingresos` con el layout por buckets.
+
+Genera los datos sintéticos con el layout plano, los copia al layout por buckets con
+`transacciones_service.migrar` y reporta, para cada layout, el tamaño de las
+colecciones y sus índices (`collStats`) y la latencia de lectura de las consultas de
+los controladores: primera página, página siguiente, página filtrada por categoría y
+abonos de una meta. Usar una base de datos de prueba: `collStats` mide la colección
+completa.
+
+Uso:
+    python -m benchmarks.layout --usuarios 100 --gastos 1000000 --ingresos 200000 --lecturas 200
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from datetime import datetime
+from pathlib import Path
+from benchmarks.datos import agregar_argumentos, generar, parametros_de
+from benchmarks.run import DIRECTORIO_RESULTADOS, percentil
+from src.db.mongodb.config import mongo_connection
+from src.db.postgresql.config import async_engine
+from src.services.transacciones_service import (
+    COLECCIONES_BUCKETS,
+    GASTOS,
+    INGRESOS,
+    LAYOUT_BUCKETS,
+    LAYOUT_PLANO,
+    listar_abonos,
+    listar_pagina,
+    migrar,
+)
+
+CAMPOS_COLLSTATS = ("count", "size", "avgObjSize", "storageSize", "totalIndexSize")
+
+
+async def tamanos(layout: str) -> dict:
+    db = mongo_connection.database
+    resultado = {}
+    for tipo in (GASTOS, INGRESOS):
+        nombre = tipo if layout == LAYOUT_PLANO else COLECCIONES_BUCKETS[tipo]
+        estadisticas = await db.command("collStats", nombre)
+        resultado[nombre] = {campo: estadisticas.get(campo, 0) for campo in CAMPOS_COLLSTATS}
+    return resultado
+
+
+async def _medir(consulta) -> tuple:
+    inicio = time.perf_counter()
+    resultado = await consulta
+    return time.perf_counter() - inicio, resultado
+
+
+async def latencias(layout: str, usuarios: list, lecturas: int, semilla: int) -> dict:
+    aleatorio = random.Random(semilla)
+    tiempos = {"primera_pagina": [], "pagina_siguiente": [], "por_categoria": [], "abonos_meta": []}
+
+    for _ in range(lecturas):
+        usuario = aleatorio.choice(usuarios)
+
+        segundos, (_, siguiente) = await _medir(listar_pagina(GASTOS, usuario.id, 50, layout=layout))
+        tiempos["primera_pagina"].append(segundos)
+
+        if siguiente:
+            segundos, _ = await _medir(listar_pagina(GASTOS, usuario.id, 50, siguiente, layout=layout))
+            tiempos["pagina_siguiente"].append(segundos)
+        if usuario.categorias:
+            categoria_id = aleatorio.choice(usuario.categorias)
+            segundos, _ = await _medir(listar_pagina(GASTOS, usuario.id, 50, referencia=categoria_id, layout=layout))
+            tiempos["por_categoria"].append(segundos)
+        if usuario.metas:
+            segundos, _ = await _medir(listar_abonos(aleatorio.choice(usuario.metas), 20, layout=layout))
+            tiempos["abonos_meta"].append(segundos)
+
+    resultado = {}
+    for consulta, valores in tiempos.items():
+        valores.sort()
+        resultado[consulta] = {
+            "lecturas": len(valores),
+            "p50_ms": percentil(valores, 50) * 1000,
+            "p95_ms": percentil(valores, 95) * 1000,
+            "p99_ms": percentil(valores, 99) * 1000,
+        }
+    return resultado
+
+
+async def _main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compara los layouts plano y por buckets")
+    agregar_argumentos(parser)
+    parser.add_argument("--lecturas", type=int, default=200, help="Lecturas medidas por consulta y layout")
+    parser.add_argument("--salida", type=Path, default=None, help="Archivo JSON de resultados")
+    args = parser.parse_args(argv)
+    parametros = parametros_de(args)
+
+    await mongo_connection.connect()
+    try:
+        usuarios = await generar(parametros, layout=LAYOUT_PLANO)
+        await migrar(LAYOUT_BUCKETS)
+
+        resultado = {"fecha": datetime.now().isoformat(timespec="seconds"), "parametros": dict(vars(args)), "layouts": {}}
+        resultado["parametros"].pop("salida", None)
+        for layout in (LAYOUT_PLANO, LAYOUT_BUCKETS):
+            # Una pasada previa para que ambos layouts se midan con la caché de mongod caliente
+            await latencias(layout, usuarios, min(args.lecturas, 20), args.semilla)
+            resultado["layouts"][layout] = {
+                "tamanos": await tamanos(layout),
+                "latencias": await latencias(layout, usuarios, args.lecturas, args.semilla),
+            }
+
+        for layout, datos in resultado["layouts"].items():
+            print(f"Layout {layout}")
+            for nombre, estadisticas in datos["tamanos"].items():
+                print(f"  {nombre:<18} {estadisticas['count']:>10} docs  datos {estadisticas['size'] / 2**20:9.1f} MiB  "
+                      f"almacenamiento {estadisticas['storageSize'] / 2**20:9.1f} MiB  "
+                      f"índices {estadisticas['totalIndexSize'] / 2**20:9.1f} MiB")
+            for consulta, medicion in datos["latencias"].items():
+                print(f"  {consulta:<18} p50 {medicion['p50_ms']:8.2f} ms  p95 {medicion['p95_ms']:8.2f} ms  "
+                      f"p99 {medicion['p99_ms']:8.2f} ms")
+
+        salida = args.salida or DIRECTORIO_RESULTADOS / f"layout-{datetime.now():%Y%m%d-%H%M%S}.json"
+        salida.parent.mkdir(parents=True, exist_ok=True)
+        salida.write_text(json.dumps(resultado, indent=2, ensure_ascii=False, default=str), encoding="utf-8")
+        print(f"Resultados guardados en {salida}")
+        return 0
+    finally:
+        await mongo_connection.close()
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    raise SystemExit(asyncio.run(_main()))
@@ -0,0 +1,729 @@
+"""
+Benchmark en proceso de la API.
+
+Genera datos sintéticos a varias escalas con `benchmarks.datos` y, para cada escala,
+ejecuta la aplicación real de `main.py` (con su lifespan) a través de un cliente ASGI
+en proceso. Por cada endpoint reporta p50, p95 y p99 de latencia y peticiones por
+segundo, y guarda los resultados en JSON para compararlos entre corridas.
+
+Los escenarios (`--escenarios`) comparan un camino concreto antes y después de una
+optimización, con sus propios datos; se ejecutan después de las escalas.
+
+Necesita un mongod y un PostgreSQL locales (ver `benchmarks.datos`) y las
+dependencias de `benchmarks/requirements.txt`.
+
+Uso:
+    python -m benchmarks.run --escalas 10000,100000,1000000 --usuarios 100
+    python -m benchmarks.run --escalas 100000 --comparar benchmarks/resultados/base.json
+    python -m benchmarks.run --escalas "" --escenarios categorias
+"""
+import argparse
+import asyncio
+import functools
+import itertools
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass, replace
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional
+import httpx
+from bson import ObjectId
+from sqlalchemy import delete, select
+from fastapi import Depends, FastAPI, Request
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import Response
+from benchmarks.datos import (
+    CONTRASENA, PREFIJO, Parametros, UsuarioPrueba, _asegurar_geo, agregar_argumentos, generar, parametros_de
+)
+from src.controllers import auth_controller, financial_controller
+from src.db.mongodb.config import mongo_connection
+from src.db.postgresql.config import AsyncSessionLocal, async_engine
+from src.db.postgresql.schema import crear_esquema
+from src.middlewares import auth_middleware
+from src.middlewares.metrics_middleware import MetricsMiddleware
+from src.middlewares.middleware_cors import CustomCORSMiddleware
+from src.models import user_models
+from src.schemas.auth_schemas import Register, Token
+from src.schemas.financial_schemas import CategoriaGastoGet, GastoGet, gastos_adapter
+from src.services.json_service import respuesta_json
+from src.services.encrypt_service import hash_password
+from src.services.jwt_service import create_token
+from src.services.metrics_service import Metricas, contadores_de, peticion_actual
+from src.services.principal_service import principal_cache
+from src.services.transacciones_service import origen
+from src.services.uuid_service import generate_uuid
+from src.services.warmup_service import estado as estado_arranque
+
+DIRECTORIO_RESULTADOS = Path(__file__).parent / "resultados"
+
+
+@dataclass(frozen=True)
+class Endpoint:
+    nombre: str
+    metodo: str
+    ruta: str
+    autenticado: bool = True
+    cuerpo: Optional[dict] = None
+
+
+ENDPOINTS = [
+    Endpoint("geo_paises", "GET", "/geo/paises", autenticado=False),
+    Endpoint("geo_estados", "GET", "/geo/estados", autenticado=False),
+    Endpoint("usuario_detalles", "GET", "/usuarios/details"),
+    Endpoint("metas", "GET", "/financial/metas"),
+    Endpoint("proyeccion_metas", "GET", "/financial/metas/proyeccion"),
+    Endpoint("meta", "GET", "/financial/metas/{meta_id}"),
+    Endpoint("abonos_meta", "GET", "/financial/ingresos/{meta_id}?limit=20"),
+    Endpoint("categorias", "GET", "/financial/categorias?periodo=1"),
+    Endpoint("gastos", "GET", "/financial/gastos?limite=50"),
+    Endpoint("gastos_categoria", "GET", "/financial/gastos?limite=50&categoria_id={categoria_id}"),
+    Endpoint("ingresos", "GET", "/financial/ingresos?limite=50"),
+    Endpoint("resumen", "GET", "/financial/datos/resumen?periodo=1"),
+    Endpoint("resumenes", "GET", "/financial/datos/resumenes"),
+    Endpoint("datos_financieros", "GET", "/financial/datos/financieros"),
+    Endpoint("dashboard", "GET", "/financial/dashboard?periodo=1"),
+    Endpoint("analitica_gastos", "GET", "/financial/analytics/spending"),
+    Endpoint("registrar_gasto", "POST", "/financial/gastos", cuerpo={
+        "monto": 100.0,
+        "fecha": "{fecha}",
+        "descripcion": "Gasto de benchmark",
+        "categoria_id": "{categoria_id}",
+    }),
+]
+
+
+def percentil(ordenados: List[float], porcentaje: float) -> float:
+    """
+    Percentil por rango más cercano sobre una lista ya ordenada.
+    """
+    if not ordenados:
+        return 0.0
+    indice = max(0, min(len(ordenados) - 1, round(porcentaje / 100 * len(ordenados)) - 1))
+    return ordenados[indice]
+
+
+def _contexto(usuario: UsuarioPrueba) -> dict:
+    return {
+        "meta_id": usuario.metas[0] if usuario.metas else "",
+        "categoria_id": usuario.categorias[0] if usuario.categorias else "",
+        "fecha": datetime.now().isoformat(),
+    }
+
+
+def _rellenar(valor, contexto: dict):
+    if isinstance(valor, str):
+        return valor.format(**contexto)
+    if isinstance(valor, dict):
+        return {clave: _rellenar(v, contexto) for clave, v in valor.items()}
+    return valor
+
+
+async def medir_endpoint(cliente: httpx.AsyncClient, endpoint: Endpoint, usuarios: List[UsuarioPrueba],
+                         tokens: dict, peticiones: int, concurrencia: int) -> dict:
+    latencias = []
+    errores = 0
+    siguiente = 0
+
+    async def trabajador():
+        nonlocal errores, siguiente
+        while siguiente < peticiones:
+            numero = siguiente
+            siguiente += 1
+            usuario = usuarios[numero % len(usuarios)]
+            contexto = _contexto(usuario)
+            headers = {"Authorization": f"Bearer {tokens[usuario.id]}"} if endpoint.autenticado else {}
+            inicio = time.perf_counter()
+            respuesta = await cliente.request(
+                endpoint.metodo,
+                _rellenar(endpoint.ruta, contexto),
+                json=_rellenar(endpoint.cuerpo, contexto),
+                headers=headers,
+            )
+            latencias.append(time.perf_counter() - inicio)
+            if respuesta.status_code >= 400:
+                errores += 1
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(trabajador() for _ in range(concurrencia)))
+    duracion = time.perf_counter() - inicio
+
+    latencias.sort()
+    return {
+        "peticiones": len(latencias),
+        "errores": errores,
+        "p50_ms": percentil(latencias, 50) * 1000,
+        "p95_ms": percentil(latencias, 95) * 1000,
+        "p99_ms": percentil(latencias, 99) * 1000,
+        "rps": len(latencias) / duracion if duracion else 0.0,
+    }
+
+
+async def correr_escala(app, usuarios: List[UsuarioPrueba], args: argparse.Namespace) -> dict:
+    tokens = {usuario.id: create_token({"user_id": usuario.id}) for usuario in usuarios}
+    endpoints = [endpoint for endpoint in ENDPOINTS if not args.endpoints or endpoint.nombre in args.endpoints]
+
+    resultados = {}
+    transporte = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transporte, base_url="http://bench") as cliente:
+        for endpoint in endpoints:
+            # Calentamiento: llena caches y pools antes de medir
+            await medir_endpoint(cliente, endpoint, usuarios, tokens, args.calentamiento, args.concurrencia)
+            resultados[endpoint.nombre] = await medir_endpoint(
+                cliente, endpoint, usuarios, tokens, args.peticiones, args.concurrencia
+            )
+            r = resultados[endpoint.nombre]
+            print(f"  {endpoint.nombre:<20} p50 {r['p50_ms']:8.2f} ms  p95 {r['p95_ms']:8.2f} ms  "
+                  f"p99 {r['p99_ms']:8.2f} ms  {r['rps']:8.1f} rps  errores {r['errores']}")
+    return resultados
+
+
+ESCENARIOS: Dict[str, Callable[[argparse.Namespace], Awaitable[dict]]] = {}
+
+
+def escenario(nombre: str):
+    """
+    Registra un escenario de comparación para `--escenarios`.
+    """
+    def registrar(funcion):
+        ESCENARIOS[nombre] = funcion
+        return funcion
+    return registrar
+
+
+def _estadisticas(latencias: List[float]) -> dict:
+    latencias = sorted(latencias)
+    return {
+        "p50_ms": percentil(latencias, 50) * 1000,
+        "p95_ms": percentil(latencias, 95) * 1000,
+        "media_ms": sum(latencias) / len(latencias) * 1000 if latencias else 0.0,
+    }
+
+
+async def medir_llamadas(funcion: Callable[[], Awaitable], repeticiones: int) -> dict:
+    """
+    Ejecuta `funcion()` `repeticiones` veces seguidas y devuelve su latencia y las
+    llamadas promedio a cada base de datos por ejecución.
+    """
+    latencias = []
+    llamadas = {"mongodb": 0, "postgresql": 0}
+    for _ in range(repeticiones):
+        # Hace las veces del scope de una petición para los listeners de los drivers
+        scope = {}
+        token = peticion_actual.set(scope)
+        inicio = time.perf_counter()
+        try:
+            await funcion()
+        finally:
+            latencias.append(time.perf_counter() - inicio)
+            peticion_actual.reset(token)
+        contadores = contadores_de(scope)
+        if contadores is not None:
+            for base_de_datos, cantidad in contadores.llamadas.items():
+                llamadas[base_de_datos] += cantidad
+    return {
+        **_estadisticas(latencias),
+        "llamadas_por_ejecucion": {base_de_datos: cantidad / repeticiones for base_de_datos, cantidad in llamadas.items()},
+    }
+
+
+def _imprimir(nombre: str, resultado: dict):
+    """
+    Imprime cada medición de un escenario (los diccionarios con `p50_ms`) y cada
+    valor suelto con su ruta.
+    """
+    if "p50_ms" not in resultado:
+        for clave, valor in resultado.items():
+            if isinstance(valor, dict):
+                _imprimir(f"{nombre}.{clave}", valor)
+            else:
+                print(f"  {nombre}.{clave}: {valor:.2f}" if isinstance(valor, float) else f"  {nombre}.{clave}: {valor}")
+        return
+    extras = "  ".join(
+        f"{clave} {valor:.2f}" if isinstance(valor, float) else f"{clave} {valor}"
+        for clave, valor in resultado.items() if clave not in ("p50_ms", "p95_ms")
+    )
+    print(f"  {nombre:<40} p50 {resultado['p50_ms']:8.3f} ms  p95 {resultado['p95_ms']:8.3f} ms  {extras}")
+
+
+async def _categorias_n_mas_1(usuario_id: str, periodo: float) -> list:
+    """
+    GET /financial/categorias como era antes de la agregación única: una consulta
+    de gastos por categoría y la suma en Python.
+    """
+    db = mongo_connection.database
+    ahora = datetime.now()
+    coleccion, etapas = origen("gastos", usuario_id, desde=ahora - timedelta(days=30 * periodo), hasta=ahora + timedelta(days=1))
+
+    categorias = await db["categorias_gasto"].find({"usuario_id": usuario_id, "deleted": 0}).to_list(length=None)
+    for categoria in categorias:
+        categoria["_id"] = str(categoria["_id"])
+        pipeline = etapas + [{"$match": {"categoria_id": categoria["_id"]}}]
+        gastos = await db[coleccion].aggregate(pipeline).to_list(length=None)
+        categoria["gasto_actual"] = sum(gasto["monto"] for gasto in gastos)
+    return [CategoriaGastoGet(**categoria) for categoria in categorias]
+
+
+@escenario("categorias")
+async def escenario_categorias(args: argparse.Namespace) -> dict:
+    """
+    Categorías con su gasto del mes: una consulta por categoría frente a la
+    agregación única de `obtener_categorias_gasto`, con 10, 100 y 1000 categorías.
+    """
+    resultados = {}
+    for categorias in (10, 100, 1000):
+        parametros = Parametros(usuarios=1, categorias=categorias, metas=0, gastos=categorias * 20, ingresos=0,
+                                dias=args.dias, semilla=args.semilla)
+        usuario = (await generar(parametros))[0]
+        resultados[str(categorias)] = {
+            "n_mas_1": await medir_llamadas(lambda: _categorias_n_mas_1(usuario.id, 1), args.repeticiones),
+            "agregacion": await medir_llamadas(
+                lambda: financial_controller.obtener_categorias_gasto(usuario.id, 1), args.repeticiones
+            ),
+        }
+    return resultados
+
+
+@escenario("autenticacion")
+async def escenario_autenticacion(args: argparse.Namespace) -> dict:
+    """
+    Una ruta que solo autentica: buscando al usuario en PostgreSQL en cada petición,
+    con la caché de usuarios autenticados y confiando en los claims del token.
+    """
+    usuarios = await generar(Parametros(usuarios=args.usuarios, categorias=0, metas=0, gastos=0, ingresos=0,
+                                        semilla=args.semilla))
+    tokens = [create_token({"user_id": usuario.id}) for usuario in usuarios]
+
+    app = FastAPI()
+
+    @app.get("/yo")
+    async def yo(usuario=Depends(auth_middleware.auth_middleware)):
+        return {"id": usuario.id}
+
+    siguiente = itertools.count()
+    transporte = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transporte, base_url="http://bench") as cliente:
+        async def peticion(sin_cache: bool = False):
+            if sin_cache:
+                principal_cache.clear()
+            token = tokens[next(siguiente) % len(tokens)]
+            respuesta = await cliente.get("/yo", headers={"Authorization": f"Bearer {token}"})
+            respuesta.raise_for_status()
+
+        confiar_claims = auth_middleware.CONFIAR_CLAIMS
+        resultados = {}
+        try:
+            for variante, confiar, sin_cache in (("sin_cache", False, True), ("cache", False, False), ("claims", True, False)):
+                auth_middleware.CONFIAR_CLAIMS = confiar
+                # Calentamiento: una petición por usuario deja la caché llena
+                await medir_llamadas(lambda: peticion(sin_cache), len(tokens))
+                resultados[variante] = await medir_llamadas(lambda: peticion(sin_cache), args.repeticiones)
+        finally:
+            auth_middleware.CONFIAR_CLAIMS = confiar_claims
+            principal_cache.clear()
+    return resultados
+
+
+async def llamar_asgi(app, metodo: str, ruta: str, headers: Optional[dict] = None) -> int:
+    """
+    Llama a una aplicación ASGI directamente, sin cliente HTTP, y devuelve el status.
+    Para escenarios donde el costo del cliente taparía lo que se mide.
+    """
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": metodo,
+        "scheme": "http",
+        "path": ruta,
+        "raw_path": ruta.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(clave.lower().encode("latin-1"), valor.encode("latin-1")) for clave, valor in (headers or {}).items()],
+        "client": ("127.0.0.1", 50000),
+        "server": ("bench", 80),
+    }
+    respuesta = {}
+
+    async def receive() -> dict:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: dict):
+        if message["type"] == "http.response.start":
+            respuesta["status"] = message["status"]
+
+    await app(scope, receive, send)
+    return respuesta["status"]
+
+
+class _CORSAnterior(BaseHTTPMiddleware):
+    """
+    CustomCORSMiddleware antes de reescribirlo en ASGI puro: el preflight recorría
+    la ruta y la respuesta se copiaba en otra.
+    """
+
+    def __init__(self, app, allow_origins=None, allow_methods=None, allow_headers=None, allow_credentials=False):
+        super().__init__(app)
+        self.allow_origins = allow_origins or ["*"]
+        self.allow_methods = allow_methods or ["*"]
+        self.allow_headers = allow_headers or ["*"]
+        self.allow_credentials = allow_credentials
+
+    async def dispatch(self, request: Request, call_next):
+        response = await call_next(request)
+
+        origin = request.headers.get("origin")
+        if origin and (origin in self.allow_origins or "*" in self.allow_origins):
+            response.headers["Access-Control-Allow-Origin"] = origin
+            response.headers["Access-Control-Allow-Methods"] = ", ".join(self.allow_methods)
+            response.headers["Access-Control-Allow-Headers"] = ", ".join(self.allow_headers)
+            if self.allow_credentials:
+                response.headers["Access-Control-Allow-Credentials"] = "true"
+
+        if request.method == "OPTIONS":
+            return Response(status_code=204, headers=response.headers)
+
+        return response
+
+
+def _app_hola(middleware=None, **opciones) -> FastAPI:
+    app = FastAPI()
+    if middleware is not None:
+        app.add_middleware(middleware, **opciones)
+
+    @app.get("/hola")
+    async def hola():
+        return {"hola": "mundo"}
+
+    return app
+
+
+@escenario("cors")
+async def escenario_cors(args: argparse.Namespace) -> dict:
+    """
+    Preflight (OPTIONS) y GET con Origin sobre una ruta trivial: sin middleware
+    CORS, con el middleware anterior (BaseHTTPMiddleware) y con el actual.
+    """
+    origen_cors = {"Origin": "http://localhost:3000"}
+    preflight = {**origen_cors, "Access-Control-Request-Method": "GET", "Access-Control-Request-Headers": "authorization"}
+    variantes = {
+        "sin_cors": _app_hola(),
+        "anterior": _app_hola(_CORSAnterior),
+        "actual": _app_hola(CustomCORSMiddleware),
+    }
+
+    resultados = {}
+    for variante, app in variantes.items():
+        resultados[variante] = {}
+        for nombre, metodo, headers in (("preflight", "OPTIONS", preflight), ("get", "GET", origen_cors)):
+            if variante == "sin_cors" and metodo == "OPTIONS":
+                continue
+            llamada = functools.partial(llamar_asgi, app, metodo, "/hola", headers)
+            await medir_llamadas(llamada, args.calentamiento)
+            resultados[variante][nombre] = await medir_llamadas(llamada, args.iteraciones)
+    return resultados
+
+
+FILAS_SERIALIZACION = 10_000
+
+
+def _documentos_gasto(cantidad: int) -> List[dict]:
+    ahora = datetime.now()
+    categoria_id = str(ObjectId())
+    return [
+        {
+            "_id": ObjectId(),
+            "usuario_id": "bench-serializacion",
+            "categoria_id": categoria_id,
+            "monto": round(10 + i % 2_000 * 0.99, 2),
+            "fecha": ahora - timedelta(minutes=i),
+            "descripcion": "Gasto de prueba",
+        }
+        for i in range(cantidad)
+    ]
+
+
+async def _medir_serializacion(serializar: Callable[[List[dict]], Awaitable[bytes]], repeticiones: int) -> dict:
+    """
+    Tiempo de CPU de `serializar` sobre `FILAS_SERIALIZACION` documentos nuevos en
+    cada repetición, y pico de memoria reservada durante una ejecución aparte.
+    """
+    tiempos = []
+    for _ in range(repeticiones):
+        documentos = _documentos_gasto(FILAS_SERIALIZACION)
+        inicio = time.process_time()
+        await serializar(documentos)
+        tiempos.append(time.process_time() - inicio)
+
+    documentos = _documentos_gasto(FILAS_SERIALIZACION)
+    tracemalloc.start()
+    try:
+        cuerpo = await serializar(documentos)
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {**_estadisticas(tiempos), "pico_memoria_mb": pico / 2 ** 20, "bytes": len(cuerpo)}
+
+
+@escenario("serializacion")
+async def escenario_serializacion(args: argparse.Namespace) -> dict:
+    """
+    Respuesta de una lista de 10 000 gastos: un modelo por documento y la
+    revalidación de FastAPI contra `response_model`, frente a validar el lote con
+    `gastos_adapter` y serializarlo directo a bytes. Los tiempos son de CPU.
+    """
+    campo = create_model_field(name="Response_gastos", type_=List[GastoGet], mode="serialization")
+
+    async def anterior(documentos: List[dict]) -> bytes:
+        gastos = []
+        for documento in documentos:
+            documento["_id"] = str(documento["_id"])
+            gastos.append(GastoGet(**documento))
+        contenido = await serialize_response(field=campo, response_content=gastos)
+        return JSONResponse(contenido).body
+
+    async def actual(documentos: List[dict]) -> bytes:
+        return respuesta_json(gastos_adapter.validate_python(documentos), gastos_adapter).body
+
+    resultados = {}
+    for variante, serializar in (("anterior", anterior), ("actual", actual)):
+        await _medir_serializacion(serializar, 1)
+        resultados[variante] = await _medir_serializacion(serializar, args.repeticiones)
+    return resultados
+
+
+PREFIJO_REGISTRO = f"{PREFIJO}registro-"
+
+
+async def _registro_secuencial(db, register_data: Register) -> Token:
+    """
+    El registro antes de optimizarlo: consulta previa del correo, hash en el
+    event loop y las escrituras en PostgreSQL y MongoDB una después de la otra.
+    """
+    existente = (await db.execute(
+        select(user_models.Usuario).where(user_models.Usuario.correo == register_data.correo)
+    )).scalars().first()
+    if existente:
+        raise RuntimeError(f"Correo ya existente: {register_data.correo}")
+
+    usuario_id = generate_uuid()
+    nuevo = user_models.Usuario(
+        id=usuario_id,
+        nombre=register_data.nombre,
+        correo=register_data.correo,
+        contrasena=hash_password(register_data.contrasena),
+        fecha_registro=date.today(),
+        apellido_paterno=register_data.apellido_paterno,
+        apellido_materno=register_data.apellido_materno,
+        pais_id=register_data.pais_id,
+        estado_id=register_data.estado_id,
+        direccion=register_data.direccion,
+    )
+    db.add(nuevo)
+    await db.commit()
+    await db.refresh(nuevo)
+
+    await auth_controller.save_financial_data_to_mongo(usuario_id, register_data)
+    return Token(access_token=create_token({"user_id": usuario_id}), token_type="bearer")
+
+
+async def _limpiar_registros():
+    filtro = user_models.Usuario.correo.startswith(PREFIJO_REGISTRO)
+    async with AsyncSessionLocal() as sesion:
+        ids = (await sesion.execute(select(user_models.Usuario.id).where(filtro))).scalars().all()
+        await sesion.execute(delete(user_models.Usuario).where(filtro))
+        await sesion.commit()
+    await mongo_connection.database["usuarios_financieros"].delete_many({"usuario_id": {"$in": list(ids)}})
+
+
+@escenario("registro")
+async def escenario_registro(args: argparse.Namespace) -> dict:
+    """
+    Latencia del registro de usuarios: el camino secuencial anterior frente a
+    `auth_controller.register` (hash fuera del event loop y las dos escrituras
+    en paralelo). Incluye el costo de bcrypt con el factor configurado.
+    """
+    await crear_esquema()
+    async with AsyncSessionLocal() as sesion:
+        pais_id, estado_id = await _asegurar_geo(sesion)
+        await sesion.commit()
+
+    numero = itertools.count()
+
+    async def registrar(funcion):
+        register_data = Register(
+            correo=f"{PREFIJO_REGISTRO}{next(numero)}@bench.local",
+            contrasena=CONTRASENA,
+            fecha_registro=date.today(),
+            nombre="Bench",
+            apellido_paterno="Registro",
+            apellido_materno="Prueba",
+            pais_id=pais_id,
+            estado_id=estado_id,
+            direccion="Calle de prueba 1",
+            salario=30_000.0,
+            divisa="MXN",
+            balance_objetivo=10_000.0,
+            gasto_limite=20_000.0,
+        )
+        async with AsyncSessionLocal() as sesion:
+            await funcion(sesion, register_data)
+
+    resultados = {}
+    await _limpiar_registros()
+    try:
+        for variante, funcion in (("secuencial", _registro_secuencial), ("actual", auth_controller.register)):
+            await medir_llamadas(lambda: registrar(funcion), min(args.calentamiento, args.repeticiones))
+            resultados[variante] = await medir_llamadas(lambda: registrar(funcion), args.repeticiones)
+    finally:
+        await _limpiar_registros()
+    return resultados
+
+
+@escenario("metricas")
+async def escenario_metricas(args: argparse.Namespace) -> dict:
+    """
+    Sobrecarga de MetricsMiddleware sobre una ruta trivial. Las dos variantes se
+    alternan en cada llamada para que la deriva de la máquina (frecuencia, otros
+    procesos) afecte a las dos por igual y no tape una diferencia de pocos
+    microsegundos. El objetivo es < 2 %.
+    """
+    llamadas = {
+        "sin_metricas": functools.partial(llamar_asgi, _app_hola(), "GET", "/hola"),
+        "con_metricas": functools.partial(llamar_asgi, _app_hola(MetricsMiddleware, registro=Metricas()), "GET", "/hola"),
+    }
+    for llamada in llamadas.values():
+        await medir_llamadas(llamada, args.calentamiento)
+
+    latencias = {variante: [] for variante in llamadas}
+    for _ in range(args.iteraciones):
+        for variante, llamada in llamadas.items():
+            inicio = time.perf_counter()
+            await llamada()
+            latencias[variante].append(time.perf_counter() - inicio)
+
+    resultados = {variante: _estadisticas(valores) for variante, valores in latencias.items()}
+    base = resultados["sin_metricas"]["p50_ms"]
+    diferencia = resultados["con_metricas"]["p50_ms"] - base
+    resultados["sobrecarga_p50_us"] = diferencia * 1000
+    resultados["sobrecarga_p50_pct"] = diferencia / base * 100 if base else 0.0
+    return resultados
+
+
+def _commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def comparar(base: dict, actual: dict, tolerancia: float) -> List[str]:
+    """
+    Devuelve las regresiones de p95 o rps mayores a `tolerancia` (fracción) entre
+    dos resultados con escalas en común.
+    """
+    regresiones = []
+    escalas_base = {escala["gastos"]: escala["endpoints"] for escala in base["escalas"]}
+    for escala in actual["escalas"]:
+        endpoints_base = escalas_base.get(escala["gastos"], {})
+        for nombre, medicion in escala["endpoints"].items():
+            anterior = endpoints_base.get(nombre)
+            if not anterior:
+                continue
+            if anterior["p95_ms"] and medicion["p95_ms"] > anterior["p95_ms"] * (1 + tolerancia):
+                regresiones.append(f"{escala['gastos']} gastos, {nombre}: p95 {anterior['p95_ms']:.2f} -> {medicion['p95_ms']:.2f} ms")
+            if anterior["rps"] and medicion["rps"] < anterior["rps"] * (1 - tolerancia):
+                regresiones.append(f"{escala['gastos']} gastos, {nombre}: rps {anterior['rps']:.1f} -> {medicion['rps']:.1f}")
+    return regresiones
+
+
+async def _main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark en proceso de la API")
+    agregar_argumentos(parser)
+    parser.add_argument("--escalas", default="10000,100000", help="Cantidades de gastos, separadas por comas (vacío: ninguna)")
+    parser.add_argument("--proporcion-ingresos", type=float, default=0.2, help="Ingresos por cada gasto")
+    parser.add_argument("--peticiones", type=int, default=500, help="Peticiones medidas por endpoint")
+    parser.add_argument("--calentamiento", type=int, default=50)
+    parser.add_argument("--concurrencia", type=int, default=10)
+    parser.add_argument("--endpoints", nargs="*", help="Limita la corrida a estos endpoints")
+    parser.add_argument("--salida", type=Path, default=None, help="Archivo JSON de resultados")
+    parser.add_argument("--comparar", type=Path, default=None, help="Resultados previos contra los cuales comparar")
+    parser.add_argument("--tolerancia", type=float, default=0.2, help="Regresión permitida (0.2 = 20%%)")
+    parser.add_argument("--escenarios", nargs="*", choices=sorted(ESCENARIOS), default=[],
+                        help="Escenarios de comparación a ejecutar después de las escalas")
+    parser.add_argument("--repeticiones", type=int, default=50, help="Repeticiones medidas por variante de escenario")
+    parser.add_argument("--iteraciones", type=int, default=5000,
+                        help="Iteraciones medidas en los escenarios que no usan base de datos")
+    args = parser.parse_args(argv)
+
+    from main import app
+
+    parametros_base = parametros_de(args)
+    resultado = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "commit": _commit(),
+        "python": sys.version.split()[0],
+        "plataforma": platform.platform(),
+        "parametros": {
+            **asdict(parametros_base),
+            "peticiones": args.peticiones,
+            "concurrencia": args.concurrencia,
+            "calentamiento": args.calentamiento,
+            "repeticiones": args.repeticiones,
+            "iteraciones": args.iteraciones,
+        },
+        "escalas": [],
+        "escenarios": {},
+    }
+
+    for gastos in (int(escala) for escala in args.escalas.split(",") if escala):
+        parametros = replace(parametros_base, gastos=gastos, ingresos=int(gastos * args.proporcion_ingresos))
+
+        await mongo_connection.connect()
+        inicio = time.perf_counter()
+        usuarios = await generar(parametros)
+        await mongo_connection.close()
+        print(f"Escala {gastos} gastos: datos generados en {time.perf_counter() - inicio:.1f}s")
+
+        # Cada escala arranca la aplicación de nuevo: se espera a su propio calentamiento
+        estado_arranque.reiniciar()
+        async with app.router.lifespan_context(app):
+            while not estado_arranque.listo:
+                await asyncio.sleep(0.05)
+            endpoints = await correr_escala(app, usuarios, args)
+        resultado["escalas"].append({"gastos": gastos, "ingresos": parametros.ingresos, "endpoints": endpoints})
+
+    if args.escenarios:
+        # Cada escenario genera sus propios datos y reemplaza los de las escalas
+        await mongo_connection.connect()
+        try:
+            for nombre in args.escenarios:
+                print(f"Escenario {nombre}:")
+                resultado["escenarios"][nombre] = await ESCENARIOS[nombre](args)
+                _imprimir(nombre, resultado["escenarios"][nombre])
+        finally:
+            await mongo_connection.close()
+            await async_engine.dispose()
+
+    salida = args.salida or DIRECTORIO_RESULTADOS / f"{datetime.now():%Y%m%d-%H%M%S}.json"
+    salida.parent.mkdir(parents=True, exist_ok=True)
+    salida.write_text(json.dumps(resultado, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"Resultados guardados en {salida}")
+
+    if args.comparar:
+        regresiones = comparar(json.loads(args.comparar.read_text(encoding="utf-8")), resultado, args.tolerancia)
+        for regresion in regresiones:
+            print(f"REGRESIÓN {regresion}")
+        return 1 if regresiones else 0
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(asyncio.run(_main()))
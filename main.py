@@ -1,34 +1,60 @@
+import asyncio
+import time
 from fastapi import FastAPI
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
 
 from src.db.mongodb.config import mongo_connection
-from src.models import user_models
-from src.db.postgresql.config import engine
+from src.db.postgresql.config import async_engine
+from src.services import archivo_service, write_batcher
+from src.services.warmup_service import calentar
 from src.routers.auth_router import router as auth_router
 from src.routers.financial_router import router as financial_router
 from src.routers.geo_router import router as geo_router
+from src.routers.health_router import router as health_router
+from src.routers.internal_router import router as internal_router
+from src.routers.metrics_router import router as metrics_router
 from src.routers.user_router import router as user_router
 from src.middlewares.middleware_cors import CustomCORSMiddleware
+from src.services.pagination_service import CABECERA_CURSOR
+from src.middlewares.metrics_middleware import MetricsMiddleware
 
+# Referencia para medir cuánto tarda el worker en quedar listo una vez importado;
+# el costo de las importaciones se mide aparte con `benchmarks.arranque`
+_inicio_proceso = time.perf_counter()
 
-user_models.Base.metadata.create_all(bind=engine)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await mongo_connection.connect()
+    # El calentamiento corre en segundo plano; /health/ready indica cuándo terminó
+    calentamiento = asyncio.create_task(calentar(_inicio_proceso))
+    archivador = archivo_service.iniciar()
     yield  # Punto en el que la aplicación está corriendo
+    for tarea in (calentamiento, archivador):
+        if tarea is not None:
+            tarea.cancel()
+            with suppress(asyncio.CancelledError):
+                await tarea
+    await write_batcher.cerrar()
     await mongo_connection.close()
+    await async_engine.dispose()
 
 app = FastAPI(lifespan=lifespan)
 
-app.add_middleware(CustomCORSMiddleware)
+# Los clientes web leen el cursor de la página siguiente de estas cabeceras
+app.add_middleware(CustomCORSMiddleware, expose_headers=[CABECERA_CURSOR, "Link"])
+# Se agrega al final para quedar por fuera de los demás middlewares y medirlos también
+app.add_middleware(MetricsMiddleware)
 
 
 app.include_router(auth_router)
 app.include_router(financial_router)
 app.include_router(geo_router)
+app.include_router(health_router)
+app.include_router(internal_router)
+app.include_router(metrics_router)
 app.include_router(user_router)
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
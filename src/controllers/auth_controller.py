@@ -1,18 +1,36 @@
-from sqlalchemy.orm import Session
+import asyncio
+import logging
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException
 from src.models import user_models
 from src.schemas.auth_schemas import Register, Token
 from src.services.jwt_service import create_token
-from src.services.encrypt_service import verify_password, hash_password
+from src.services.encrypt_service import hash_password_async, necesita_rehash, verify_password_async
+from src.services.principal_service import invalidar_principal
 from src.services.uuid_service import generate_uuid
 from src.db.mongodb.config import mongo_connection
 from datetime import date
 
-def login(db: Session, email: str, password: str):
-    user = db.query(user_models.Usuario).filter(user_models.Usuario.correo == email).first()
+logger = logging.getLogger(__name__)
 
-    if not user or not verify_password(password, user.contrasena):
+async def login(db: AsyncSession, email: str, password: str):
+    query = select(user_models.Usuario).where(user_models.Usuario.correo == email)
+    user = (await db.execute(query)).scalars().first()
+
+    if not user or not await verify_password_async(password, user.contrasena):
         raise HTTPException(status_code=401, detail="Invalid credentials")
+
+    if necesita_rehash(user.contrasena):
+        # El hash se generó con otro factor de trabajo: se actualiza ahora que tenemos la contraseña
+        try:
+            user.contrasena = await hash_password_async(password)
+            await db.commit()
+            invalidar_principal(user.id)
+        except HTTPException:
+            # Con el pool saturado se deja para el siguiente inicio de sesión
+            await db.rollback()
     
     token = create_token({"user_id": user.id})
     return {"access_token": token, "token_type": "bearer"}
@@ -35,20 +53,46 @@ async def save_financial_data_to_mongo(usuario_id: str, register_data: Register)
     await db["usuarios_financieros"].insert_one(financial_data)
 
 
-async def register(db: Session, register_data: Register) -> Token:
+async def _guardar_usuario(db: AsyncSession, new_user: user_models.Usuario):
     """
-    Registra un usuario en PostgreSQL y guarda sus datos financieros en MongoDB.
+    Inserta el usuario; la unicidad del correo la garantiza la restricción
+    `unique` de `usuarios.correo`, sin consultarla antes.
+    """
+    db.add(new_user)
+    try:
+        await db.commit()
+    except IntegrityError as error:
+        await db.rollback()
+        if "correo" in str(error.orig):
+            raise HTTPException(status_code=400, detail="Correo ya existente")
+        raise HTTPException(status_code=400, detail="Datos de registro inválidos")
+
+async def _compensar_registro(db: AsyncSession, usuario_id: str, usuario_guardado: bool, financiero_guardado: bool):
+    """
+    Deshace la parte del registro que sí se guardó cuando la otra falló.
     """
-    if db.query(user_models.Usuario).filter(user_models.Usuario.correo == register_data.correo).first():
-        raise HTTPException(status_code=400, detail="Correo ya existente")
+    try:
+        if usuario_guardado:
+            await db.execute(delete(user_models.Usuario).where(user_models.Usuario.id == usuario_id))
+            await db.commit()
+        if financiero_guardado:
+            await mongo_connection.database["usuarios_financieros"].delete_one({"usuario_id": usuario_id})
+    except Exception:
+        logger.exception("No se pudo compensar el registro incompleto del usuario %s", usuario_id)
 
+
+async def register(db: AsyncSession, register_data: Register) -> Token:
+    """
+    Registra un usuario en PostgreSQL y guarda sus datos financieros en MongoDB.
+    Ambas escrituras se hacen en paralelo; si una falla se deshace la otra.
+    """
     user_uuid = generate_uuid()
 
     new_user = user_models.Usuario(
         id=user_uuid,
         nombre=register_data.nombre,
         correo=register_data.correo,
-        contrasena=hash_password(register_data.contrasena),
+        contrasena=await hash_password_async(register_data.contrasena),
         fecha_registro=date.today(),
         apellido_paterno=register_data.apellido_paterno,
         apellido_materno=register_data.apellido_materno,
@@ -57,11 +101,17 @@ async def register(db: Session, register_data: Register) -> Token:
         direccion=register_data.direccion,
     )
 
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    resultado_usuario, resultado_financiero = await asyncio.gather(
+        _guardar_usuario(db, new_user),
+        save_financial_data_to_mongo(user_uuid, register_data),
+        return_exceptions=True
+    )
 
-    await save_financial_data_to_mongo(user_uuid, register_data)
+    usuario_guardado = not isinstance(resultado_usuario, BaseException)
+    financiero_guardado = not isinstance(resultado_financiero, BaseException)
+    if not (usuario_guardado and financiero_guardado):
+        await _compensar_registro(db, user_uuid, usuario_guardado, financiero_guardado)
+        raise resultado_usuario if not usuario_guardado else resultado_financiero
 
-    token = create_token({"user_id": new_user.id})
+    token = create_token({"user_id": user_uuid})
     return Token(access_token=token, token_type="bearer")
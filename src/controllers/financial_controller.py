@@ -1,6 +1,15 @@
-from fastapi import HTTPException
-from datetime import datetime, timedelta
+import asyncio
+import codecs
+import csv
+import json
+import os
+import time
+from fastapi import HTTPException, UploadFile
+from datetime import date, datetime, timedelta
 from motor.motor_asyncio import AsyncIOMotorCollection
+from pydantic import ValidationError
+from pymongo import UpdateOne
+from starlette.concurrency import iterate_in_threadpool
 from src.models.financial_models import (
     GastoModel,
     CategoriaGastoModel,
@@ -12,14 +21,52 @@ from src.schemas.financial_schemas import (
     MetaAhorroCreate,
     CategoriaGastoCreate,
     CategoriaGastoGet,
-    GastoGet,
+    GastoCreate,
     Ingreso,
     IngresoCreate,
-    UsuarioFinanciero
+    ResumenMensual,
+    PaginaGastos,
+    PaginaIngresos,
+    Dashboard,
+    AnaliticaGastos,
+    ProyeccionMetas,
+    metas_ahorro_adapter,
+    gastos_adapter,
+    ingresos_adapter,
+    usuarios_financieros_adapter
 )
 from bson import ObjectId
 from src.db.mongodb.config import mongo_connection
-from typing import Optional
+from src.services.rollup_service import (
+    COLECCION_GASTOS_DIARIOS,
+    COLECCION_RESUMENES_MENSUAL,
+    acumular_gasto_diario,
+    acumular_gastos_en_lote,
+    acumular_resumen_mensual,
+    inicio_del_dia,
+    inicio_del_mes
+)
+from src.services import analytics_service, transacciones_service, write_batcher
+from src.services.pagination_service import TAMANO_PAGINA_MAXIMO
+from typing import Iterator, Optional
+
+IMPORTACION_TAMANO_LOTE = int(os.getenv("IMPORTACION_TAMANO_LOTE", "1000"))
+IMPORTACION_MAX_ERRORES = int(os.getenv("IMPORTACION_MAX_ERRORES", "1000"))
+CARACTER_REEMPLAZO = "\ufffd"
+ERROR_CODIFICACION = "Codificación inválida: se esperaba UTF-8"
+
+def _calcular_fecha_inicio(periodo: float, now: Optional[datetime] = None) -> datetime:
+    """
+    Convierte el período solicitado (en meses) en la fecha de inicio del rango.
+    """
+    now = now or datetime.now()
+    if periodo >= 1:
+        return now - timedelta(days=(30 * periodo))
+    elif periodo == 0.5:
+        return now - timedelta(days=14)
+    elif periodo == 0.25:
+        return now - timedelta(days=7)
+    raise HTTPException(status_code=400, detail="Período no válido")
 
 async def crear_meta_ahorro(usuario_id: str, meta_data: MetaAhorroCreate):
     meta_data_dict = meta_data.model_dump()
@@ -96,15 +143,13 @@ async def abonar_meta(usuario_id: str, meta_id: str, monto: float):
     """
     Abonar a una meta de ahorro y registrar el ingreso.
     """
-    metas_db: AsyncIOMotorCollection = mongo_connection.database["metas_ahorro"]
-    ingresos_db: AsyncIOMotorCollection = mongo_connection.database["ingresos"]
-    
     try:
         object_id = ObjectId(meta_id)
     except Exception:
         raise HTTPException(status_code=400, detail="ID de meta inválido")
 
-    result = await metas_db.update_one(
+    result = await write_batcher.actualizar(
+        "metas_ahorro",
         {"_id": object_id, "usuario_id": usuario_id},
         {"$inc": {"monto_actual": monto}}
     )
@@ -120,20 +165,19 @@ async def abonar_meta(usuario_id: str, meta_id: str, monto: float):
         "meta_id": meta_id
     }
 
-    await ingresos_db.insert_one(ingreso)
+    await transacciones_service.insertar("ingresos", ingreso)
+    await acumular_resumen_mensual(usuario_id, ingreso["fecha"], ingresos=monto)
 
     return {"message": "Abono realizado y registrado como ingreso"}
 
 async def registrar_gasto(usuario_id: str, gasto_data: GastoModel):
-    gastos_db: AsyncIOMotorCollection = mongo_connection.database["gastos"]
-    categorias_db: AsyncIOMotorCollection = mongo_connection.database["categorias_gasto"]
-
     try:
         object_id = ObjectId(gasto_data.categoria_id)
     except Exception:
         raise HTTPException(status_code=400, detail="ID de categoría inválido")
 
-    result = await categorias_db.update_one(
+    result = await write_batcher.actualizar(
+        "categorias_gasto",
         {"_id": object_id, "usuario_id": usuario_id},
         {"$inc": {"gasto_total": gasto_data.monto}}
     )
@@ -143,95 +187,275 @@ async def registrar_gasto(usuario_id: str, gasto_data: GastoModel):
 
     gasto_data_dict = gasto_data.model_dump()  # Convierte los datos del modelo a diccionario
     gasto_data_dict['usuario_id'] = usuario_id  # Asigna el usuario_id al gasto
-    result = await gastos_db.insert_one(gasto_data_dict)  # Inserta el gasto en la base de datos
+    gasto_id = await transacciones_service.insertar("gastos", gasto_data_dict)  # Inserta el gasto en la base de datos
+
+    # En paralelo para que ambos acumulados entren en la misma ventana del agrupador
+    await asyncio.gather(
+        acumular_gasto_diario(usuario_id, gasto_data.categoria_id, gasto_data.fecha, gasto_data.monto),
+        acumular_resumen_mensual(usuario_id, gasto_data.fecha, gastos=gasto_data.monto),
+    )
 
-    return {"message": "Gasto registrado", "gasto_id": str(result.inserted_id)}
+    return {"message": "Gasto registrado", "gasto_id": str(gasto_id)}
+
+def _filas_importacion(archivo, formato: str) -> Iterator[tuple]:
+    """
+    Recorre el archivo subido fila por fila, sin cargarlo completo en memoria.
+    Produce tuplas (numero_fila, datos, error).
+    """
+    # Los bytes que no son UTF-8 se reemplazan por U+FFFD y esa fila se reporta
+    # como error, en lugar de cortar la importación a mitad del archivo
+    lector = codecs.getreader("utf-8-sig")(archivo, errors="replace")
+
+    if formato == "ndjson":
+        for numero_fila, linea in enumerate(lector, start=1):
+            if not linea.strip():
+                continue
+            if CARACTER_REEMPLAZO in linea:
+                yield numero_fila, None, ERROR_CODIFICACION
+                continue
+            try:
+                yield numero_fila, json.loads(linea), None
+            except ValueError:
+                yield numero_fila, None, "JSON inválido"
+        return
+
+    for numero_fila, fila in enumerate(csv.DictReader(lector), start=1):
+        # Las columnas sobrantes quedan bajo la clave None
+        sobrantes = fila.pop(None, None) or []
+        if any(CARACTER_REEMPLAZO in (valor or "") for valor in [*fila.values(), *sobrantes, *fila.keys()]):
+            yield numero_fila, None, ERROR_CODIFICACION
+            continue
+        yield numero_fila, fila, None
+
+def _lotes_importacion(archivo, formato: str) -> Iterator[list]:
+    lote = []
+    for fila in _filas_importacion(archivo, formato):
+        lote.append(fila)
+        if len(lote) >= IMPORTACION_TAMANO_LOTE:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+def _formato_importacion(archivo: UploadFile, formato: Optional[str]) -> str:
+    if formato:
+        return formato
+    nombre = (archivo.filename or "").lower()
+    tipo = (archivo.content_type or "").lower()
+    if nombre.endswith((".ndjson", ".jsonl")) or "ndjson" in tipo or "jsonl" in tipo:
+        return "ndjson"
+    return "csv"
+
+async def _guardar_lote_gastos(usuario_id: str, lote: list, errores: list) -> int:
+    """
+    Inserta un lote de gastos ya validados y actualiza los contadores de sus
+    categorías con un único `bulk_write`. Devuelve cuántos se insertaron.
+    """
+    categorias_db: AsyncIOMotorCollection = mongo_connection.database["categorias_gasto"]
+
+    documentos = [documento for _, documento in lote]
+    fallidos = await transacciones_service.insertar_en_lote("gastos", documentos)
+    for indice, error in sorted(fallidos.items()):
+        errores.append({"fila": lote[indice][0], "error": error})
+
+    insertados = [documento for indice, documento in enumerate(documentos) if indice not in fallidos]
+
+    totales = {}
+    for documento in insertados:
+        totales[documento["categoria_id"]] = totales.get(documento["categoria_id"], 0) + documento["monto"]
+    if totales:
+        await categorias_db.bulk_write([
+            UpdateOne({"_id": ObjectId(categoria_id), "usuario_id": usuario_id}, {"$inc": {"gasto_total": total}})
+            for categoria_id, total in totales.items()
+        ], ordered=False)
+
+    await acumular_gastos_en_lote(usuario_id, insertados)
+    return len(insertados)
+
+async def importar_gastos(usuario_id: str, archivo: UploadFile, formato: Optional[str] = None):
+    """
+    Importa gastos desde un archivo CSV o NDJSON (columnas `monto`, `fecha`,
+    `descripcion` y `categoria_id`). Las filas se validan con `GastoCreate` y se
+    escriben por lotes; las inválidas se reportan sin detener la importación.
+    """
+    categorias_db: AsyncIOMotorCollection = mongo_connection.database["categorias_gasto"]
+    formato = _formato_importacion(archivo, formato)
+
+    # Solo las activas: las borradas no admiten gastos y el filtro usa `usuario_activas`
+    categorias_cursor = categorias_db.find({"usuario_id": usuario_id, "deleted": 0}, {"_id": 1})
+    categorias = {str(categoria["_id"]) async for categoria in categorias_cursor}
+
+    insertados = 0
+    errores = []
+    total_errores = 0
+
+    # La lectura y el parseo del archivo ocurren en el threadpool, un lote a la vez
+    async for filas in iterate_in_threadpool(_lotes_importacion(archivo.file, formato)):
+        lote = []
+        errores_lote = []
+        for numero_fila, datos, error in filas:
+            if error is None:
+                try:
+                    gasto = GastoCreate.model_validate(datos)
+                    if gasto.categoria_id not in categorias:
+                        error = "Categoría de gasto no encontrada"
+                except ValidationError as validacion:
+                    error = "; ".join(
+                        f"{'.'.join(str(campo) for campo in detalle['loc'])}: {detalle['msg']}"
+                        for detalle in validacion.errors()
+                    )
+                except (TypeError, ValueError):
+                    error = "Fila inválida"
+
+            if error is not None:
+                errores_lote.append({"fila": numero_fila, "error": error})
+                continue
+
+            documento = gasto.model_dump()
+            documento["usuario_id"] = usuario_id
+            lote.append((numero_fila, documento))
+
+        if lote:
+            insertados += await _guardar_lote_gastos(usuario_id, lote, errores_lote)
+
+        total_errores += len(errores_lote)
+        errores.extend(errores_lote[:max(IMPORTACION_MAX_ERRORES - len(errores), 0)])
+
+    return {
+        "message": "Importación finalizada",
+        "insertados": insertados,
+        "rechazados": total_errores,
+        "errores": errores,
+    }
 
 async def obtener_metas_ahorro(usuario_id: str):
     db: AsyncIOMotorCollection = mongo_connection.database["metas_ahorro"]
     metas_cursor = db.find({"usuario_id": usuario_id})
     metas = await metas_cursor.to_list(length=None)
-    for meta in metas:
-        meta["_id"] = str(meta["_id"])
-    metas_parsed = [MetaAhorro(**meta) for meta in metas]
-    return metas_parsed
+    return metas_ahorro_adapter.validate_python(metas)
 
-async def obtener_categorias_gasto(usuario_id: str, periodo: float):
-    categorias_db: AsyncIOMotorCollection = mongo_connection.database["categorias_gasto"]
-    gastos_db: AsyncIOMotorCollection = mongo_connection.database["gastos"]
-
-    now = datetime.now()
-    if periodo >= 1:
-        start_date = now - timedelta(days=(30 * periodo))
-    elif periodo == 0.5:
-        start_date = now - timedelta(days=14)
-    elif periodo == 0.25:
-        start_date = now - timedelta(days=7)
-    else:
-        raise HTTPException(status_code=400, detail="Período no válido")
-
-    categorias_cursor = categorias_db.find({"usuario_id": usuario_id, "deleted": 0})
-    categorias = await categorias_cursor.to_list(length=None)
-
-    categorias_parsed = []
-    for categoria in categorias:
-        categoria["_id"] = str(categoria["_id"])
-        gastos_cursor = gastos_db.find(
-            {
-                "usuario_id": usuario_id,
-                "categoria_id": categoria["_id"],
-                "fecha": {"$gte": start_date, "$lte": (now + timedelta(days=1))},
+def _pipeline_categorias_con_gasto(usuario_id: str, start_date: datetime, end_date: datetime) -> list:
+    """
+    Pipeline que une cada categoría activa del usuario con la suma de sus
+    acumulados diarios (`gastos_diarios`) dentro del rango indicado.
+    """
+    return [
+        {"$match": {"usuario_id": usuario_id, "deleted": 0}},
+        {
+            "$lookup": {
+                "from": COLECCION_GASTOS_DIARIOS,
+                "let": {"categoria_id": {"$toString": "$_id"}},
+                "pipeline": [
+                    {
+                        "$match": {
+                            "usuario_id": usuario_id,
+                            "dia": {"$gte": inicio_del_dia(start_date), "$lte": end_date},
+                            "$expr": {"$eq": ["$categoria_id", "$$categoria_id"]},
+                        }
+                    },
+                    {"$group": {"_id": None, "total": {"$sum": "$total"}}},
+                ],
+                "as": "gastos_periodo",
             }
-        )
-        gastos = await gastos_cursor.to_list(length=None)
-        total_gastado = sum(gasto["monto"] for gasto in gastos)
-        categoria["gasto_actual"] = total_gastado
-
-        categorias_parsed.append(CategoriaGastoGet(**categoria))
+        },
+        {
+            "$addFields": {
+                "_id": {"$toString": "$_id"},
+                # Las categorías sin gastos en el período no traen grupo: se reporta 0
+                "gasto_actual": {"$ifNull": [{"$arrayElemAt": ["$gastos_periodo.total", 0]}, 0]},
+            }
+        },
+        {"$project": {"gastos_periodo": 0}},
+    ]
 
-    return categorias_parsed
+async def obtener_categorias_gasto(usuario_id: str, periodo: float):
+    """
+    Obtiene las categorías activas del usuario con el gasto del período,
+    sumado en MongoDB en una sola agregación.
+    """
+    categorias_db: AsyncIOMotorCollection = mongo_connection.database["categorias_gasto"]
 
-async def obtener_gastos(usuario_id: str):
-    db: AsyncIOMotorCollection = mongo_connection.database["gastos"]
-    gastos_cursor = db.find({"usuario_id": usuario_id})
-    gastos = await gastos_cursor.to_list(length=None)
-    gastos_parsed = []
+    start_date = _calcular_fecha_inicio(periodo)
+    end_date = datetime.now() + timedelta(days=1)
 
-    for gasto in gastos:
-        gasto["_id"] = str(gasto["_id"])
+    pipeline = _pipeline_categorias_con_gasto(usuario_id, start_date, end_date)
+    categorias = await categorias_db.aggregate(pipeline).to_list(length=None)
+    return [CategoriaGastoGet(**categoria) for categoria in categorias]
 
-        gastos_parsed.append(GastoGet(**gasto))
+def _rango_fechas(desde: Optional[date], hasta: Optional[date]) -> tuple:
+    """
+    Convierte un rango de días (ambos extremos inclusive) en el intervalo
+    [desde, hasta) de fechas con hora.
+    """
+    inicio = datetime.combine(desde, datetime.min.time()) if desde else None
+    fin = datetime.combine(hasta, datetime.min.time()) + timedelta(days=1) if hasta else None
+    return inicio, fin
 
-    return gastos_parsed
+async def _listar_todo(tipo: str, usuario_id: str, inicio, fin, referencia: Optional[str] = None) -> list:
+    """
+    Todas las transacciones del rango, recorriendo las páginas de mayor tamaño.
+    """
+    documentos, cursor = [], None
+    while True:
+        pagina, cursor = await transacciones_service.listar_pagina(
+            tipo, usuario_id, TAMANO_PAGINA_MAXIMO, cursor, inicio, fin, referencia
+        )
+        documentos.extend(pagina)
+        if cursor is None:
+            return documentos
+
+async def obtener_gastos(
+    usuario_id: str,
+    limite: Optional[int] = None,
+    cursor: Optional[str] = None,
+    desde: Optional[date] = None,
+    hasta: Optional[date] = None,
+    categoria_id: Optional[str] = None
+):
+    """
+    Sin `limite` ni `cursor` devuelve todos los gastos del rango, como antes de
+    la paginación; con alguno de ellos, una página y el cursor siguiente.
+    """
+    inicio, fin = _rango_fechas(desde, hasta)
+    if limite is None and cursor is None:
+        gastos, next_cursor = await _listar_todo("gastos", usuario_id, inicio, fin, categoria_id), None
+    else:
+        gastos, next_cursor = await transacciones_service.listar_pagina(
+            "gastos", usuario_id, limite, cursor, inicio, fin, categoria_id
+        )
+    return PaginaGastos(items=gastos_adapter.validate_python(gastos), next_cursor=next_cursor)
 
 
-async def obtener_ingresos(usuario_id: str):
-    db: AsyncIOMotorCollection = mongo_connection.database["ingresos"]
-    ingresos_cursor = db.find({"usuario_id": usuario_id})
-    ingresos = await ingresos_cursor.to_list(length=None)
-    for ingreso in ingresos:
-        ingreso["_id"] = str(ingreso["_id"])
-    ingresos_parsed = [Ingreso(**ingreso) for ingreso in ingresos]
-    return ingresos_parsed
+async def obtener_ingresos(
+    usuario_id: str,
+    limite: Optional[int] = None,
+    cursor: Optional[str] = None,
+    desde: Optional[date] = None,
+    hasta: Optional[date] = None
+):
+    """
+    Igual que `obtener_gastos`: paginado solo si se pide `limite` o `cursor`.
+    """
+    inicio, fin = _rango_fechas(desde, hasta)
+    if limite is None and cursor is None:
+        ingresos, next_cursor = await _listar_todo("ingresos", usuario_id, inicio, fin), None
+    else:
+        ingresos, next_cursor = await transacciones_service.listar_pagina("ingresos", usuario_id, limite, cursor, inicio, fin)
+    return PaginaIngresos(items=ingresos_adapter.validate_python(ingresos), next_cursor=next_cursor)
 
 
 async def registrar_ingreso(usuario_id: str, ingreso_data: IngresoCreate):
     ingreso_data_dict = ingreso_data.model_dump()
     ingreso_data_dict['usuario_id'] = usuario_id
-    db: AsyncIOMotorCollection = mongo_connection.database["metas_ahorro"]
-    result = await db.insert_one(ingreso_data_dict)
-    return {"message": "Ingreso registrado", "ingreso_id": str(result.inserted_id)}
+    ingreso_id = await transacciones_service.insertar("ingresos", ingreso_data_dict)
+    await acumular_resumen_mensual(usuario_id, ingreso_data.fecha, ingresos=ingreso_data.monto)
+    return {"message": "Ingreso registrado", "ingreso_id": str(ingreso_id)}
 
 async def obtener_datos_financieros(usuario_id: str):
     db: AsyncIOMotorCollection = mongo_connection.database["usuarios_financieros"]
     datos_cursor = db.find({"usuario_id": usuario_id})
     datos = await datos_cursor.to_list(length=None)
-
-    for dato in datos:
-        dato["_id"] = str(dato["_id"])
-
-    datos_parsed = [UsuarioFinanciero(**dato) for dato in datos]
-    return datos_parsed
+    return usuarios_financieros_adapter.validate_python(datos)
 
 async def obtener_meta_by_id(meta_id: str):
     db: AsyncIOMotorCollection = mongo_connection.database["metas_ahorro"]
@@ -252,13 +476,7 @@ async def obtener_meta_by_id(meta_id: str):
     return meta_parsed
 
 async def obtener_abonos_by_meta_id(meta_id: str, limit: Optional[int] = None):
-    db: AsyncIOMotorCollection = mongo_connection.database["ingresos"]
-
-    ingresos_cursor = db.find({"meta_id": meta_id})
-    if limit:
-        ingresos_cursor = ingresos_cursor.limit(limit)
-    
-    ingresos = await ingresos_cursor.to_list(length=None)
+    ingresos = await transacciones_service.listar_abonos(meta_id, limit)
 
     for ingreso in ingresos:
         ingreso["_id"] = str(ingreso["_id"])
@@ -267,44 +485,55 @@ async def obtener_abonos_by_meta_id(meta_id: str, limit: Optional[int] = None):
 
 async def get_resumen(usuario_id: str, periodo: int):
     categorias_db: AsyncIOMotorCollection = mongo_connection.database["categorias_gasto"]
-    gastos_db: AsyncIOMotorCollection = mongo_connection.database["gastos"]
 
     now = datetime.now()
-    if periodo >= 1:
-        start_date = now - timedelta(days=(30 * periodo))
-    elif periodo == 0.5:
-        start_date = now - timedelta(days=14)
-    elif periodo == 0.25:
-        start_date = now - timedelta(days=7)
-    else:
-        raise HTTPException(status_code=400, detail="Período no válido")
-
-    categorias_cursor = categorias_db.find({"usuario_id": usuario_id, "deleted": 0})
-    categorias = await categorias_cursor.to_list(length=None)   
+    start_date = _calcular_fecha_inicio(periodo, now)
+
+    pipeline = _pipeline_categorias_con_gasto(usuario_id, start_date, now + timedelta(days=1)) + [
+        {
+            "$group": {
+                "_id": None,
+                "gasto_total": {"$sum": "$gasto_actual"},
+                "limite_total": {"$sum": "$limite_gasto"},
+            }
+        }
+    ]
+    totales = await categorias_db.aggregate(pipeline).to_list(length=1)
 
     resumen = {}
 
-    total_gastado = 0
-    limite_total = 0
-    for categoria in categorias:
-        categoria["_id"] = str(categoria["_id"])
-        gastos_cursor = gastos_db.find(
-            {
-                "usuario_id": usuario_id,
-                "categoria_id": categoria["_id"],
-                "fecha": {"$gte": start_date, "$lte": (now + timedelta(days=1))},
-            }
-        )
-        gastos = await gastos_cursor.to_list(length=None)
-        total_gastado += sum(gasto["monto"] for gasto in gastos) or 0
-        limite_total += categoria["limite_gasto"]
-        
+    total_gastado = totales[0]["gasto_total"] if totales else 0
+    limite_total = totales[0]["limite_total"] if totales else 0
+
     resumen["gasto_total"] = total_gastado
     resumen["limite_total"] = limite_total
     resumen["balance"] = limite_total - total_gastado
 
     return resumen
 
+async def obtener_resumenes_mensuales(usuario_id: str, desde: Optional[date] = None, hasta: Optional[date] = None):
+    """
+    Obtiene los resúmenes mensuales del usuario entre dos meses (inclusive).
+    Por defecto devuelve los últimos 12 meses.
+    """
+    db: AsyncIOMotorCollection = mongo_connection.database[COLECCION_RESUMENES_MENSUAL]
+
+    hasta = inicio_del_mes(hasta or datetime.now())
+    if desde is None:
+        meses = hasta.year * 12 + hasta.month - 1 - 11
+        desde = datetime(meses // 12, meses % 12 + 1, 1)
+    else:
+        desde = inicio_del_mes(desde)
+
+    if desde > hasta:
+        raise HTTPException(status_code=400, detail="Rango de meses no válido")
+
+    resumenes_cursor = db.find({"usuario_id": usuario_id, "fecha": {"$gte": desde, "$lte": hasta}}).sort("fecha", 1)
+    resumenes = await resumenes_cursor.to_list(length=None)
+    for resumen in resumenes:
+        resumen["_id"] = str(resumen["_id"])
+    return [ResumenMensual(**resumen) for resumen in resumenes]
+
 async def eliminar_categoria(usuario_id: str, categoria_id: str):
     db: AsyncIOMotorCollection = mongo_connection.database["categorias_gasto"]
     try:
@@ -320,4 +549,61 @@ async def eliminar_categoria(usuario_id: str, categoria_id: str):
     if result.modified_count == 0:
         raise HTTPException(status_code=500, detail="No se pudo eliminar la categoría")
 
-    return {"message": "Categoría eliminada correctamente"}
\ No newline at end of file
+    return {"message": "Categoría eliminada correctamente"}
+
+async def _medir(tiempos: dict, seccion: str, coroutine):
+    inicio = time.perf_counter()
+    try:
+        return await coroutine
+    finally:
+        tiempos[seccion] = (time.perf_counter() - inicio) * 1000
+
+async def obtener_dashboard(usuario_id: str, periodo: float, limite_recientes: int):
+    """
+    Reúne en una sola respuesta los datos de la pantalla principal, consultando
+    cada sección en paralelo. Las categorías y el resumen salen de la misma
+    agregación del período. Devuelve el tablero y el tiempo de cada sección (ms).
+    """
+    categorias_db: AsyncIOMotorCollection = mongo_connection.database["categorias_gasto"]
+
+    now = datetime.now()
+    start_date = _calcular_fecha_inicio(periodo, now)
+    pipeline = _pipeline_categorias_con_gasto(usuario_id, start_date, now + timedelta(days=1))
+
+    tiempos = {}
+    metas, categorias, datos, gastos_recientes = await asyncio.gather(
+        _medir(tiempos, "metas", obtener_metas_ahorro(usuario_id)),
+        _medir(tiempos, "categorias", categorias_db.aggregate(pipeline).to_list(length=None)),
+        _medir(tiempos, "datos_financieros", obtener_datos_financieros(usuario_id)),
+        _medir(tiempos, "gastos_recientes", obtener_gastos(usuario_id, limite=limite_recientes)),
+    )
+
+    gasto_total = sum(categoria["gasto_actual"] for categoria in categorias)
+    limite_total = sum(categoria["limite_gasto"] for categoria in categorias)
+
+    dashboard = Dashboard(
+        metas=metas,
+        categorias=[CategoriaGastoGet(**categoria) for categoria in categorias],
+        resumen={
+            "gasto_total": gasto_total,
+            "limite_total": limite_total,
+            "balance": limite_total - gasto_total,
+        },
+        datos_financieros=datos,
+        gastos_recientes=gastos_recientes.items,
+    )
+    return dashboard, tiempos
+
+async def obtener_analitica_gastos(usuario_id: str, dias: int, ventana: int):
+    """
+    Series diarias, medias móviles y proyección del mes por categoría.
+    """
+    analitica = await analytics_service.analizar_gastos(usuario_id, dias, ventana)
+    return AnaliticaGastos(**analitica)
+
+async def obtener_proyeccion_metas(usuario_id: str, dias: int):
+    """
+    Ritmo de abono, fecha estimada y aporte mensual necesario de todas las metas.
+    """
+    proyeccion = await analytics_service.proyectar_metas(usuario_id, dias)
+    return ProyeccionMetas(**proyeccion)
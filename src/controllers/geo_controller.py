@@ -1,13 +1,20 @@
-from sqlalchemy.orm import Session
+import hashlib
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Mapping, Optional
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.db.postgresql.config import AsyncSessionLocal
 from src.models.user_models import Estado, Pais
 from src.schemas.geo_schemas import Pais as PaisSchema, EstadoGet, Estado as EstadoSchema
 
-def obtener_estados(db: Session) -> list[EstadoGet]:
+async def obtener_estados(db: AsyncSession) -> list[EstadoGet]:
     """
     Obtiene todos los estados con su país correspondiente.
     """
     query = (
-        db.query(
+        select(
             Estado.id,
             Estado.nombre,
             Pais.nombre.label("pais")
@@ -15,23 +22,97 @@ def obtener_estados(db: Session) -> list[EstadoGet]:
         .join(Pais, Estado.pais_id == Pais.id)
         .order_by(Estado.nombre)
     )
-    estados = query.all()
+    estados = (await db.execute(query)).all()
 
     return [EstadoGet(id=estado.id, nombre=estado.nombre, pais=estado.pais) for estado in estados]
 
-def obtener_estados_by_pais(db: Session, pais_id: int) -> list[EstadoSchema]:
+async def obtener_estados_by_pais(db: AsyncSession, pais_id: int) -> list[EstadoSchema]:
     """
     Obtiene todos los estados de un país específico por su ID.
     """
-    estados = db.query(Estado).filter(Estado.pais_id == pais_id).all()
+    estados = (await db.execute(select(Estado).where(Estado.pais_id == pais_id))).scalars().all()
     return estados
 
 
-def obtener_paises(db: Session) -> list[PaisSchema]:
+async def obtener_paises(db: AsyncSession) -> list[PaisSchema]:
     """
     Obtiene todos los países disponibles.
     """
-    query = db.query(Pais).order_by(Pais.nombre)
-    paises = query.all()
+    query = select(Pais).order_by(Pais.nombre)
+    paises = (await db.execute(query)).scalars().all()
 
-    return [PaisSchema(id=pais.id, nombre=pais.nombre) for pais in paises]
\ No newline at end of file
+    return [PaisSchema(id=pais.id, nombre=pais.nombre) for pais in paises]
+
+
+@dataclass(frozen=True)
+class RespuestaGeo:
+    """
+    Cuerpo JSON ya serializado junto con su ETag.
+    """
+    contenido: bytes
+    etag: str
+
+    @classmethod
+    def desde_bytes(cls, contenido: bytes) -> "RespuestaGeo":
+        return cls(contenido=contenido, etag='"' + hashlib.sha256(contenido).hexdigest()[:32] + '"')
+
+
+@dataclass(frozen=True)
+class CatalogoGeo:
+    """
+    Índice inmutable de países y estados, listo para responder sin consultar la base de datos.
+    """
+    paises: RespuestaGeo
+    estados: RespuestaGeo
+    estados_por_pais: Mapping[int, RespuestaGeo]
+
+    def estados_de(self, pais_id: int) -> RespuestaGeo:
+        return self.estados_por_pais.get(pais_id, _SIN_ESTADOS)
+
+
+_SIN_ESTADOS = RespuestaGeo.desde_bytes(b"[]")
+_paises_adapter = TypeAdapter(list[PaisSchema])
+_estados_adapter = TypeAdapter(list[EstadoGet])
+_estados_pais_adapter = TypeAdapter(list[EstadoSchema])
+
+_catalogo: Optional[CatalogoGeo] = None
+
+async def construir_catalogo(db: AsyncSession) -> CatalogoGeo:
+    """
+    Lee países y estados una sola vez y pre-serializa todas las respuestas de `/geo`.
+    """
+    paises = await obtener_paises(db)
+    estados = await obtener_estados(db)
+
+    query = select(Estado).order_by(Estado.pais_id, Estado.id)
+    estados_por_pais = {}
+    for estado in (await db.execute(query)).scalars().all():
+        estados_por_pais.setdefault(estado.pais_id, []).append(EstadoSchema.model_validate(estado))
+
+    return CatalogoGeo(
+        paises=RespuestaGeo.desde_bytes(_paises_adapter.dump_json(paises)),
+        estados=RespuestaGeo.desde_bytes(_estados_adapter.dump_json(estados)),
+        estados_por_pais=MappingProxyType({
+            pais_id: RespuestaGeo.desde_bytes(_estados_pais_adapter.dump_json(lista))
+            for pais_id, lista in estados_por_pais.items()
+        }),
+    )
+
+async def recargar_catalogo() -> CatalogoGeo:
+    """
+    Vuelve a leer el catálogo desde PostgreSQL y reemplaza el que está en memoria.
+    """
+    global _catalogo
+    async with AsyncSessionLocal() as db:
+        catalogo = await construir_catalogo(db)
+    _catalogo = catalogo
+    return catalogo
+
+async def obtener_catalogo() -> CatalogoGeo:
+    """
+    Devuelve el catálogo en memoria, cargándolo la primera vez que se necesita.
+    """
+    # Dos cargas simultáneas en frío son inofensivas: ambas producen el mismo catálogo
+    if _catalogo is None:
+        return await recargar_catalogo()
+    return _catalogo
@@ -1,4 +1,7 @@
-from sqlalchemy.orm import Session
+import asyncio
+import os
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from motor.motor_asyncio import AsyncIOMotorCollection
 from fastapi import HTTPException
 from src.models import user_models
@@ -6,25 +9,59 @@ from src.models.financial_models import UsuarioFinancieroModel
 from src.schemas.user_schemas import UsuarioGet, UsuarioUpdate
 from typing import Dict
 from src.db.mongodb.config import mongo_connection
+from src.services.cache_service import TTLCache
+from src.services.principal_service import invalidar_principal
 from datetime import date
 
-async def obtener_detalles(db: Session, usuario_id: str):
-    user = db.query(user_models.Usuario).filter(user_models.Usuario.id == usuario_id).first()
+# Perfiles ya armados (`UsuarioGet`) por id de usuario. La invalidación al
+# modificarlo solo alcanza a este proceso: el TTL corto acota cuánto puede
+# servir otro worker un perfil viejo (los campos de PostgreSQL, tomados del
+# usuario autenticado, pueden tener además la antigüedad de `principal_cache`)
+perfil_cache = TTLCache(
+    maxsize=int(os.getenv("PERFIL_CACHE_TAMANO", "4096")),
+    ttl=float(os.getenv("PERFIL_CACHE_TTL_SEGUNDOS", "5"))
+)
+
+async def _buscar_usuario(db: AsyncSession, usuario_id: str):
+    query = select(user_models.Usuario).where(user_models.Usuario.id == usuario_id)
+    return (await db.execute(query)).scalars().first()
+
+async def obtener_detalles(db: AsyncSession, usuario_id: str, principal=None):
+    """
+    Arma el perfil del usuario (PostgreSQL + MongoDB). Si el middleware ya cargó
+    la fila del usuario se reutiliza; el resultado queda en caché unos segundos o
+    hasta que el usuario se modifique.
+    """
+    detailed_user = perfil_cache.get(usuario_id)
+    if detailed_user is not None:
+        return detailed_user
+    # Si el usuario se modifica mientras se lee, el perfil leído no se cachea
+    generacion = perfil_cache.generacion()
 
     financial_db: AsyncIOMotorCollection = mongo_connection.database["usuarios_financieros"]
-    financial_user = await financial_db.find_one({"usuario_id": usuario_id})
+
+    if isinstance(principal, user_models.Usuario):
+        user = principal
+        financial_user = await financial_db.find_one({"usuario_id": usuario_id})
+    else:
+        user, financial_user = await asyncio.gather(
+            _buscar_usuario(db, usuario_id),
+            financial_db.find_one({"usuario_id": usuario_id})
+        )
+
+    if not user:
+        raise HTTPException(status_code=404, detail="Usuario no encontrado")
 
     if financial_user:
         financial_user.pop("_id", None)
 
     combined_data = {
-            **user.__dict__,
+            **{column: getattr(user, column) for column in get_sql_model_columns(user_models.Usuario)},
             **(financial_user or {}),
     }
 
-    combined_data.pop("_sa_instance_state", None)
-
     detailed_user = UsuarioGet(**combined_data)
+    perfil_cache.set(usuario_id, detailed_user, generacion=generacion)
 
     return detailed_user
 
@@ -41,7 +78,7 @@ def get_sql_model_columns(model) -> set:
     """
     return set(c.name for c in model.__table__.columns)
 
-async def actualizar_usuario(db: Session, usuario_id: str, usuario_data: UsuarioUpdate):
+async def actualizar_usuario(db: AsyncSession, usuario_id: str, usuario_data: UsuarioUpdate):
     """
     Modificar los datos de un usuario (excepto contraseña y fecha de registro)
     """
@@ -49,15 +86,15 @@ async def actualizar_usuario(db: Session, usuario_id: str, usuario_data: Usuario
     sql_columns = get_sql_model_columns(user_models.Usuario)
     sql_data = {key: value for key, value in usuario_data_dict.items() if key in sql_columns}
 
-    user = db.query(user_models.Usuario).filter(user_models.Usuario.id == usuario_id).first()
+    user = await _buscar_usuario(db, usuario_id)
     if not user:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
 
     for key, value in sql_data.items():
         setattr(user, key, value)
 
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    invalidar_principal(usuario_id)
 
     financial_db: AsyncIOMotorCollection = mongo_connection.database["usuarios_financieros"]
     financial_columns = set(UsuarioFinancieroModel.__annotations__.keys())
@@ -67,6 +104,8 @@ async def actualizar_usuario(db: Session, usuario_id: str, usuario_data: Usuario
         {"usuario_id": usuario_id},
         {"$set": financial_data}
     )
+    # Se invalida después de ambas escrituras para no volver a cachear datos viejos
+    perfil_cache.pop(usuario_id)
 
     if financial_result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Usuario financiero no encontrado")
@@ -1,8 +1,10 @@
 from motor.motor_asyncio import AsyncIOMotorClient
 from functools import lru_cache
 from pydantic_settings import BaseSettings  # Cambiado
+from typing import Optional
 import os
 from dotenv import load_dotenv
+from src.db.mongodb.monitoring import mongo_command_monitor, mongo_pool_monitor
 
 load_dotenv()
 
@@ -15,6 +17,12 @@ def get_database_name():
 class MongoDBSettings(BaseSettings):
     MONGO_URI: str = get_database_url()
     MONGO_DB_NAME: str = get_database_name()
+    MONGO_MAX_POOL_SIZE: int = 100
+    MONGO_MIN_POOL_SIZE: int = 0
+    MONGO_MAX_IDLE_TIME_MS: Optional[int] = None
+    MONGO_CONNECT_TIMEOUT_MS: int = 20000
+    MONGO_SERVER_SELECTION_TIMEOUT_MS: int = 30000
+    MONGO_WAIT_QUEUE_TIMEOUT_MS: Optional[int] = None
 
 @lru_cache
 def get_mongo_settings() -> MongoDBSettings:
@@ -28,7 +36,16 @@ class MongoDBConnection:
     async def connect(self):
         """Inicia la conexión con MongoDB."""
         settings = get_mongo_settings()
-        self._client = AsyncIOMotorClient(settings.MONGO_URI)
+        self._client = AsyncIOMotorClient(
+            settings.MONGO_URI,
+            maxPoolSize=settings.MONGO_MAX_POOL_SIZE,
+            minPoolSize=settings.MONGO_MIN_POOL_SIZE,
+            maxIdleTimeMS=settings.MONGO_MAX_IDLE_TIME_MS,
+            connectTimeoutMS=settings.MONGO_CONNECT_TIMEOUT_MS,
+            serverSelectionTimeoutMS=settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+            waitQueueTimeoutMS=settings.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+            event_listeners=[mongo_pool_monitor, mongo_command_monitor],
+        )
         self._db = self._client[settings.MONGO_DB_NAME]
 
     async def close(self):
@@ -0,0 +1,310 @@
+"""
+Registro declarativo de los índices de MongoDB.
+
+`INDICES` describe, por colección, los índices que necesitan las consultas de los
+controladores. `sincronizar_indices` los reconcilia al arrancar la aplicación: crea los
+que faltan, recrea los que cambiaron de definición y deja intactos los que ya coinciden.
+Un índice previo con la misma clave pero otro nombre (p. ej. el nombre automático
+`usuario_id_1_categoria_id_1_dia_1`) se reemplaza por el declarado.
+
+Uso como comando (contra un mongod local):
+    python -m src.db.mongodb.indexes sincronizar
+    python -m src.db.mongodb.indexes verificar
+
+`verificar` ejecuta `explain()` sobre las consultas de `CONSULTAS` y sobre las
+agregaciones de `agregaciones()`, armadas con los mismos constructores que usan los
+servicios (incluidos sus `$lookup` y `$unionWith`), y termina con código 1 si alguna
+hace un COLLSCAN. Los `$lookup` solo se ejecutan sobre documentos existentes, así que
+conviene verificar con un usuario que tenga datos (`--usuario`; por defecto se toma
+uno de `categorias_gasto`).
+"""
+import argparse
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+from src.db.mongodb.config import mongo_connection
+
+logger = logging.getLogger(__name__)
+
+INDICES = {
+    "metas_ahorro": [
+        IndexModel([("usuario_id", ASCENDING)], name="usuario"),
+    ],
+    "categorias_gasto": [
+        IndexModel(
+            [("usuario_id", ASCENDING)],
+            name="usuario_activas",
+            partialFilterExpression={"deleted": 0}
+        ),
+    ],
+    # (fecha, _id) es la clave de la paginación por cursor
+    "gastos": [
+        IndexModel(
+            [("usuario_id", ASCENDING), ("fecha", DESCENDING), ("_id", DESCENDING)],
+            name="usuario_fecha"
+        ),
+        IndexModel(
+            [("usuario_id", ASCENDING), ("categoria_id", ASCENDING), ("fecha", DESCENDING), ("_id", DESCENDING)],
+            name="usuario_categoria_fecha"
+        ),
+    ],
+    "ingresos": [
+        IndexModel(
+            [("usuario_id", ASCENDING), ("fecha", DESCENDING), ("_id", DESCENDING)],
+            name="usuario_fecha"
+        ),
+        IndexModel([("meta_id", ASCENDING), ("fecha", DESCENDING)], name="meta_fecha"),
+    ],
+    # Layout por buckets (`TRANSACCIONES_LAYOUT=buckets`): un documento por usuario y mes
+    "gastos_buckets": [
+        IndexModel([("usuario_id", ASCENDING), ("mes", DESCENDING)], name="usuario_mes"),
+    ],
+    "ingresos_buckets": [
+        IndexModel([("usuario_id", ASCENDING), ("mes", DESCENDING)], name="usuario_mes"),
+        IndexModel([("items.meta", ASCENDING), ("mes", DESCENDING)], name="meta_mes"),
+    ],
+    # Archivo de transacciones antiguas: bloques comprimidos por usuario y mes
+    "gastos_archivo": [
+        IndexModel([("usuario_id", ASCENDING), ("mes", DESCENDING)], name="usuario_mes"),
+        IndexModel([("estado", ASCENDING)], name="pendientes", partialFilterExpression={"estado": "pendiente"}),
+    ],
+    "ingresos_archivo": [
+        IndexModel([("usuario_id", ASCENDING), ("mes", DESCENDING)], name="usuario_mes"),
+        IndexModel([("referencias", ASCENDING), ("mes", DESCENDING)], name="referencias_mes"),
+        IndexModel([("estado", ASCENDING)], name="pendientes", partialFilterExpression={"estado": "pendiente"}),
+    ],
+    "usuarios_financieros": [
+        IndexModel([("usuario_id", ASCENDING)], name="usuario", unique=True),
+    ],
+    "gastos_diarios": [
+        IndexModel(
+            [("usuario_id", ASCENDING), ("categoria_id", ASCENDING), ("dia", ASCENDING)],
+            name="usuario_categoria_dia",
+            unique=True
+        ),
+    ],
+    "resumenes_mensual": [
+        IndexModel([("usuario_id", ASCENDING), ("fecha", ASCENDING)], name="usuario_fecha", unique=True),
+    ],
+    # MongoDB borra cada revocación cuando vence el token
+    "tokens_revocados": [
+        IndexModel([("exp", ASCENDING)], name="expiracion", expireAfterSeconds=0),
+    ],
+}
+
+# Opciones que forman parte de la definición de un índice al compararlo con el existente
+_OPCIONES_COMPARADAS = ("unique", "sparse", "partialFilterExpression", "expireAfterSeconds")
+
+
+def _misma_clave(deseado: dict, existente: dict) -> bool:
+    return list(deseado["key"].items()) == list(existente["key"].items())
+
+
+def _misma_definicion(deseado: dict, existente: dict) -> bool:
+    if not _misma_clave(deseado, existente):
+        return False
+    return all(deseado.get(opcion) == existente.get(opcion) for opcion in _OPCIONES_COMPARADAS)
+
+
+async def sincronizar_indices(db, indices: Optional[dict] = None):
+    """
+    Reconcilia de forma idempotente los índices declarados en `INDICES`.
+    Los índices existentes que no están en el registro no se tocan, salvo los que
+    tienen la misma clave que uno declarado: MongoDB no admite crear el declarado
+    junto a ellos (IndexOptionsConflict), así que se reemplazan.
+    """
+    indices = INDICES if indices is None else indices
+
+    for nombre_coleccion, modelos in indices.items():
+        coleccion = db[nombre_coleccion]
+        existentes = {indice["name"]: indice async for indice in coleccion.list_indexes()}
+        declarados = {modelo.document["name"] for modelo in modelos}
+
+        faltantes = []
+        for modelo in modelos:
+            deseado = modelo.document
+            existente = existentes.get(deseado["name"])
+            if existente is None:
+                anteriores = [
+                    nombre for nombre, indice in existentes.items()
+                    if nombre != "_id_" and nombre not in declarados and _misma_clave(deseado, indice)
+                ]
+                for nombre in anteriores:
+                    logger.info("Reemplazando índice %s.%s por %s", nombre_coleccion, nombre, deseado["name"])
+                    await coleccion.drop_index(nombre)
+                    del existentes[nombre]
+                faltantes.append(modelo)
+            elif not _misma_definicion(deseado, existente):
+                logger.info("Recreando índice %s.%s", nombre_coleccion, deseado["name"])
+                await coleccion.drop_index(deseado["name"])
+                faltantes.append(modelo)
+
+        if not faltantes:
+            continue
+
+        try:
+            await coleccion.create_indexes(faltantes)
+        except OperationFailure as error:
+            # Un índice único sobre datos duplicados no debe impedir el arranque
+            logger.error("No se pudieron crear índices en %s: %s", nombre_coleccion, error)
+
+
+# Consultas representativas de los controladores: (colección, filtro, orden)
+_USUARIO = "00000000-0000-0000-0000-000000000000"
+_CATEGORIA = "000000000000000000000000"
+_AHORA = datetime(2024, 1, 1)
+_RANGO = {"$gte": _AHORA - timedelta(days=30), "$lte": _AHORA}
+_ORDEN_PAGINA = [("fecha", DESCENDING), ("_id", DESCENDING)]
+
+CONSULTAS = [
+    ("metas_ahorro", {"usuario_id": _USUARIO}, None),
+    # Listado de categorías y validación de `importar_gastos`
+    ("categorias_gasto", {"usuario_id": _USUARIO, "deleted": 0}, None),
+    ("gastos", {"usuario_id": _USUARIO, "fecha": _RANGO}, _ORDEN_PAGINA),
+    ("gastos", {"usuario_id": _USUARIO, "categoria_id": _CATEGORIA, "fecha": _RANGO}, _ORDEN_PAGINA),
+    ("ingresos", {"usuario_id": _USUARIO, "fecha": _RANGO}, _ORDEN_PAGINA),
+    ("ingresos", {"meta_id": _CATEGORIA}, [("fecha", DESCENDING)]),
+    ("gastos_buckets", {"usuario_id": _USUARIO, "mes": _RANGO}, [("mes", DESCENDING)]),
+    ("ingresos_buckets", {"usuario_id": _USUARIO, "mes": _RANGO}, [("mes", DESCENDING)]),
+    ("ingresos_buckets", {"items.meta": _CATEGORIA}, [("mes", DESCENDING)]),
+    ("gastos_archivo", {"usuario_id": _USUARIO, "mes": _RANGO}, [("mes", DESCENDING)]),
+    ("ingresos_archivo", {"referencias": _CATEGORIA}, [("mes", DESCENDING)]),
+    ("usuarios_financieros", {"usuario_id": _USUARIO}, None),
+    ("gastos_diarios", {"usuario_id": _USUARIO, "categoria_id": _CATEGORIA, "dia": _RANGO}, None),
+    ("resumenes_mensual", {"usuario_id": _USUARIO, "fecha": _RANGO}, [("fecha", ASCENDING)]),
+]
+
+
+def _etapas(plan) -> set:
+    """
+    Devuelve todas las etapas (`stage`) presentes en un plan de ejecución.
+    """
+    etapas = set()
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            etapas.add(plan["stage"])
+        for valor in plan.values():
+            etapas |= _etapas(valor)
+    elif isinstance(plan, list):
+        for valor in plan:
+            etapas |= _etapas(valor)
+    return etapas
+
+
+async def verificar_consultas(db, consultas: Optional[list] = None) -> list:
+    """
+    Ejecuta `explain()` sobre cada consulta y devuelve las que usan COLLSCAN.
+    """
+    consultas = CONSULTAS if consultas is None else consultas
+
+    fallidas = []
+    for nombre_coleccion, filtro, orden in consultas:
+        cursor = db[nombre_coleccion].find(filtro)
+        if orden:
+            cursor = cursor.sort(orden)
+        plan = await cursor.explain()
+        if "COLLSCAN" in _etapas(plan["queryPlanner"]["winningPlan"]):
+            fallidas.append((nombre_coleccion, filtro))
+    return fallidas
+
+
+def agregaciones(usuario_id: str = _USUARIO) -> list:
+    """
+    Agregaciones de los servicios y controladores para `usuario_id`, en ambos
+    layouts de transacciones: (nombre, colección, pipeline).
+    """
+    # Importación diferida: estos módulos importan `INDICES` de aquí
+    from src.controllers.financial_controller import _pipeline_categorias_con_gasto
+    from src.services import analytics_service, rollup_service, transacciones_service
+
+    desde = _AHORA - timedelta(days=30)
+    # Lo bastante atrás para que los pipelines que lo admiten incluyan el archivo
+    desde_archivo = _AHORA - timedelta(days=730)
+
+    resultado = [
+        ("categorias_con_gasto", "categorias_gasto", _pipeline_categorias_con_gasto(usuario_id, desde, _AHORA)),
+        ("series_analitica", "categorias_gasto", analytics_service._pipeline_series(usuario_id, desde, _AHORA)),
+        ("acumulados_gastos", *rollup_service._pipeline_acumulados(usuario_id)),
+    ]
+    for layout in (transacciones_service.LAYOUT_PLANO, transacciones_service.LAYOUT_BUCKETS):
+        for tipo in (transacciones_service.GASTOS, transacciones_service.INGRESOS):
+            resultado.append((
+                f"origen_{tipo}_{layout}",
+                *transacciones_service.origen(tipo, usuario_id, layout, desde, _AHORA),
+            ))
+            resultado.append((
+                f"totales_{tipo}_{layout}",
+                *transacciones_service.pipeline_totales_por_referencia(tipo, usuario_id, desde_archivo, layout),
+            ))
+    return resultado
+
+
+def _escaneos_lookup(plan) -> int:
+    """
+    Suma los `collectionScans` que reportan los `$lookup` con verbosidad executionStats.
+    """
+    if isinstance(plan, dict):
+        return plan.get("collectionScans", 0) + sum(_escaneos_lookup(valor) for valor in plan.values())
+    if isinstance(plan, list):
+        return sum(_escaneos_lookup(valor) for valor in plan)
+    return 0
+
+
+async def verificar_agregaciones(db, consultas: Optional[list] = None) -> list:
+    """
+    Ejecuta `explain` (executionStats) sobre cada agregación y devuelve las que
+    hacen un COLLSCAN en cualquiera de sus etapas, incluidos `$lookup` y `$unionWith`.
+    """
+    consultas = agregaciones() if consultas is None else consultas
+
+    fallidas = []
+    for nombre, nombre_coleccion, pipeline in consultas:
+        plan = await db.command(
+            "explain",
+            {"aggregate": nombre_coleccion, "pipeline": pipeline, "cursor": {}},
+            verbosity="executionStats"
+        )
+        if "COLLSCAN" in _etapas(plan) or _escaneos_lookup(plan):
+            fallidas.append((nombre, nombre_coleccion))
+    return fallidas
+
+
+async def _usuario_de_muestra(db) -> str:
+    categoria = await db["categorias_gasto"].find_one({"deleted": 0}, {"usuario_id": 1})
+    return categoria["usuario_id"] if categoria else _USUARIO
+
+
+async def _main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Índices de MongoDB")
+    parser.add_argument("accion", choices=["sincronizar", "verificar"])
+    parser.add_argument("--usuario", default=None, help="Usuario con el que se explican las agregaciones")
+    args = parser.parse_args(argv)
+
+    await mongo_connection.connect()
+    try:
+        db = mongo_connection.database
+        await sincronizar_indices(db)
+        if args.accion == "sincronizar":
+            print("Índices sincronizados")
+            return 0
+
+        fallidas = await verificar_consultas(db)
+        for nombre_coleccion, filtro in fallidas:
+            print(f"COLLSCAN en {nombre_coleccion}: {filtro}")
+        print(f"{len(CONSULTAS) - len(fallidas)}/{len(CONSULTAS)} consultas usan índices")
+
+        consultas = agregaciones(args.usuario or await _usuario_de_muestra(db))
+        agregaciones_fallidas = await verificar_agregaciones(db, consultas)
+        for nombre, nombre_coleccion in agregaciones_fallidas:
+            print(f"COLLSCAN en la agregación {nombre} ({nombre_coleccion})")
+        print(f"{len(consultas) - len(agregaciones_fallidas)}/{len(consultas)} agregaciones usan índices")
+        return 1 if fallidas or agregaciones_fallidas else 0
+    finally:
+        await mongo_connection.close()
+
+
+if __name__ == "__main__":
+    raise SystemExit(asyncio.run(_main()))
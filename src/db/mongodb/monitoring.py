@@ -0,0 +1,107 @@
+import threading
+import time
+from pymongo import monitoring
+from src.services.histogram_service import Histogram
+from src.services.metrics_service import registrar_llamada_db
+
+
+class MongoPoolMonitor(monitoring.ConnectionPoolListener):
+    """
+    Estadísticas en vivo del pool de conexiones de MongoDB a partir de los
+    eventos CMAP del driver. Los eventos llegan desde los hilos de Motor.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inicio_espera = {}
+        self.en_uso = 0
+        self.esperando = 0
+        self.abiertas = 0
+        self.creadas = 0
+        self.cerradas = 0
+        self.fallos_checkout = 0
+        self.limpiezas = 0
+        self.espera = Histogram()
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.limpiezas += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self._lock:
+            self.creadas += 1
+            self.abiertas += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.cerradas += 1
+            self.abiertas -= 1
+
+    def connection_check_out_started(self, event):
+        # El checkout es síncrono dentro del hilo que ejecuta la operación
+        with self._lock:
+            self.esperando += 1
+            self._inicio_espera[threading.get_ident()] = time.perf_counter()
+
+    def _fin_espera(self):
+        inicio = self._inicio_espera.pop(threading.get_ident(), None)
+        self.esperando -= 1
+        if inicio is not None:
+            self.espera.observe(time.perf_counter() - inicio)
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self._fin_espera()
+            self.fallos_checkout += 1
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            self._fin_espera()
+            self.en_uso += 1
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.en_uso -= 1
+
+    def estadisticas(self) -> dict:
+        return {
+            "en_uso": self.en_uso,
+            "esperando": self.esperando,
+            "abiertas": self.abiertas,
+            "creadas": self.creadas,
+            "cerradas": self.cerradas,
+            "fallos_checkout": self.fallos_checkout,
+            "limpiezas": self.limpiezas,
+            "espera_segundos": self.espera.snapshot(),
+        }
+
+
+class MongoCommandMonitor(monitoring.CommandListener):
+    """
+    Suma cada comando enviado a MongoDB a las métricas de la petición en curso.
+    """
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        registrar_llamada_db("mongodb", event.duration_micros / 1_000_000)
+
+    def failed(self, event):
+        registrar_llamada_db("mongodb", event.duration_micros / 1_000_000)
+
+
+mongo_pool_monitor = MongoPoolMonitor()
+mongo_command_monitor = MongoCommandMonitor()
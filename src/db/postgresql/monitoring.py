@@ -0,0 +1,69 @@
+import time
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from src.services.histogram_service import Histogram
+from src.services.metrics_service import registrar_llamada_db
+
+
+class PoolInstrumentado(AsyncAdaptedQueuePool):
+    """
+    Pool asíncrono de SQLAlchemy que además mide la espera por una conexión
+    y cuenta las conexiones abiertas y cerradas.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.esperando = 0
+        self.creadas = 0
+        self.cerradas = 0
+        self.espera = Histogram()
+
+    def _do_get(self):
+        self.esperando += 1
+        inicio = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            self.esperando -= 1
+            self.espera.observe(time.perf_counter() - inicio)
+
+    def _create_connection(self):
+        conexion = super()._create_connection()
+        self.creadas += 1
+        return conexion
+
+    def _close_connection(self, connection, *args, **kwargs):
+        self.cerradas += 1
+        return super()._close_connection(connection, *args, **kwargs)
+
+    def estadisticas(self) -> dict:
+        return {
+            "tamano": self.size(),
+            "en_uso": self.checkedout(),
+            "disponibles": self.checkedin(),
+            "overflow": self.overflow(),
+            "esperando": self.esperando,
+            "creadas": self.creadas,
+            "cerradas": self.cerradas,
+            "espera_segundos": self.espera.snapshot(),
+        }
+
+
+def instrumentar_consultas(engine):
+    """
+    Suma cada sentencia ejecutada por `engine` a las métricas de la petición en curso.
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _antes(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("inicio_consultas", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _despues(conn, cursor, statement, parameters, context, executemany):
+        registrar_llamada_db("postgresql", time.perf_counter() - conn.info["inicio_consultas"].pop())
+
+    @event.listens_for(engine, "handle_error")
+    def _error(contexto):
+        inicios = contexto.connection.info.get("inicio_consultas") if contexto.connection is not None else None
+        if inicios:
+            registrar_llamada_db("postgresql", time.perf_counter() - inicios.pop())
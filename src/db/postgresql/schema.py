@@ -0,0 +1,37 @@
+"""
+Creación del esquema de PostgreSQL.
+
+La aplicación ya no crea tablas al importarse; el esquema se crea de forma explícita
+antes del primer despliegue (o al agregar tablas nuevas):
+    python -m src.db.postgresql.schema crear
+"""
+import argparse
+import asyncio
+from typing import Optional
+from src.db.postgresql.config import Base, async_engine
+from src.models import user_models  # noqa: F401  (registra las tablas en `Base.metadata`)
+
+
+async def crear_esquema():
+    """
+    Crea las tablas que faltan. Las existentes no se modifican.
+    """
+    async with async_engine.begin() as conexion:
+        await conexion.run_sync(Base.metadata.create_all)
+
+
+async def _main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Esquema de PostgreSQL")
+    parser.add_argument("accion", choices=["crear"])
+    parser.parse_args(argv)
+
+    try:
+        await crear_esquema()
+        print("Esquema creado")
+        return 0
+    finally:
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    raise SystemExit(asyncio.run(_main()))
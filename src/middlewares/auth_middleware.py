@@ -1,22 +1,42 @@
+from typing import Mapping
 from fastapi import HTTPException, Depends, Request
-from sqlalchemy.orm import Session
-from src.db.postgresql.config import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.db.postgresql.config import get_async_db
 from src.models.user_models import Usuario
+from src.schemas.user_schemas import Principal
 from src.services.jwt_service import verify_token
-from src.models.user_models import Usuario
+from src.services.principal_service import CONFIAR_CLAIMS, principal_cache
+
+async def _buscar_usuario(db: AsyncSession, usuario_id: str):
+    user = (await db.execute(select(Usuario).where(Usuario.id == usuario_id))).scalars().first()
+    if user:
+        # Se separa de la sesión para poder reutilizarlo en otras peticiones
+        db.expunge(user)
+    return user
 
 async def auth_middleware(
     request: Request,
-    token: dict = Depends(verify_token),
-    db: Session = Depends(get_db)
+    token: Mapping = Depends(verify_token),
+    db: AsyncSession = Depends(get_async_db)
 ):
     if "user_id" not in token:
         raise HTTPException(status_code=401, detail="Token de usuario inválido")
-    
-    user = db.query(Usuario).filter(Usuario.id == token["user_id"]).first()
 
-    if not user:
-        raise HTTPException(status_code=401, detail="Usuario no encontrado")
-    
+    usuario_id = token["user_id"]
+
+    if CONFIAR_CLAIMS:
+        # El token está firmado por nosotros: no se consulta la base de datos
+        user = Principal(id=usuario_id)
+    else:
+        user = principal_cache.get(usuario_id)
+        if user is None:
+            # Si el usuario se modifica mientras se lee, la fila leída no se cachea
+            generacion = principal_cache.generacion()
+            user = await _buscar_usuario(db, usuario_id)
+            if not user:
+                raise HTTPException(status_code=401, detail="Usuario no encontrado")
+            principal_cache.set(usuario_id, user, generacion=generacion)
+
     request.state.user = user
-    return user
\ No newline at end of file
+    return user
@@ -0,0 +1,24 @@
+import hmac
+import os
+from typing import Optional
+from fastapi import Header, HTTPException
+from dotenv import load_dotenv
+
+load_dotenv()
+
+INTERNAL_TOKEN = os.getenv("INTERNAL_TOKEN")
+ENVIROMENT = os.getenv("ENVIROMENT", "prod")
+
+async def internal_middleware(x_internal_token: Optional[str] = Header(None)):
+    """
+    Restringe los endpoints internos a quien presente `X-Internal-Token`.
+    Sin `INTERNAL_TOKEN` configurado sólo quedan abiertos en el entorno `dev`.
+    """
+    if INTERNAL_TOKEN:
+        if x_internal_token and hmac.compare_digest(x_internal_token, INTERNAL_TOKEN):
+            return
+    elif ENVIROMENT == "dev":
+        return
+
+    # Fuera de los casos permitidos el endpoint no existe
+    raise HTTPException(status_code=404, detail="Not Found")
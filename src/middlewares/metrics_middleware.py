@@ -0,0 +1,42 @@
+from functools import partial
+from time import perf_counter
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from src.services.metrics_service import CLAVE_DURACION, CLAVE_ESTADO, Metricas, metricas, peticion_actual
+
+
+def _send_con_estado(scope: Scope, send: Send, message: Message):
+    # Devuelve el awaitable de `send` en lugar de ser una corrutina: una menos por mensaje
+    if message["type"] == "http.response.start":
+        scope[CLAVE_ESTADO] = message["status"]
+    return send(message)
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI puro que mide cada petición HTTP. La ruta se etiqueta con su
+    plantilla (`/financial/metas/{meta_id}`), que el router deja en `scope["route"]`.
+    El estado y la duración se guardan en el propio scope, que `Metricas` procesa en lote.
+    """
+
+    def __init__(self, app: ASGIApp, registro: Metricas = metricas):
+        self.app = app
+        self.registro = registro
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # Los contadores de bases de datos se crean en el scope solo si hay llamadas.
+        # No se restaura al terminar: el servidor corre cada petición en su propia
+        # tarea, con su propia copia del contexto
+        peticion_actual.set(scope)
+        registro = self.registro
+        registro.pendientes.append(scope)
+        if len(registro.pendientes) >= registro.limite:
+            registro.consolidar()
+        inicio = perf_counter()
+        try:
+            await self.app(scope, receive, partial(_send_con_estado, scope, send))
+        finally:
+            scope[CLAVE_DURACION] = perf_counter() - inicio
@@ -1,27 +1,77 @@
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import Response
-from fastapi import Request
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
-class CustomCORSMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app, allow_origins=None, allow_methods=None, allow_headers=None, allow_credentials=False):
-        super().__init__(app)
+class CustomCORSMiddleware:
+    """
+    Middleware CORS en ASGI puro. Las peticiones OPTIONS (preflight) se responden
+    aquí mismo, sin ejecutar la ruta ni el resto de middlewares.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        allow_origins=None,
+        allow_methods=None,
+        allow_headers=None,
+        allow_credentials=False,
+        expose_headers=None,
+        max_age: int = 600
+    ):
+        self.app = app
         self.allow_origins = allow_origins or ["*"]
         self.allow_methods = allow_methods or ["*"]
         self.allow_headers = allow_headers or ["*"]
         self.allow_credentials = allow_credentials
+        self.expose_headers = expose_headers or []
+        self.max_age = max_age
+
+        # Todo lo que no depende de la petición se calcula una sola vez
+        self._todos_los_origenes = "*" in self.allow_origins
+        self._origenes = frozenset(self.allow_origins)
+        self._cabeceras_cors = [
+            (b"access-control-allow-methods", ", ".join(self.allow_methods).encode("latin-1")),
+            (b"access-control-allow-headers", ", ".join(self.allow_headers).encode("latin-1")),
+        ]
+        if self.allow_credentials:
+            self._cabeceras_cors.append((b"access-control-allow-credentials", b"true"))
+        if self.expose_headers:
+            self._cabeceras_cors.append((b"access-control-expose-headers", ", ".join(self.expose_headers).encode("latin-1")))
+        self._cabeceras_preflight = [
+            (b"access-control-max-age", str(max_age).encode("latin-1")),
+            (b"vary", b"Origin"),
+        ]
+
+    def _origen_permitido(self, origin) -> bool:
+        return bool(origin) and (self._todos_los_origenes or origin in self._origenes)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        origin = Headers(scope=scope).get("origin")
+        permitido = self._origen_permitido(origin)
+
+        if scope["method"] == "OPTIONS":
+            headers = [(b"content-length", b"0")]
+            if permitido:
+                headers.append((b"access-control-allow-origin", origin.encode("latin-1")))
+                headers.extend(self._cabeceras_cors)
+                headers.extend(self._cabeceras_preflight)
+            await send({"type": "http.response.start", "status": 204, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
 
-    async def dispatch(self, request: Request, call_next):
-        response = await call_next(request)
+        if not permitido:
+            await self.app(scope, receive, send)
+            return
 
-        origin = request.headers.get("origin")
-        if origin and (origin in self.allow_origins or "*" in self.allow_origins):
-            response.headers["Access-Control-Allow-Origin"] = origin
-            response.headers["Access-Control-Allow-Methods"] = ", ".join(self.allow_methods)
-            response.headers["Access-Control-Allow-Headers"] = ", ".join(self.allow_headers)
-            if self.allow_credentials:
-                response.headers["Access-Control-Allow-Credentials"] = "true"
+        cabecera_origen = (b"access-control-allow-origin", origin.encode("latin-1"))
 
-        if request.method == "OPTIONS":
-            return Response(status_code=204, headers=response.headers)
+        async def send_con_cors(message: Message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", ()), cabecera_origen, *self._cabeceras_cors]
+                MutableHeaders(scope=message).add_vary_header("Origin")
+            await send(message)
 
-        return response
\ No newline at end of file
+        await self.app(scope, receive, send_con_cors)
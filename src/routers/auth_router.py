@@ -1,9 +1,11 @@
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.schemas import auth_schemas
 from src.controllers import auth_controller
-from src.db.postgresql.config import get_db
+from src.db.postgresql.config import get_async_db
+from src.services.jwt_service import revocar_token, security, verify_token
 
 router = APIRouter(
     prefix="/auth",
@@ -11,15 +13,22 @@ router = APIRouter(
 )
 
 @router.post("/login", response_model=auth_schemas.Token)
-def login(
+async def login(
     login_data: auth_schemas.Login,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    return auth_controller.login(db, login_data.correo, login_data.contrasena)
+    return await auth_controller.login(db, login_data.correo, login_data.contrasena)
 
 @router.post("/register", response_model=auth_schemas.Token, status_code=201)
 async def register(
     register_data: auth_schemas.Register,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     return await auth_controller.register(db, register_data)
+
+@router.post("/logout", status_code=204, dependencies=[Depends(verify_token)])
+async def logout(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """
+    Revoca el token con el que se hace la petición.
+    """
+    await revocar_token(credentials.credentials)
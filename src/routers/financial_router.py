@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, Request
+from fastapi import APIRouter, Depends, File, Query, Request, UploadFile
 from src.controllers import financial_controller
 from src.middlewares.auth_middleware import auth_middleware
 from src.schemas.financial_schemas import (
@@ -7,13 +7,25 @@ from src.schemas.financial_schemas import (
     CategoriaGastoCreate,
     CategoriaGastoGet,
     GastoCreate,
-    GastoGet,
     Ingreso,
     IngresoCreate,
     UsuarioFinanciero,
-    MetaAhorroUpdate
+    MetaAhorroUpdate,
+    ResumenMensual,
+    GastoGet,
+    Dashboard,
+    AnaliticaGastos,
+    ProyeccionMetas,
+    metas_ahorro_adapter,
+    gastos_adapter,
+    ingresos_adapter,
+    usuarios_financieros_adapter
 )
-from typing import List, Optional
+from src.services import analytics_service
+from src.services.json_service import respuesta_json
+from src.services.pagination_service import CABECERA_CURSOR, TAMANO_PAGINA_MAXIMO
+from datetime import date
+from typing import List, Literal, Optional
 
 router = APIRouter(
     prefix="/financial",
@@ -54,7 +66,21 @@ async def obtener_metas_ahorro(request: Request):
     """
     usuario_id = request.state.user.id
     metas = await financial_controller.obtener_metas_ahorro(usuario_id)
-    return metas
+    return respuesta_json(metas, metas_ahorro_adapter)
+
+@router.get("/metas/proyeccion", response_model=ProyeccionMetas, dependencies=[Depends(auth_middleware)])
+async def obtener_proyeccion_metas(
+    request: Request,
+    dias: int = Query(analytics_service.PROYECCION_DIAS_DEFECTO, ge=1, le=analytics_service.PROYECCION_DIAS_MAXIMO)
+):
+    """
+    Obtener, para todas las metas del usuario, el ritmo de abono de los últimos
+    `dias` días, la fecha estimada en que se completan y el aporte mensual
+    necesario para llegar a la fecha objetivo.
+    """
+    usuario_id = request.state.user.id
+    proyeccion = await financial_controller.obtener_proyeccion_metas(usuario_id, dias)
+    return respuesta_json(proyeccion)
 
 @router.post("/categorias", response_model=dict, status_code=201, dependencies=[Depends(auth_middleware)])
 async def crear_categoria_gasto(categoria_data: CategoriaGastoCreate, request: Request):
@@ -83,6 +109,20 @@ async def registrar_gasto(gasto_data: GastoCreate, request: Request):
     response = await financial_controller.registrar_gasto(usuario_id, gasto_data)
     return {"message": response["message"]}
 
+@router.post("/gastos/bulk", response_model=dict, status_code=201, dependencies=[Depends(auth_middleware)])
+async def importar_gastos(
+    request: Request,
+    archivo: UploadFile = File(...),
+    formato: Optional[Literal["csv", "ndjson"]] = None
+):
+    """
+    Importar gastos en lote desde un archivo CSV o NDJSON.
+    Devuelve cuántos se registraron y el detalle de las filas rechazadas.
+    """
+    usuario_id = request.state.user.id
+    response = await financial_controller.importar_gastos(usuario_id, archivo, formato)
+    return response
+
 @router.post("/metas/{meta_id}/abono", response_model=dict, dependencies=[Depends(auth_middleware)])
 async def abonar_meta(meta_id: str, monto: float, request: Request):
     """
@@ -92,23 +132,51 @@ async def abonar_meta(meta_id: str, monto: float, request: Request):
     response = await financial_controller.abonar_meta(usuario_id, meta_id, monto)
     return {"message": response["message"]}
 
-@router.get("/gastos", response_model=List[GastoGet], dependencies=[Depends(auth_middleware)])
-async def obtener_gastos(request: Request):
+def _respuesta_lista(request: Request, pagina, adapter):
     """
-    Obtener los gastos de un usuario
+    Devuelve los elementos de la página como arreglo. Si hay más, el cursor va en
+    `X-Next-Cursor` y la URL de la página siguiente en `Link`.
+    """
+    response = respuesta_json(pagina.items, adapter)
+    if pagina.next_cursor:
+        siguiente = request.url.include_query_params(cursor=pagina.next_cursor)
+        response.headers[CABECERA_CURSOR] = pagina.next_cursor
+        response.headers["Link"] = f'<{siguiente}>; rel="next"'
+    return response
+
+@router.get("/gastos", response_model=List[GastoGet], dependencies=[Depends(auth_middleware)])
+async def obtener_gastos(
+    request: Request,
+    limite: Optional[int] = Query(None, ge=1, le=TAMANO_PAGINA_MAXIMO),
+    cursor: Optional[str] = None,
+    desde: Optional[date] = None,
+    hasta: Optional[date] = None,
+    categoria_id: Optional[str] = None
+):
+    """
+    Obtener los gastos de un usuario, del más reciente al más antiguo.
+    Con `limite` o `cursor` se pagina: el cursor de la página siguiente llega en
+    la cabecera `X-Next-Cursor` y se envía como `cursor` en la siguiente petición.
     """
     usuario_id = request.state.user.id
-    gastos = await financial_controller.obtener_gastos(usuario_id)
-    return gastos
+    gastos = await financial_controller.obtener_gastos(usuario_id, limite, cursor, desde, hasta, categoria_id)
+    return _respuesta_lista(request, gastos, gastos_adapter)
 
 @router.get("/ingresos", response_model=List[Ingreso], dependencies=[Depends(auth_middleware)])
-async def obtener_ingresos(request: Request):
+async def obtener_ingresos(
+    request: Request,
+    limite: Optional[int] = Query(None, ge=1, le=TAMANO_PAGINA_MAXIMO),
+    cursor: Optional[str] = None,
+    desde: Optional[date] = None,
+    hasta: Optional[date] = None
+):
     """
-    Obtener los ingresos registrados de un usuario
+    Obtener los ingresos registrados de un usuario, del más reciente al más antiguo.
+    Se pagina igual que los gastos.
     """
     usuario_id = request.state.user.id
-    ingresos = await financial_controller.obtener_ingresos(usuario_id)
-    return ingresos
+    ingresos = await financial_controller.obtener_ingresos(usuario_id, limite, cursor, desde, hasta)
+    return _respuesta_lista(request, ingresos, ingresos_adapter)
 
 @router.post("/ingresos", response_model=dict, status_code=201, dependencies=[Depends(auth_middleware)])
 async def registrar_ingreso(ingreso_data: IngresoCreate, request: Request):
@@ -126,7 +194,7 @@ async def obtener_datos_financieros(request: Request):
     """
     usuario_id = request.state.user.id
     datos = await financial_controller.obtener_datos_financieros(usuario_id)
-    return datos
+    return respuesta_json(datos, usuarios_financieros_adapter)
 
 @router.get("/metas/{meta_id}", response_model=MetaAhorro, status_code = 200, dependencies=[Depends(auth_middleware)])
 async def obtener_meta_by_id(meta_id: str):
@@ -155,6 +223,15 @@ async def obtener_resumen(request: Request, periodo: int):
     resumen = await financial_controller.get_resumen(usuario_id, periodo)
     return resumen
 
+@router.get("/datos/resumenes", response_model=List[ResumenMensual], dependencies=[Depends(auth_middleware)])
+async def obtener_resumenes_mensuales(request: Request, desde: Optional[date] = None, hasta: Optional[date] = None):
+    """
+    Obtener los resúmenes mensuales (ingresos, gastos y balance) de un usuario en un rango de meses
+    """
+    usuario_id = request.state.user.id
+    resumenes = await financial_controller.obtener_resumenes_mensuales(usuario_id, desde, hasta)
+    return resumenes
+
 @router.delete("/categorias/{categoria_id}", response_model=dict, dependencies=[Depends(auth_middleware)])
 async def eliminar_categoria(categoria_id: str, request: Request):
     """
@@ -162,4 +239,41 @@ async def eliminar_categoria(categoria_id: str, request: Request):
     """
     usuario_id = request.state.user.id
     response = await financial_controller.eliminar_categoria(usuario_id, categoria_id)
-    return {"message": response["message"]}
\ No newline at end of file
+    return {"message": response["message"]}
+
+@router.get("/dashboard", response_model=Dashboard, dependencies=[Depends(auth_middleware)])
+async def obtener_dashboard(
+    request: Request,
+    periodo: float = 1,
+    limite_recientes: int = Query(10, ge=1, le=50),
+    debug: bool = False
+):
+    """
+    Obtener en una sola llamada las metas, categorías con su gasto, resumen,
+    datos financieros y últimos gastos del usuario.
+    Con `debug=true` se incluye el tiempo de cada sección en la cabecera `Server-Timing`.
+    """
+    usuario_id = request.state.user.id
+    dashboard, tiempos = await financial_controller.obtener_dashboard(usuario_id, periodo, limite_recientes)
+
+    response = respuesta_json(dashboard)
+    if debug:
+        response.headers["Server-Timing"] = ", ".join(
+            f"{seccion};dur={duracion:.2f}" for seccion, duracion in tiempos.items()
+        )
+    return response
+
+@router.get("/analytics/spending", response_model=AnaliticaGastos, dependencies=[Depends(auth_middleware)])
+async def obtener_analitica_gastos(
+    request: Request,
+    dias: int = Query(analytics_service.DIAS_DEFECTO, ge=1, le=analytics_service.DIAS_MAXIMO),
+    ventana: int = Query(analytics_service.VENTANA_DEFECTO, ge=1, le=analytics_service.VENTANA_MAXIMA)
+):
+    """
+    Obtener el gasto diario de los últimos `dias` días por categoría con su media
+    móvil de `ventana` días, el ritmo de gasto del mes en curso y la proyección
+    al cierre del mes frente al límite de cada categoría.
+    """
+    usuario_id = request.state.user.id
+    analitica = await financial_controller.obtener_analitica_gastos(usuario_id, dias, ventana)
+    return respuesta_json(analitica)
@@ -1,31 +1,47 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Request
+from fastapi.responses import Response
 from src.schemas.geo_schemas import EstadoGet, Pais, Estado
-from src.controllers.geo_controller import obtener_estados, obtener_paises, obtener_estados_by_pais
-from src.db.postgresql.config import get_db
+from src.controllers.geo_controller import RespuestaGeo, obtener_catalogo
 
 router = APIRouter(
     prefix="/geo",
     tags=["Geo"]
 )
 
+def _responder(request: Request, respuesta: RespuestaGeo) -> Response:
+    """
+    Responde con el cuerpo pre-serializado, o con 304 si el cliente ya tiene esa versión.
+    """
+    headers = {"ETag": respuesta.etag, "Cache-Control": "public, max-age=3600"}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        etags = {etag.strip().removeprefix("W/") for etag in if_none_match.split(",")}
+        if "*" in etags or respuesta.etag in etags:
+            return Response(status_code=304, headers=headers)
+
+    return Response(content=respuesta.contenido, media_type="application/json", headers=headers)
+
 @router.get("/estados", response_model=list[EstadoGet])
-def get_estados(db: Session = Depends(get_db)):
+async def get_estados(request: Request):
     """
     Obtiene todos los estados con su país correspondiente.
     """
-    return obtener_estados(db)
+    catalogo = await obtener_catalogo()
+    return _responder(request, catalogo.estados)
 
 @router.get("/paises/estados/{pais_id}", response_model=list[Estado])
-def get_estados_by_pais(pais_id: int ,db: Session = Depends(get_db)):
+async def get_estados_by_pais(pais_id: int, request: Request):
     """
     Obtiene todos los estados con su país correspondiente en base al ID del país
     """
-    return obtener_estados_by_pais(db, pais_id)
+    catalogo = await obtener_catalogo()
+    return _responder(request, catalogo.estados_de(pais_id))
 
 @router.get("/paises", response_model=list[Pais])
-def get_paises(db: Session = Depends(get_db)):
+async def get_paises(request: Request):
     """
     Obtiene todos los países disponibles.
     """
-    return obtener_paises(db)
\ No newline at end of file
+    catalogo = await obtener_catalogo()
+    return _responder(request, catalogo.paises)
@@ -0,0 +1,23 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from src.services.warmup_service import estado
+
+router = APIRouter(
+    prefix="/health",
+    tags=["Health"],
+    include_in_schema=False
+)
+
+@router.get("/live")
+async def get_live():
+    """
+    El proceso responde. No consulta ninguna base de datos.
+    """
+    return {"status": "ok"}
+
+@router.get("/ready")
+async def get_ready():
+    """
+    El calentamiento terminó y la aplicación puede recibir tráfico; 503 mientras no.
+    """
+    return JSONResponse(status_code=200 if estado.listo else 503, content=estado.resumen())
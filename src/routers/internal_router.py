@@ -0,0 +1,44 @@
+from fastapi import APIRouter, Depends
+from src.db.mongodb.monitoring import mongo_pool_monitor
+from src.db.postgresql.config import async_engine
+from src.middlewares.internal_middleware import internal_middleware
+from src.controllers.user_controller import perfil_cache
+from src.services import archivo_service, encrypt_service, jwt_service, write_batcher
+from src.services.principal_service import principal_cache
+
+router = APIRouter(
+    prefix="/internal",
+    tags=["Internal"],
+    dependencies=[Depends(internal_middleware)],
+    include_in_schema=False
+)
+
+@router.get("/pools")
+async def get_pools():
+    """
+    Estadísticas en vivo de los pools de conexiones y de trabajo.
+    """
+    return {
+        "postgresql": async_engine.pool.estadisticas(),
+        "mongodb": mongo_pool_monitor.estadisticas(),
+        "hash": encrypt_service.estadisticas(),
+        "write_batcher": write_batcher.estadisticas(),
+    }
+
+@router.get("/caches")
+async def get_caches():
+    """
+    Tamaño y tasa de aciertos de las caches en memoria.
+    """
+    return {
+        "jwt": jwt_service.estadisticas(),
+        "principal": principal_cache.estadisticas(),
+        "perfil": perfil_cache.estadisticas(),
+    }
+
+@router.get("/archivo")
+async def get_archivo():
+    """
+    Estado del archivador de transacciones antiguas.
+    """
+    return archivo_service.estadisticas()
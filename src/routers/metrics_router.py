@@ -0,0 +1,17 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+from src.middlewares.internal_middleware import internal_middleware
+from src.services.metrics_service import metricas
+
+router = APIRouter(
+    tags=["Internal"],
+    dependencies=[Depends(internal_middleware)],
+    include_in_schema=False
+)
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """
+    Métricas de latencia, tráfico y acceso a datos en formato de texto de Prometheus.
+    """
+    return PlainTextResponse(metricas.exportar(), media_type="text/plain; version=0.0.4")
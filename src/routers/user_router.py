@@ -1,9 +1,9 @@
 from fastapi import APIRouter, Depends, Request
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.schemas.user_schemas import UsuarioGet, UsuarioUpdate
 from src.controllers import user_controller
-from src.db.postgresql.config import get_db
+from src.db.postgresql.config import get_async_db
 
 from src.middlewares.auth_middleware import auth_middleware
 
@@ -15,20 +15,20 @@ router = APIRouter(
 @router.get("/details", response_model=UsuarioGet, status_code=200, dependencies=[Depends(auth_middleware)])
 async def obtener_detalles(
     request: Request,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Obtener los detalles de un usuario
     """
     usuario_id = request.state.user.id
-    usuario = await user_controller.obtener_detalles(db, usuario_id)
+    usuario = await user_controller.obtener_detalles(db, usuario_id, request.state.user)
     return usuario
 
 @router.put("/", response_model=dict, status_code=200, dependencies=[Depends(auth_middleware)])
 async def actualizar_usuario(
     request: Request,
     usuario_data: UsuarioUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Actualizar un usuario
@@ -1,6 +1,6 @@
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, BeforeValidator, Field, TypeAdapter, field_validator
 from datetime import date, datetime
-from typing import Optional, Literal
+from typing import Annotated, Dict, List, Optional, Literal
 from bson import ObjectId
 
 class PyObjectId(ObjectId):
@@ -20,8 +20,13 @@ class PyObjectId(ObjectId):
         field_schema.update(type="string")
 
 
+def object_id_a_str(v):
+    """Permite validar documentos de MongoDB sin convertir `_id` a mano."""
+    return str(v) if isinstance(v, ObjectId) else v
+
+
 class MongoBaseModel(BaseModel):
-    id: Optional[str] = Field(alias="_id")
+    id: Annotated[Optional[str], BeforeValidator(object_id_a_str)] = Field(alias="_id")
 
     class Config:
         populate_by_name = True
@@ -133,6 +138,14 @@ class IngresoCreate(TransaccionBase):
 class Ingreso(Transaccion):
     meta_id: str
 
+class PaginaGastos(BaseModel):
+    items: List[GastoGet]
+    next_cursor: Optional[str] = None
+
+class PaginaIngresos(BaseModel):
+    items: List[Ingreso]
+    next_cursor: Optional[str] = None
+
 class ResumenMensualBase(BaseModel):
     usuario_id: str
     fecha: datetime
@@ -150,4 +163,76 @@ class ResumenMensualBase(BaseModel):
 class ResumenMensual(MongoBaseModel, ResumenMensualBase):
     _id: str
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+class Dashboard(BaseModel):
+    metas: List[MetaAhorro]
+    categorias: List[CategoriaGastoGet]
+    resumen: Dict[str, float]
+    datos_financieros: List[UsuarioFinanciero]
+    gastos_recientes: List[GastoGet]
+
+
+class AnaliticaCategoria(BaseModel):
+    """
+    Gasto de una categoría (o del total, con `categoria_id` nulo) en el mes en curso
+    y su proyección al cierre. `fecha_limite` es el día en que se supera el límite,
+    real o proyectado al ritmo actual.
+    """
+    categoria_id: Optional[str] = None
+    nombre: str
+    limite_gasto: float
+    gastado_mes: float
+    ritmo_diario: float
+    media_movil: float
+    proyeccion_mes: float
+    excede_limite: bool
+    fecha_limite: Optional[datetime] = None
+    gastos_diarios: List[float]
+    medias_moviles: List[float]
+
+
+class AnaliticaGastos(BaseModel):
+    desde: datetime
+    hasta: datetime
+    ventana: int
+    dias_transcurridos: int
+    dias_mes: int
+    categorias: List[AnaliticaCategoria]
+    total: AnaliticaCategoria
+
+
+class ProyeccionMeta(BaseModel):
+    """
+    Proyección de una meta al ritmo de sus abonos recientes. `fecha_proyectada`
+    es nula si a ese ritmo no se completa (sin abonos recientes).
+    """
+    meta_id: str
+    nombre: str
+    monto_objetivo: float
+    monto_actual: float
+    faltante: float
+    fecha_objetivo: datetime
+    abonos_recientes: int
+    ultimo_abono: Optional[datetime] = None
+    ritmo_diario: float
+    aporte_mensual_actual: float
+    aporte_mensual_requerido: float
+    fecha_proyectada: Optional[datetime] = None
+    completada: bool
+    vencida: bool
+    en_tiempo: bool
+
+
+class ProyeccionMetas(BaseModel):
+    desde: datetime
+    hasta: datetime
+    metas: List[ProyeccionMeta]
+
+
+# Validación en lote de documentos leídos de MongoDB
+metas_ahorro_adapter = TypeAdapter(List[MetaAhorro])
+gastos_adapter = TypeAdapter(List[GastoGet])
+ingresos_adapter = TypeAdapter(List[Ingreso])
+usuarios_financieros_adapter = TypeAdapter(List[UsuarioFinanciero])
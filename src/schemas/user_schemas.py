@@ -17,6 +17,12 @@ class Usuario(UsuarioBase):
     class Config:
         from_attributes = True
 
+class Principal(BaseModel):
+    """
+    Usuario autenticado reconstruido solo a partir de los claims del token.
+    """
+    id: str
+
 class UsuarioGet(UsuarioBase):
     salario: float
     divisa: str
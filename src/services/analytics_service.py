@@ -0,0 +1,283 @@
+"""
+Analítica de gastos sobre los acumulados diarios (`gastos_diarios`).
+
+Una sola agregación trae, por cada categoría activa del usuario, su límite y los
+días con gasto del rango necesario. Con eso se arma una matriz densa
+categoría × día y todo lo demás se calcula con operaciones de NumPy sobre ella:
+medias móviles, gasto y ritmo del mes en curso, proyección al cierre del mes y
+el día en que se supera (o se superaría) el `limite_gasto`.
+
+Las proyecciones de las metas de ahorro siguen la misma idea: una agregación suma
+los abonos recientes de todas las metas del usuario y el ritmo, la fecha estimada
+y el aporte mensual necesario se calculan para todas a la vez.
+"""
+import asyncio
+import calendar
+import math
+from datetime import datetime, timedelta
+from itertools import chain
+from typing import TYPE_CHECKING, Optional
+from src.db.mongodb.config import mongo_connection
+from src.services import transacciones_service
+from src.services.rollup_service import COLECCION_GASTOS_DIARIOS, inicio_del_dia, inicio_del_mes
+
+# NumPy se importa dentro de las funciones que lo usan: importarlo aquí lo sumaba
+# al arranque de cada worker aunque nunca se pidiera una analítica
+if TYPE_CHECKING:
+    import numpy as np
+
+DIAS_DEFECTO = 30
+DIAS_MAXIMO = 366
+VENTANA_DEFECTO = 7
+VENTANA_MAXIMA = 90
+PROYECCION_DIAS_DEFECTO = 90
+PROYECCION_DIAS_MAXIMO = 730
+
+DIAS_POR_MES = 365.25 / 12
+# Más allá de este horizonte una meta se considera sin fecha estimada
+HORIZONTE_MAXIMO_DIAS = 100 * 365
+
+MS_POR_DIA = 24 * 60 * 60 * 1000
+
+
+def _pipeline_series(usuario_id: str, inicio: datetime, fin: datetime) -> list:
+    """
+    Categorías activas del usuario con sus acumulados diarios en [inicio, fin),
+    cada día expresado como su posición desde `inicio`.
+    """
+    return [
+        {"$match": {"usuario_id": usuario_id, "deleted": 0}},
+        {
+            "$lookup": {
+                "from": COLECCION_GASTOS_DIARIOS,
+                "let": {"categoria_id": {"$toString": "$_id"}},
+                "pipeline": [
+                    {
+                        "$match": {
+                            "usuario_id": usuario_id,
+                            "dia": {"$gte": inicio, "$lt": fin},
+                            "$expr": {"$eq": ["$categoria_id", "$$categoria_id"]},
+                        }
+                    },
+                    {
+                        "$project": {
+                            "_id": 0,
+                            "total": 1,
+                            "posicion": {"$toInt": {"$divide": [{"$subtract": ["$dia", inicio]}, MS_POR_DIA]}},
+                        }
+                    },
+                ],
+                "as": "dias",
+            }
+        },
+        {
+            "$project": {
+                "_id": {"$toString": "$_id"},
+                "nombre": 1,
+                "limite_gasto": 1,
+                "posiciones": "$dias.posicion",
+                "totales": "$dias.total",
+            }
+        },
+    ]
+
+
+def _matriz_gastos(categorias: list, n_dias: int) -> "np.ndarray":
+    """
+    Matriz (categorías + 1) × días con el gasto de cada día; los días sin gasto
+    quedan en 0 y la última fila es la suma de todas las categorías.
+    """
+    import numpy as np
+
+    gastos = np.zeros((len(categorias) + 1, n_dias))
+    conteos = [len(categoria["posiciones"]) for categoria in categorias]
+    cantidad = sum(conteos)
+    if cantidad:
+        filas = np.repeat(np.arange(len(categorias)), conteos)
+        columnas = np.fromiter(chain.from_iterable(c["posiciones"] for c in categorias), dtype=np.int64, count=cantidad)
+        totales = np.fromiter(chain.from_iterable(c["totales"] for c in categorias), dtype=np.float64, count=cantidad)
+        # (categoría, día) es único en `gastos_diarios`: basta con asignar
+        gastos[filas, columnas] = totales
+    gastos[-1] = gastos[:-1].sum(axis=0)
+    return gastos
+
+
+def _medias_moviles(gastos: "np.ndarray", ventana: int) -> "np.ndarray":
+    """
+    Media de los últimos `ventana` días en cada posición, con sumas acumuladas.
+    Las primeras `ventana - 1` posiciones promedian solo los días disponibles.
+    """
+    import numpy as np
+
+    acumulado = np.cumsum(gastos, axis=1)
+    sumas = acumulado.copy()
+    sumas[:, ventana:] -= acumulado[:, :-ventana]
+    divisores = np.minimum(np.arange(1, gastos.shape[1] + 1), ventana)
+    return sumas / divisores
+
+
+def _dia_limite(gasto_mes: "np.ndarray", limites: "np.ndarray", gastado: "np.ndarray", ritmo: "np.ndarray",
+                transcurridos: int, dias_mes: int) -> "np.ndarray":
+    """
+    Día del mes (1..dias_mes) en que el gasto acumulado supera el límite: el real
+    si ya ocurrió, o el proyectado al ritmo actual. 0 si no se supera en el mes.
+    """
+    import numpy as np
+
+    acumulado_mes = np.cumsum(gasto_mes, axis=1)
+    superado = acumulado_mes > limites[:, None]
+    real = np.where(superado.any(axis=1), superado.argmax(axis=1) + 1, 0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        dias_faltantes = np.floor((limites - gastado) / ritmo) + 1
+    proyectado = np.where(ritmo > 0, transcurridos + dias_faltantes, 0)
+    proyectado = np.where(proyectado <= dias_mes, proyectado, 0)
+
+    return np.where(real > 0, real, proyectado).astype(np.int64)
+
+
+async def analizar_gastos(
+    usuario_id: str,
+    dias: int = DIAS_DEFECTO,
+    ventana: int = VENTANA_DEFECTO,
+    hoy: Optional[datetime] = None
+) -> dict:
+    """
+    Series diarias de los últimos `dias` días por categoría con su media móvil de
+    `ventana` días, y para el mes en curso: gasto, ritmo diario, proyección al
+    cierre y si se supera el `limite_gasto`. La última fila es el total.
+    """
+    import numpy as np
+
+    hoy = inicio_del_dia(hoy or datetime.now())
+    inicio_mes = inicio_del_mes(hoy)
+    desde = hoy - timedelta(days=dias - 1)
+
+    # Se traen también los días previos que necesitan la primera media y el mes en curso
+    inicio = min(desde - timedelta(days=ventana - 1), inicio_mes)
+    fin = hoy + timedelta(days=1)
+    n_dias = (fin - inicio).days
+
+    categorias_db = mongo_connection.database["categorias_gasto"]
+    categorias = await categorias_db.aggregate(_pipeline_series(usuario_id, inicio, fin)).to_list(length=None)
+
+    gastos = _matriz_gastos(categorias, n_dias)
+    medias = _medias_moviles(gastos, ventana)
+
+    limites = np.fromiter((c.get("limite_gasto") or 0 for c in categorias), dtype=np.float64, count=len(categorias))
+    limites = np.append(limites, limites.sum())
+
+    posicion_mes = (inicio_mes - inicio).days
+    transcurridos = (hoy - inicio_mes).days + 1
+    dias_mes = calendar.monthrange(hoy.year, hoy.month)[1]
+
+    gasto_mes = gastos[:, posicion_mes:]
+    gastado = gasto_mes.sum(axis=1)
+    ritmo = gastado / transcurridos
+    proyeccion = ritmo * dias_mes
+    dia_limite = _dia_limite(gasto_mes, limites, gastado, ritmo, transcurridos, dias_mes)
+
+    visibles = slice(n_dias - dias, n_dias)
+    series = np.round(gastos[:, visibles], 2).tolist()
+    series_medias = np.round(medias[:, visibles], 2).tolist()
+    medias_actuales = medias[:, -1].tolist()
+
+    filas = []
+    nombres = [(c["_id"], c.get("nombre", "")) for c in categorias] + [(None, "Total")]
+    for indice, (categoria_id, nombre) in enumerate(nombres):
+        filas.append({
+            "categoria_id": categoria_id,
+            "nombre": nombre,
+            "limite_gasto": float(limites[indice]),
+            "gastado_mes": float(gastado[indice]),
+            "ritmo_diario": float(ritmo[indice]),
+            "media_movil": medias_actuales[indice],
+            "proyeccion_mes": float(proyeccion[indice]),
+            "excede_limite": bool(proyeccion[indice] > limites[indice]),
+            "fecha_limite": inicio_mes + timedelta(days=int(dia_limite[indice]) - 1) if dia_limite[indice] else None,
+            "gastos_diarios": series[indice],
+            "medias_moviles": series_medias[indice],
+        })
+
+    return {
+        "desde": desde,
+        "hasta": hoy,
+        "ventana": ventana,
+        "dias_transcurridos": transcurridos,
+        "dias_mes": dias_mes,
+        "categorias": filas[:-1],
+        "total": filas[-1],
+    }
+
+
+def _fecha_o_nada(hoy: datetime, dias: float) -> Optional[datetime]:
+    return hoy + timedelta(days=int(dias)) if math.isfinite(dias) else None
+
+
+async def proyectar_metas(usuario_id: str, dias: int = PROYECCION_DIAS_DEFECTO, hoy: Optional[datetime] = None) -> dict:
+    """
+    Para cada meta del usuario: ritmo de abono de los últimos `dias` días, fecha
+    estimada en que se completa a ese ritmo frente a `fecha_objetivo` y aporte
+    mensual necesario para llegar a tiempo.
+    """
+    import numpy as np
+
+    hoy = inicio_del_dia(hoy or datetime.now())
+    desde = hoy - timedelta(days=dias)
+
+    metas_db = mongo_connection.database["metas_ahorro"]
+    metas, abonos = await asyncio.gather(
+        metas_db.find(
+            {"usuario_id": usuario_id},
+            {"nombre": 1, "monto_objetivo": 1, "monto_actual": 1, "fecha_inicio": 1, "fecha_objetivo": 1}
+        ).to_list(length=None),
+        transacciones_service.totales_por_referencia("ingresos", usuario_id, desde),
+    )
+
+    cantidad = len(metas)
+    ids = [str(meta["_id"]) for meta in metas]
+    recientes = [abonos.get(meta_id, {}) for meta_id in ids]
+
+    objetivo = np.fromiter((meta.get("monto_objetivo") or 0 for meta in metas), dtype=np.float64, count=cantidad)
+    actual = np.fromiter((meta.get("monto_actual") or 0 for meta in metas), dtype=np.float64, count=cantidad)
+    abonado = np.fromiter((abono.get("total", 0) for abono in recientes), dtype=np.float64, count=cantidad)
+    # Días hasta el inicio y hasta el objetivo, relativos a hoy
+    dia_inicio = np.fromiter(((meta["fecha_inicio"] - hoy).days for meta in metas), dtype=np.float64, count=cantidad)
+    dia_objetivo = np.fromiter(((meta["fecha_objetivo"] - hoy).days for meta in metas), dtype=np.float64, count=cantidad)
+
+    # Una meta que empezó dentro de la ventana se mide solo desde su inicio
+    observados = np.clip(-dia_inicio, 1, dias)
+    ritmo = abonado / observados
+    faltante = np.maximum(objetivo - actual, 0)
+    completada = faltante <= 0
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        dias_para_completar = np.where(completada, 0, np.ceil(faltante / ritmo))
+    dias_para_completar[~np.isfinite(dias_para_completar) | (dias_para_completar > HORIZONTE_MAXIMO_DIAS)] = np.inf
+
+    vencida = dia_objetivo <= 0
+    meses_restantes = np.maximum(dia_objetivo, 1) / DIAS_POR_MES
+    aporte_requerido = np.where(vencida, faltante, faltante / meses_restantes)
+    en_tiempo = completada | (dias_para_completar <= dia_objetivo)
+
+    resultados = []
+    for indice, meta in enumerate(metas):
+        resultados.append({
+            "meta_id": ids[indice],
+            "nombre": meta.get("nombre", ""),
+            "monto_objetivo": float(objetivo[indice]),
+            "monto_actual": float(actual[indice]),
+            "faltante": float(faltante[indice]),
+            "fecha_objetivo": meta["fecha_objetivo"],
+            "abonos_recientes": recientes[indice].get("conteo", 0),
+            "ultimo_abono": recientes[indice].get("ultima"),
+            "ritmo_diario": float(ritmo[indice]),
+            "aporte_mensual_actual": float(ritmo[indice] * DIAS_POR_MES),
+            "aporte_mensual_requerido": float(aporte_requerido[indice]),
+            "fecha_proyectada": _fecha_o_nada(hoy, dias_para_completar[indice]),
+            "completada": bool(completada[indice]),
+            "vencida": bool(vencida[indice] and not completada[indice]),
+            "en_tiempo": bool(en_tiempo[indice]),
+        })
+
+    return {"desde": desde, "hasta": hoy, "metas": resultados}
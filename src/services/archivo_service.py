@@ -0,0 +1,322 @@
+"""
+Archivo de transacciones antiguas.
+
+Con `ARCHIVO_ACTIVO=true`, una tarea en segundo plano mueve cada `ARCHIVO_INTERVALO_SEGUNDOS`
+los gastos e ingresos con más de `ARCHIVO_DIAS` días a `gastos_archivo` e
+`ingresos_archivo`. Cada bloque del archivo corresponde a un usuario y un mes y guarda:
+
+    {"usuario_id": ..., "mes": 2023-01-01, "estado": "completo", "cantidad": 120, "total": 5400.0,
+     "referencias": [categorías o metas], "por_dia": [{"dia", "r", "total", "conteo"}, ...],
+     "datos": <transacciones comprimidas>}
+
+Los bloques se escriben primero como `pendiente`, luego se borran las transacciones de las
+colecciones calientes y al final se marcan `completo`. Si el proceso se interrumpe, la
+siguiente pasada termina el borrado de los bloques pendientes. Entre varios procesos solo
+uno archiva a la vez, con un turno registrado en la colección `tareas`.
+
+Uso como comando:
+    python -m src.services.archivo_service archivar [--usuario USUARIO_ID] [--dias DIAS]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import socket
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from pymongo.errors import DuplicateKeyError
+from dotenv import load_dotenv
+from src.db.mongodb.config import mongo_connection
+from src.db.mongodb.indexes import INDICES, sincronizar_indices
+from src.services.rollup_service import inicio_del_dia, inicio_del_mes
+from src.services.transacciones_service import (
+    ARCHIVO_ACTIVO,
+    ARCHIVO_DIAS,
+    COLECCIONES_ARCHIVO,
+    COLECCIONES_BUCKETS,
+    GASTOS,
+    INGRESOS,
+    LAYOUT,
+    LAYOUT_PLANO,
+    REFERENCIAS,
+    comprimir_items,
+    corte_archivo,
+    descomprimir_items,
+    eliminar,
+    item_compacto,
+    origen
+)
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+ARCHIVO_INTERVALO_SEGUNDOS = float(os.getenv("ARCHIVO_INTERVALO_SEGUNDOS", "3600"))
+ARCHIVO_BLOQUE_MAX = int(os.getenv("ARCHIVO_BLOQUE_MAX", "5000"))
+
+COLECCION_TAREAS = "tareas"
+TURNO_ARCHIVO = "archivo"
+# Cada mes archivado extiende el turno al menos este tiempo
+TURNO_RENOVACION_SEGUNDOS = 300
+_DUENO = f"{socket.gethostname()}:{os.getpid()}"
+
+_ultima_pasada: dict = {}
+
+
+def _bloque(tipo: str, usuario_id: str, mes: datetime, documentos: List[dict]) -> dict:
+    campo, _ = REFERENCIAS[tipo]
+    por_dia: Dict[tuple, list] = {}
+    for documento in documentos:
+        clave = (inicio_del_dia(documento["fecha"]), documento[campo])
+        total = por_dia.setdefault(clave, [0, 0])
+        total[0] += documento["monto"]
+        total[1] += 1
+
+    return {
+        "usuario_id": usuario_id,
+        "mes": mes,
+        "estado": "pendiente",
+        "cantidad": len(documentos),
+        "total": sum(documento["monto"] for documento in documentos),
+        "referencias": sorted({documento[campo] for documento in documentos}),
+        "por_dia": [
+            {"dia": dia, "r": referencia, "total": total, "conteo": conteo}
+            for (dia, referencia), (total, conteo) in por_dia.items()
+        ],
+        "datos": comprimir_items([item_compacto(tipo, documento) for documento in documentos]),
+    }
+
+
+async def _completar_bloques(tipo: str, bloques: List[dict]):
+    """
+    Borra de las colecciones calientes las transacciones de bloques ya escritos
+    y los marca como completos.
+    """
+    archivo = mongo_connection.database[COLECCIONES_ARCHIVO[tipo]]
+    for bloque in bloques:
+        ids = [item["_id"] for item in descomprimir_items(bloque["datos"])]
+        await eliminar(tipo, bloque["usuario_id"], ids)
+        await archivo.update_one({"_id": bloque["_id"]}, {"$set": {"estado": "completo"}})
+
+
+async def completar_pendientes():
+    """
+    Termina los bloques que quedaron `pendiente` por una pasada interrumpida.
+    """
+    for tipo, coleccion in COLECCIONES_ARCHIVO.items():
+        pendientes = await mongo_connection.database[coleccion].find({"estado": "pendiente"}).to_list(length=None)
+        if pendientes:
+            logger.info("Archivo: completando %s bloques pendientes de %s", len(pendientes), coleccion)
+            await _completar_bloques(tipo, pendientes)
+
+
+async def _usuarios_con_antiguas(tipo: str, corte: datetime) -> list:
+    db = mongo_connection.database
+    if LAYOUT == LAYOUT_PLANO:
+        return await db[tipo].distinct("usuario_id", {"fecha": {"$lt": corte}})
+    return await db[COLECCIONES_BUCKETS[tipo]].distinct("usuario_id", {"mes": {"$lte": inicio_del_mes(corte)}})
+
+
+def _siguiente_mes(mes: datetime) -> datetime:
+    return datetime(mes.year + mes.month // 12, mes.month % 12 + 1, 1)
+
+
+async def _mes_mas_antiguo(tipo: str, usuario_id: str, corte: datetime) -> Optional[datetime]:
+    db = mongo_connection.database
+    if LAYOUT == LAYOUT_PLANO:
+        documento = await db[tipo].find_one(
+            {"usuario_id": usuario_id, "fecha": {"$lt": corte}}, {"fecha": 1}, sort=[("fecha", 1)]
+        )
+        return inicio_del_mes(documento["fecha"]) if documento else None
+    documento = await db[COLECCIONES_BUCKETS[tipo]].find_one(
+        {"usuario_id": usuario_id, "mes": {"$lte": inicio_del_mes(corte)}}, {"mes": 1}, sort=[("mes", 1)]
+    )
+    return documento["mes"] if documento else None
+
+
+async def _escribir_bloque(archivo, tipo: str, usuario_id: str, mes: datetime, documentos: List[dict]) -> dict:
+    """
+    Escribe un bloque `pendiente` y devuelve solo lo necesario para completarlo.
+    """
+    bloque = _bloque(tipo, usuario_id, mes, documentos)
+    resultado = await archivo.insert_one(bloque)
+    return {"_id": resultado.inserted_id, "usuario_id": usuario_id, "cantidad": bloque["cantidad"], "datos": bloque["datos"]}
+
+
+async def _archivar_mes(tipo: str, usuario_id: str, mes: datetime, hasta: datetime) -> int:
+    """
+    Archiva las transacciones del usuario en [mes, hasta). En memoria solo se
+    juntan hasta `ARCHIVO_BLOQUE_MAX` transacciones antes de escribir su bloque.
+    """
+    archivo = mongo_connection.database[COLECCIONES_ARCHIVO[tipo]]
+    coleccion, etapas = origen(tipo, usuario_id, desde=mes, hasta=hasta)
+    antiguas = mongo_connection.database[coleccion].aggregate(etapas, allowDiskUse=True)
+
+    bloques = []
+    documentos = []
+    async for documento in antiguas:
+        documentos.append(documento)
+        if len(documentos) >= ARCHIVO_BLOQUE_MAX:
+            bloques.append(await _escribir_bloque(archivo, tipo, usuario_id, mes, documentos))
+            documentos = []
+    if documentos:
+        bloques.append(await _escribir_bloque(archivo, tipo, usuario_id, mes, documentos))
+
+    # El borrado de las calientes se hace al terminar de leer el mes
+    await _completar_bloques(tipo, bloques)
+    return sum(bloque["cantidad"] for bloque in bloques)
+
+
+async def archivar_usuario(tipo: str, usuario_id: str, corte: datetime) -> int:
+    """
+    Mueve al archivo las transacciones del usuario anteriores a `corte`, un mes
+    a la vez desde el más antiguo. Devuelve cuántas se archivaron.
+    """
+    mes = await _mes_mas_antiguo(tipo, usuario_id, corte)
+    archivadas = 0
+    while mes is not None and mes < corte:
+        await _renovar_turno()
+        siguiente = _siguiente_mes(mes)
+        archivadas += await _archivar_mes(tipo, usuario_id, mes, min(siguiente, corte))
+        mes = siguiente
+    return archivadas
+
+
+async def archivar(corte: Optional[datetime] = None, usuario_id: Optional[str] = None) -> Dict[str, int]:
+    """
+    Una pasada completa del archivador, que debe correr con el turno tomado.
+    Devuelve cuántas transacciones de cada tipo se archivaron.
+    """
+    corte = corte or corte_archivo()
+    await completar_pendientes()
+
+    archivadas = {}
+    for tipo in (GASTOS, INGRESOS):
+        usuarios = [usuario_id] if usuario_id else await _usuarios_con_antiguas(tipo, corte)
+        archivadas[tipo] = 0
+        for usuario in usuarios:
+            archivadas[tipo] += await archivar_usuario(tipo, usuario, corte)
+    return archivadas
+
+
+async def _tomar_turno(duracion: float) -> bool:
+    """
+    Reserva la ejecución del archivador por `duracion` segundos si nadie más la tiene.
+    """
+    ahora = datetime.utcnow()
+    try:
+        await mongo_connection.database[COLECCION_TAREAS].find_one_and_update(
+            {"_id": TURNO_ARCHIVO, "hasta": {"$lt": ahora}},
+            {"$set": {"hasta": ahora + timedelta(seconds=duracion), "dueno": _DUENO}},
+            upsert=True
+        )
+        return True
+    except DuplicateKeyError:
+        # El documento existe y su turno no venció: otro proceso está archivando
+        return False
+
+
+async def _renovar_turno():
+    """
+    Extiende el turno propio para que una pasada larga no lo deje vencer.
+    """
+    minimo = datetime.utcnow() + timedelta(seconds=TURNO_RENOVACION_SEGUNDOS)
+    resultado = await mongo_connection.database[COLECCION_TAREAS].update_one(
+        {"_id": TURNO_ARCHIVO, "dueno": _DUENO},
+        [{"$set": {"hasta": {"$max": ["$hasta", minimo]}}}]
+    )
+    if resultado.matched_count == 0:
+        raise RuntimeError("El turno del archivador lo tiene otro proceso")
+
+
+async def _liberar_turno():
+    await mongo_connection.database[COLECCION_TAREAS].update_one(
+        {"_id": TURNO_ARCHIVO, "dueno": _DUENO},
+        {"$set": {"hasta": datetime.utcnow()}}
+    )
+
+
+async def _tamanos_indices() -> dict:
+    db = mongo_connection.database
+    nombres = [GASTOS, INGRESOS] if LAYOUT == LAYOUT_PLANO else list(COLECCIONES_BUCKETS.values())
+    tamanos = {}
+    for nombre in nombres:
+        estadisticas = await db.command("collStats", nombre)
+        tamanos[nombre] = estadisticas.get("totalIndexSize", 0)
+    return tamanos
+
+
+async def ejecutar_periodicamente():
+    """
+    Tarea de fondo del lifespan: archiva cada `ARCHIVO_INTERVALO_SEGUNDOS`.
+    """
+    while True:
+        try:
+            if await _tomar_turno(ARCHIVO_INTERVALO_SEGUNDOS):
+                inicio = time.perf_counter()
+                archivadas = await archivar()
+                _ultima_pasada.update({
+                    "fecha": datetime.now().isoformat(timespec="seconds"),
+                    "segundos": time.perf_counter() - inicio,
+                    "archivadas": archivadas,
+                    "bytes_indices_calientes": await _tamanos_indices(),
+                })
+                logger.info("Archivo: %s", _ultima_pasada)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Archivo: falló la pasada del archivador")
+        await asyncio.sleep(ARCHIVO_INTERVALO_SEGUNDOS)
+
+
+def iniciar() -> Optional[asyncio.Task]:
+    """
+    Lanza la tarea de fondo si el archivo está activo.
+    """
+    if not ARCHIVO_ACTIVO:
+        return None
+    return asyncio.create_task(ejecutar_periodicamente())
+
+
+def estadisticas() -> dict:
+    return {
+        "activo": ARCHIVO_ACTIVO,
+        "corte": corte_archivo().isoformat(timespec="seconds"),
+        "ultima_pasada": _ultima_pasada,
+    }
+
+
+async def _main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Archivo de transacciones antiguas")
+    parser.add_argument("accion", choices=["archivar"])
+    parser.add_argument("--usuario", default=None, help="Limita la pasada a un usuario")
+    parser.add_argument("--dias", type=int, default=None, help="Antigüedad mínima a archivar (por defecto ARCHIVO_DIAS)")
+    args = parser.parse_args(argv)
+    # Las lecturas solo consultan el archivo con ARCHIVO_ACTIVO y más atrás de ARCHIVO_DIAS
+    if not ARCHIVO_ACTIVO:
+        parser.error("ARCHIVO_ACTIVO no está habilitado: los datos archivados no serían visibles")
+    if args.dias is not None and args.dias < ARCHIVO_DIAS:
+        parser.error(f"--dias no puede ser menor que ARCHIVO_DIAS ({ARCHIVO_DIAS})")
+
+    await mongo_connection.connect()
+    try:
+        db = mongo_connection.database
+        await sincronizar_indices(db, {nombre: INDICES[nombre] for nombre in COLECCIONES_ARCHIVO.values()})
+        # El mismo turno que la tarea de fondo: dos pasadas a la vez duplicarían bloques
+        if not await _tomar_turno(TURNO_RENOVACION_SEGUNDOS):
+            print("Otro proceso está archivando; intente más tarde")
+            return 1
+        try:
+            corte = datetime.now() - timedelta(days=args.dias) if args.dias is not None else None
+            archivadas = await archivar(corte, args.usuario)
+        finally:
+            await _liberar_turno()
+        print(f"{archivadas[GASTOS]} gastos y {archivadas[INGRESOS]} ingresos archivados")
+        return 0
+    finally:
+        await mongo_connection.close()
+
+
+if __name__ == "__main__":
+    raise SystemExit(asyncio.run(_main()))
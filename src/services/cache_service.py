@@ -0,0 +1,81 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class TTLCache:
+    """
+    Caché en memoria de tamaño acotado con expiración por entrada.
+    Al superar `maxsize` se descarta la entrada usada hace más tiempo (LRU).
+
+    Para no volver a cachear un valor leído antes de una invalidación, quien lo
+    lee toma `generacion()` antes de consultar la fuente y se la pasa a `set`: si
+    entre medio se invalidó alguna entrada, el valor se descarta.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._datos: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Cambia con cada `pop` o `clear`
+        self._generacion = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, clave: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                self.misses += 1
+                return default
+
+            valor, expira = entrada
+            if expira <= time.monotonic():
+                del self._datos[clave]
+                self.misses += 1
+                return default
+
+            self._datos.move_to_end(clave)
+            self.hits += 1
+            return valor
+
+    def generacion(self) -> int:
+        return self._generacion
+
+    def set(self, clave: Hashable, valor: Any, ttl: Optional[float] = None, generacion: Optional[int] = None):
+        """
+        Guarda un valor. `ttl` permite sobrescribir la expiración por defecto para esta entrada.
+        Con `generacion`, no se guarda si hubo invalidaciones desde que se tomó.
+        """
+        expira = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            if generacion is not None and generacion != self._generacion:
+                return
+            self._datos[clave] = (valor, expira)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.maxsize:
+                self._datos.popitem(last=False)
+
+    def pop(self, clave: Hashable):
+        with self._lock:
+            self._generacion += 1
+            self._datos.pop(clave, None)
+
+    def clear(self):
+        with self._lock:
+            self._generacion += 1
+            self._datos.clear()
+
+    def __len__(self) -> int:
+        return len(self._datos)
+
+    def estadisticas(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entradas": len(self._datos),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
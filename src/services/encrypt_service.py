@@ -1,7 +1,87 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional
 import bcrypt
+from fastapi import HTTPException
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Factor de trabajo de bcrypt para los hashes nuevos
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# Hashes que se calculan en paralelo y cuántos más pueden esperar turno
+HASH_MAX_WORKERS = int(os.getenv("HASH_MAX_WORKERS", str(min(4, os.cpu_count() or 1))))
+HASH_MAX_PENDIENTES = int(os.getenv("HASH_MAX_PENDIENTES", "64"))
+
+# bcrypt libera el GIL, así que un pool de hilos basta para sacarlo del event loop
+_executor = ThreadPoolExecutor(max_workers=HASH_MAX_WORKERS, thread_name_prefix="bcrypt")
+# Hashes aceptados que todavía no terminan en el pool (en cola o calculándose)
+_pendientes = 0
+_lock_pendientes = threading.Lock()
 
 def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode('utf-8')
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+
+def costo_hash(hashed_password: str) -> Optional[int]:
+    """
+    Devuelve el factor de trabajo de un hash bcrypt (`$2b$<costo>$...`).
+    """
+    try:
+        return int(hashed_password.split("$")[2])
+    except (IndexError, ValueError):
+        return None
+
+def necesita_rehash(hashed_password: str) -> bool:
+    costo = costo_hash(hashed_password)
+    return costo is not None and costo != BCRYPT_ROUNDS
+
+def _terminado(_futuro: Optional[Future] = None):
+    global _pendientes
+    with _lock_pendientes:
+        _pendientes -= 1
+
+async def _ejecutar(fn, *args):
+    """
+    Ejecuta `fn` en el pool de bcrypt. Si la cola ya está llena responde 503
+    en lugar de seguir acumulando trabajo.
+
+    El cupo se libera cuando el pool termina la tarea y no cuando deja de
+    esperarla: si la petición se cancela, bcrypt sigue ocupando el hilo hasta
+    acabar (una tarea que aún no empezó sí se cancela y libera su cupo).
+    """
+    global _pendientes
+    with _lock_pendientes:
+        if _pendientes >= HASH_MAX_WORKERS + HASH_MAX_PENDIENTES:
+            raise HTTPException(
+                status_code=503,
+                detail="Servicio saturado, intenta de nuevo",
+                headers={"Retry-After": "1"}
+            )
+        _pendientes += 1
+
+    try:
+        futuro = _executor.submit(fn, *args)
+    except BaseException:
+        _terminado()
+        raise
+    futuro.add_done_callback(_terminado)
+    return await asyncio.wrap_future(futuro)
+
+async def hash_password_async(password: str) -> str:
+    return await _ejecutar(hash_password, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _ejecutar(verify_password, plain_password, hashed_password)
+
+def estadisticas() -> dict:
+    return {
+        "workers": HASH_MAX_WORKERS,
+        "max_pendientes": HASH_MAX_PENDIENTES,
+        "en_curso": _pendientes,
+        "rounds": BCRYPT_ROUNDS,
+    }
@@ -0,0 +1,43 @@
+from bisect import bisect_left
+from typing import Sequence
+
+# Límites por defecto para latencias, en segundos
+BUCKETS_LATENCIA = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class Histogram:
+    """
+    Histograma de buckets fijos (semántica `le` de Prometheus: cada observación
+    cuenta en el primer bucket cuyo límite es mayor o igual al valor).
+    No usa locks: se observa desde el event loop, y quien observe desde otros
+    hilos debe sincronizarse por su cuenta (como `MongoPoolMonitor`).
+    """
+
+    def __init__(self, buckets: Sequence[float] = BUCKETS_LATENCIA):
+        self.buckets = tuple(sorted(buckets))
+        self._conteos = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, valor: float):
+        self._conteos[bisect_left(self.buckets, valor)] += 1
+        self.count += 1
+        self.sum += valor
+
+    def acumulados(self) -> list:
+        """
+        Pares (límite, conteo acumulado), terminando en `+Inf`.
+        """
+        acumulado = 0
+        resultado = []
+        for limite, conteo in zip(self.buckets + (float("inf"),), self._conteos):
+            acumulado += conteo
+            resultado.append((limite, acumulado))
+        return resultado
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "buckets": {("+Inf" if limite == float("inf") else limite): conteo for limite, conteo in self.acumulados()},
+        }
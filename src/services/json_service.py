@@ -0,0 +1,17 @@
+from fastapi.responses import Response
+from pydantic import BaseModel, TypeAdapter
+
+
+def respuesta_json(datos, adapter: TypeAdapter = None, status_code: int = 200) -> Response:
+    """
+    Serializa modelos ya validados directamente a bytes con el serializador de
+    pydantic-core, sin que FastAPI vuelva a validarlos contra `response_model`.
+    """
+    if adapter is not None:
+        contenido = adapter.dump_json(datos, by_alias=True)
+    elif isinstance(datos, BaseModel):
+        contenido = datos.model_dump_json(by_alias=True)
+    else:
+        raise TypeError("Se necesita un TypeAdapter para serializar datos que no son un modelo")
+
+    return Response(content=contenido, status_code=status_code, media_type="application/json")
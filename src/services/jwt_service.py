@@ -1,9 +1,16 @@
+import hashlib
 import jwt as pyjwt
+import threading
+import time
 from datetime import datetime, timedelta
+from types import MappingProxyType
+from typing import Mapping
 from fastapi import HTTPException, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import os
 from dotenv import load_dotenv
+from src.db.mongodb.config import mongo_connection
+from src.services.cache_service import TTLCache
 
 load_dotenv()
 
@@ -14,17 +21,115 @@ security = HTTPBearer()
 SECRET_KEY = get_secret()
 ALGORITHM = "HS256"
 
+# Payloads ya verificados, por digest del token. Cada entrada vence con el `exp` del token
+token_cache = TTLCache(
+    maxsize=int(os.getenv("JWT_CACHE_TAMANO", "10000")),
+    ttl=float(os.getenv("JWT_CACHE_TTL_SEGUNDOS", "300"))
+)
+# Tokens revocados antes de su `exp`, compartidos entre procesos: un documento por
+# digest con su `exp`, que el índice TTL de la colección borra al vencer
+COLECCION_REVOCADOS = "tokens_revocados"
+# Copia local de las revocaciones ya vistas por este proceso
+tokens_revocados = TTLCache(maxsize=int(os.getenv("JWT_REVOCADOS_TAMANO", "100000")), ttl=86400)
+
+_decodificaciones = 0
+_segundos_decodificando = 0.0
+_lock_estadisticas = threading.Lock()
+
+def _digest(token: str) -> bytes:
+    return hashlib.sha256(token.encode("utf-8")).digest()
+
+def _segundos_hasta_exp(payload: Mapping) -> float:
+    exp = payload.get("exp")
+    return exp - time.time() if isinstance(exp, (int, float)) else token_cache.ttl
+
 def create_token(data: dict) -> str:
     to_encode = data.copy()
     to_encode.update({"exp": datetime.utcnow() + timedelta(hours=24)})
     return pyjwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
+def _decodificar(token: str) -> Mapping:
+    global _decodificaciones, _segundos_decodificando
+    inicio = time.perf_counter()
     try:
-        token = credentials.credentials
         payload = pyjwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
     except pyjwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token ha expirado")
-    except pyjwt.JWTError:
-        raise HTTPException(status_code=401, detail="Token inválido")
\ No newline at end of file
+    except pyjwt.InvalidTokenError:
+        raise HTTPException(status_code=401, detail="Token inválido")
+    finally:
+        with _lock_estadisticas:
+            _decodificaciones += 1
+            _segundos_decodificando += time.perf_counter() - inicio
+    # El mismo payload se comparte entre peticiones: se entrega de solo lectura
+    return MappingProxyType(payload)
+
+async def _revocado_compartido(clave: bytes) -> bool:
+    revocado = await mongo_connection.database[COLECCION_REVOCADOS].find_one({"_id": clave}, {"_id": 1})
+    return revocado is not None
+
+async def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)) -> Mapping:
+    """
+    Verifica el token y devuelve su payload. Un token ya verificado se sirve desde
+    `token_cache` sin repetir la verificación de la firma ni de los claims.
+
+    Las revocaciones hechas en este proceso se aplican de inmediato. Las de otros
+    procesos se consultan en MongoDB al verificar un token que no está en caché,
+    así que un token ya cacheado aquí sigue aceptándose hasta que vence su entrada
+    (como mucho `JWT_CACHE_TTL_SEGUNDOS`).
+    """
+    token = credentials.credentials
+    clave = _digest(token)
+
+    if tokens_revocados.get(clave) is not None:
+        raise HTTPException(status_code=401, detail="Token revocado")
+
+    payload = token_cache.get(clave)
+    if payload is not None:
+        return payload
+
+    payload = _decodificar(token)
+    ttl = _segundos_hasta_exp(payload)
+    if await _revocado_compartido(clave):
+        if ttl > 0:
+            tokens_revocados.set(clave, True, ttl=ttl)
+        raise HTTPException(status_code=401, detail="Token revocado")
+
+    if ttl > 0:
+        token_cache.set(clave, payload, ttl=ttl)
+    return payload
+
+async def revocar_token(token: str):
+    """
+    Rechaza el token desde ahora hasta su `exp`, aunque siga siendo válido, en este
+    proceso y en los demás.
+    """
+    try:
+        payload = pyjwt.decode(token, options={"verify_signature": False, "verify_exp": False})
+    except pyjwt.InvalidTokenError:
+        return
+
+    clave = _digest(token)
+    token_cache.pop(clave)
+    ttl = _segundos_hasta_exp(payload)
+    if ttl <= 0:
+        return
+
+    tokens_revocados.set(clave, True, ttl=ttl)
+    await mongo_connection.database[COLECCION_REVOCADOS].update_one(
+        {"_id": clave},
+        {"$set": {"exp": datetime.utcnow() + timedelta(seconds=ttl)}},
+        upsert=True
+    )
+
+def estadisticas() -> dict:
+    promedio = _segundos_decodificando / _decodificaciones if _decodificaciones else 0.0
+    cache = token_cache.estadisticas()
+    return {
+        **cache,
+        "revocados": len(tokens_revocados),
+        "segundos_por_decodificacion": promedio,
+        # Cada hit evita una decodificación completa
+        "segundos_ahorrados": cache["hits"] * promedio,
+        "segundos_ahorrados_por_peticion": cache["hit_rate"] * promedio,
+    }
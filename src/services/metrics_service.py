@@ -0,0 +1,185 @@
+"""
+Métricas de la API en formato de texto de Prometheus.
+
+`MetricsMiddleware` registra por cada petición su latencia (por método y plantilla de
+ruta), su código de estado y las llamadas que hizo a MongoDB y PostgreSQL. El scope
+ASGI de la petición en curso viaja en un `ContextVar` (Motor y SQLAlchemy propagan el
+contexto a sus hilos y greenlets); los listeners de cada driver crean el
+`ContadoresDB` de la petición con su primera llamada y lo guardan en el scope. Así una
+petición que no consulta ninguna base de datos solo paga una observación de latencia:
+en el histograma de llamadas cuenta como 0 al exportar.
+"""
+from collections import defaultdict
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+from src.services.histogram_service import Histogram
+
+BASES_DE_DATOS = ("mongodb", "postgresql")
+BUCKETS_LLAMADAS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# Plantilla usada cuando la petición no coincidió con ninguna ruta
+RUTA_DESCONOCIDA = "sin_ruta"
+
+
+class ContadoresDB:
+    """
+    Llamadas y tiempo acumulado en cada base de datos durante una petición.
+    """
+    __slots__ = ("llamadas", "segundos")
+
+    def __init__(self):
+        self.llamadas = {"mongodb": 0, "postgresql": 0}
+        self.segundos = {"mongodb": 0.0, "postgresql": 0.0}
+
+
+# Claves del scope ASGI donde quedan el `ContadoresDB`, el código de estado y la
+# duración de la petición
+CLAVE_CONTADORES = "contadores_db"
+CLAVE_ESTADO = "estado_respuesta"
+CLAVE_DURACION = "duracion"
+
+# Scope ASGI de la petición en curso
+peticion_actual: ContextVar[Optional[dict]] = ContextVar("peticion_actual", default=None)
+
+
+def contadores_de(scope: dict) -> Optional[ContadoresDB]:
+    """
+    Contadores de la petición, o None si no hizo ninguna llamada a una base de datos.
+    """
+    return scope.get(CLAVE_CONTADORES)
+
+
+def registrar_llamada_db(base_de_datos: str, segundos: float):
+    """
+    Suma una llamada a la base de datos indicada en la petición en curso, si la hay.
+    """
+    scope = peticion_actual.get()
+    if scope is None:
+        return
+    contadores = scope.get(CLAVE_CONTADORES)
+    if contadores is None:
+        # Dos hilos de la misma petición pueden llegar a la vez: se queda el primero
+        contadores = scope.setdefault(CLAVE_CONTADORES, ContadoresDB())
+    contadores.llamadas[base_de_datos] += 1
+    contadores.segundos[base_de_datos] += segundos
+
+
+class SerieRuta:
+    """
+    Métricas de un par (método, plantilla de ruta).
+    """
+    __slots__ = ("respuestas", "latencia", "llamadas_db", "segundos_db")
+
+    def __init__(self):
+        self.respuestas: Dict[int, int] = defaultdict(int)
+        self.latencia = Histogram()
+        self.llamadas_db = {db: Histogram(BUCKETS_LLAMADAS) for db in BASES_DE_DATOS}
+        self.segundos_db = dict.fromkeys(BASES_DE_DATOS, 0.0)
+
+
+# Peticiones que se acumulan antes de sumarlas a las series
+MAX_PENDIENTES = 256
+
+
+class Metricas:
+    """
+    MetricsMiddleware solo encola en `pendientes` el scope de cada petición que empieza
+    (y llama a `consolidar` al llegar a `limite`); al terminar deja en él el estado y
+    la duración. Las series se actualizan en lote en `consolidar` y al exportar:
+    sumarlas una por una al final de cada petición, con las cachés de la CPU ya frías,
+    costaba varias veces más.
+    """
+
+    def __init__(self):
+        self.series: Dict[Tuple[str, str], SerieRuta] = {}
+        self.pendientes: List[dict] = []
+        self.limite = MAX_PENDIENTES
+
+    def consolidar(self):
+        """
+        Suma a las series las peticiones pendientes que ya terminaron.
+        """
+        en_curso = []
+        for scope in self.pendientes:
+            segundos = scope.get(CLAVE_DURACION)
+            if segundos is None:
+                en_curso.append(scope)
+                continue
+            metodo = scope["method"]
+            ruta = getattr(scope.get("route"), "path", RUTA_DESCONOCIDA)
+            serie = self.series.get((metodo, ruta))
+            if serie is None:
+                serie = self.series[(metodo, ruta)] = SerieRuta()
+            serie.respuestas[scope.get(CLAVE_ESTADO, 500)] += 1
+            serie.latencia.observe(segundos)
+            contadores = scope.get(CLAVE_CONTADORES)
+            if contadores is not None:
+                for db, llamadas in contadores.llamadas.items():
+                    serie.llamadas_db[db].observe(llamadas)
+                    serie.segundos_db[db] += contadores.segundos[db]
+        self.pendientes = en_curso
+        # Las peticiones largas que siguen en curso no adelantan la próxima consolidación
+        self.limite = len(en_curso) + MAX_PENDIENTES
+
+    def en_curso(self) -> Dict[str, int]:
+        self.consolidar()
+        en_curso = dict.fromkeys((metodo for metodo, _ in self.series), 0)
+        for scope in self.pendientes:
+            en_curso[scope["method"]] = en_curso.get(scope["method"], 0) + 1
+        return en_curso
+
+    def exportar(self) -> str:
+        self.consolidar()
+        series = sorted((f'method="{metodo}",route="{_escapar(ruta)}"', serie) for (metodo, ruta), serie in self.series.items())
+        lineas = []
+
+        lineas.append("# HELP http_requests_in_flight Peticiones HTTP en curso.")
+        lineas.append("# TYPE http_requests_in_flight gauge")
+        for metodo, valor in sorted(self.en_curso().items()):
+            lineas.append(f'http_requests_in_flight{{method="{metodo}"}} {valor}')
+
+        lineas.append("# HELP http_responses_total Respuestas HTTP por ruta y código de estado.")
+        lineas.append("# TYPE http_responses_total counter")
+        for etiquetas, serie in series:
+            for estado, valor in sorted(serie.respuestas.items()):
+                lineas.append(f'http_responses_total{{{etiquetas},status="{estado}"}} {valor}')
+
+        _exportar_histogramas(
+            lineas, "http_request_duration_seconds", "Latencia de las peticiones HTTP.",
+            [(etiquetas, serie.latencia, 0) for etiquetas, serie in series]
+        )
+        # Las peticiones sin llamadas a ninguna base de datos no se observaron: cuentan como 0
+        _exportar_histogramas(
+            lineas, "db_calls_per_request", "Llamadas a cada base de datos por petición.",
+            [
+                (f'{etiquetas},db="{db}"', histograma, serie.latencia.count - histograma.count)
+                for etiquetas, serie in series for db, histograma in serie.llamadas_db.items()
+            ]
+        )
+
+        lineas.append("# HELP db_time_seconds_total Tiempo acumulado en cada base de datos por ruta.")
+        lineas.append("# TYPE db_time_seconds_total counter")
+        for etiquetas, serie in series:
+            for db, valor in serie.segundos_db.items():
+                lineas.append(f'db_time_seconds_total{{{etiquetas},db="{db}"}} {valor}')
+
+        return "\n".join(lineas) + "\n"
+
+
+def _escapar(valor: str) -> str:
+    return valor.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _exportar_histogramas(lineas: list, nombre: str, descripcion: str, histogramas: list):
+    lineas.append(f"# HELP {nombre} {descripcion}")
+    lineas.append(f"# TYPE {nombre} histogram")
+    for etiquetas, histograma, ceros in histogramas:
+        # `ceros` son observaciones de valor 0 no registradas: caen en todos los buckets
+        for limite, acumulado in histograma.acumulados():
+            le = "+Inf" if limite == float("inf") else repr(float(limite))
+            lineas.append(f'{nombre}_bucket{{{etiquetas},le="{le}"}} {acumulado + ceros}')
+        lineas.append(f"{nombre}_sum{{{etiquetas}}} {histograma.sum}")
+        lineas.append(f"{nombre}_count{{{etiquetas}}} {histograma.count + ceros}")
+
+
+metricas = Metricas()
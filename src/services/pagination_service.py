@@ -0,0 +1,65 @@
+import base64
+import json
+import os
+from datetime import datetime
+from typing import Optional, Tuple
+from bson import ObjectId
+from fastapi import HTTPException
+from dotenv import load_dotenv
+
+load_dotenv()
+
+TAMANO_PAGINA_DEFECTO = int(os.getenv("PAGINA_TAMANO_DEFECTO", "50"))
+TAMANO_PAGINA_MAXIMO = int(os.getenv("PAGINA_TAMANO_MAXIMO", "500"))
+# Las listas se devuelven como arreglo; el cursor de la página siguiente va en esta cabecera
+CABECERA_CURSOR = "X-Next-Cursor"
+
+
+def codificar_cursor(fecha: datetime, documento_id) -> str:
+    """
+    Genera un cursor opaco a partir de la clave (fecha, _id) del último elemento de la página.
+    """
+    contenido = json.dumps({"f": fecha.isoformat(), "i": str(documento_id)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(contenido.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decodificar_cursor(cursor: str) -> Tuple[datetime, ObjectId]:
+    """
+    Recupera la clave (fecha, _id) de un cursor generado por `codificar_cursor`.
+    """
+    try:
+        relleno = "=" * (-len(cursor) % 4)
+        contenido = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+        return datetime.fromisoformat(contenido["f"]), ObjectId(contenido["i"])
+    except Exception:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+
+def filtro_pagina(filtro: dict, cursor: Optional[str]) -> dict:
+    """
+    Agrega al filtro la condición para continuar después del cursor, en orden
+    descendente por (fecha, _id).
+    """
+    if not cursor:
+        return filtro
+
+    fecha, documento_id = decodificar_cursor(cursor)
+    filtro.setdefault("fecha", {})["$lte"] = fecha
+    filtro["$or"] = [
+        {"fecha": {"$lt": fecha}},
+        {"fecha": fecha, "_id": {"$lt": documento_id}},
+    ]
+    return filtro
+
+
+def armar_pagina(documentos: list, limite: int) -> Tuple[list, Optional[str]]:
+    """
+    Recorta los documentos a `limite` y calcula el cursor siguiente.
+    Se espera que la consulta haya pedido `limite + 1` documentos.
+    """
+    if len(documentos) <= limite:
+        return documentos, None
+
+    documentos = documentos[:limite]
+    ultimo = documentos[-1]
+    return documentos, codificar_cursor(ultimo["fecha"], ultimo["_id"])
@@ -0,0 +1,25 @@
+import os
+from dotenv import load_dotenv
+from src.services.cache_service import TTLCache
+
+load_dotenv()
+
+def get_confiar_claims() -> bool:
+    return os.getenv("AUTH_CONFIAR_CLAIMS", "false").lower() in ("1", "true", "yes")
+
+CONFIAR_CLAIMS = get_confiar_claims()
+
+# Usuarios autenticados recientemente, por id. `invalidar_principal` solo alcanza a
+# este proceso: los demás pueden usar la fila anterior hasta AUTH_CACHE_TTL_SEGUNDOS.
+# Se acepta esa ventana porque la fila solo confirma que el usuario existe y
+# ninguna ruta permite borrarlo; los cambios de sus datos son los que tardan
+principal_cache = TTLCache(
+    maxsize=int(os.getenv("AUTH_CACHE_TAMANO", "4096")),
+    ttl=float(os.getenv("AUTH_CACHE_TTL_SEGUNDOS", "60"))
+)
+
+def invalidar_principal(usuario_id: str):
+    """
+    Descarta el usuario autenticado en caché, p. ej. después de modificarlo.
+    """
+    principal_cache.pop(usuario_id)
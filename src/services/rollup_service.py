@@ -0,0 +1,320 @@
+"""
+Acumulados de gastos e ingresos mantenidos en cada escritura.
+
+La colección `gastos_diarios` guarda un documento por (usuario_id, categoria_id, dia)
+con el total y la cantidad de gastos de ese día. `registrar_gasto` la mantiene al día y
+los resúmenes por período se calculan sobre ella en lugar de recorrer `gastos`.
+
+La colección `resumenes_mensual` guarda un documento por (usuario_id, fecha), donde
+`fecha` es el primer día del mes, con `total_ingresos`, `total_gastos` y `balance`.
+
+Uso como comando:
+    python -m src.services.rollup_service backfill [--usuario USUARIO_ID]
+    python -m src.services.rollup_service verificar [--usuario USUARIO_ID]
+"""
+import argparse
+import asyncio
+from datetime import datetime
+from typing import Optional
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import UpdateOne
+from src.db.mongodb.config import mongo_connection
+from src.db.mongodb.indexes import INDICES, sincronizar_indices
+from src.services import transacciones_service, write_batcher
+
+COLECCION_GASTOS_DIARIOS = "gastos_diarios"
+CLAVE_GASTOS_DIARIOS = ["usuario_id", "categoria_id", "dia"]
+COLECCION_RESUMENES_MENSUAL = "resumenes_mensual"
+CLAVE_RESUMENES_MENSUAL = ["usuario_id", "fecha"]
+
+
+def inicio_del_dia(fecha: datetime) -> datetime:
+    """
+    Trunca una fecha al inicio de su día.
+    """
+    return datetime(fecha.year, fecha.month, fecha.day)
+
+
+def inicio_del_mes(fecha: datetime) -> datetime:
+    """
+    Trunca una fecha al primer día de su mes.
+    """
+    return datetime(fecha.year, fecha.month, 1)
+
+
+async def acumular_gasto_diario(usuario_id: str, categoria_id: str, fecha: datetime, monto: float):
+    """
+    Suma un gasto al acumulado de su día, agrupado con otras escrituras si
+    `WRITE_BATCHING` está activo.
+    """
+    await write_batcher.actualizar(
+        COLECCION_GASTOS_DIARIOS,
+        {"usuario_id": usuario_id, "categoria_id": categoria_id, "dia": inicio_del_dia(fecha)},
+        {"$inc": {"total": monto, "conteo": 1}},
+        upsert=True
+    )
+
+
+async def acumular_resumen_mensual(usuario_id: str, fecha: datetime, ingresos: float = 0, gastos: float = 0):
+    """
+    Suma ingresos y/o gastos al resumen del mes de `fecha`, agrupado con otras
+    escrituras si `WRITE_BATCHING` está activo.
+    """
+    await write_batcher.actualizar(
+        COLECCION_RESUMENES_MENSUAL,
+        {"usuario_id": usuario_id, "fecha": inicio_del_mes(fecha)},
+        {"$inc": {"total_ingresos": ingresos, "total_gastos": gastos, "balance": ingresos - gastos}},
+        upsert=True
+    )
+
+
+async def acumular_gastos_en_lote(usuario_id: str, gastos: list):
+    """
+    Suma un lote de gastos a los acumulados diarios y mensuales con un solo
+    `bulk_write` por colección, agrupando antes por día y por mes.
+    """
+    por_dia = {}
+    por_mes = {}
+    for gasto in gastos:
+        clave_dia = (gasto["categoria_id"], inicio_del_dia(gasto["fecha"]))
+        total, conteo = por_dia.get(clave_dia, (0, 0))
+        por_dia[clave_dia] = (total + gasto["monto"], conteo + 1)
+
+        mes = inicio_del_mes(gasto["fecha"])
+        por_mes[mes] = por_mes.get(mes, 0) + gasto["monto"]
+
+    if not por_dia:
+        return
+
+    db = mongo_connection.database
+    await db[COLECCION_GASTOS_DIARIOS].bulk_write([
+        UpdateOne(
+            {"usuario_id": usuario_id, "categoria_id": categoria_id, "dia": dia},
+            {"$inc": {"total": total, "conteo": conteo}},
+            upsert=True
+        )
+        for (categoria_id, dia), (total, conteo) in por_dia.items()
+    ], ordered=False)
+    await db[COLECCION_RESUMENES_MENSUAL].bulk_write([
+        UpdateOne(
+            {"usuario_id": usuario_id, "fecha": mes},
+            {"$inc": {"total_ingresos": 0, "total_gastos": total, "balance": -total}},
+            upsert=True
+        )
+        for mes, total in por_mes.items()
+    ], ordered=False)
+
+
+def _pipeline_acumulados(usuario_id: Optional[str] = None) -> tuple:
+    """
+    Agrupa los gastos crudos por (usuario_id, categoria_id, dia).
+    Devuelve la colección sobre la que se ejecuta y el pipeline.
+    """
+    coleccion, etapas = transacciones_service.origen("gastos", usuario_id)
+    coleccion_archivo, etapas_archivo = transacciones_service.origen_archivado("gastos", usuario_id)
+    return coleccion, etapas + [
+        # Los gastos archivados aportan sus totales por día, con su `conteo`
+        {"$unionWith": {"coll": coleccion_archivo, "pipeline": etapas_archivo}},
+        {
+            "$group": {
+                "_id": {
+                    "usuario_id": "$usuario_id",
+                    "categoria_id": "$categoria_id",
+                    "dia": {
+                        "$dateFromParts": {
+                            "year": {"$year": "$fecha"},
+                            "month": {"$month": "$fecha"},
+                            "day": {"$dayOfMonth": "$fecha"},
+                        }
+                    },
+                },
+                "total": {"$sum": "$monto"},
+                "conteo": {"$sum": {"$ifNull": ["$conteo", 1]}},
+            }
+        },
+        {
+            "$project": {
+                "_id": 0,
+                "usuario_id": "$_id.usuario_id",
+                "categoria_id": "$_id.categoria_id",
+                "dia": "$_id.dia",
+                "total": 1,
+                "conteo": 1,
+            }
+        },
+    ]
+
+
+async def reconstruir_gastos_diarios(usuario_id: Optional[str] = None):
+    """
+    Reconstruye los acumulados diarios a partir de los gastos guardados.
+    Si se indica un usuario solo se reconstruyen los suyos.
+    """
+    db = mongo_connection.database
+    acumulados_db: AsyncIOMotorCollection = db[COLECCION_GASTOS_DIARIOS]
+
+    # `$merge` necesita un índice único sobre los campos de `on`
+    await sincronizar_indices(db, {COLECCION_GASTOS_DIARIOS: INDICES[COLECCION_GASTOS_DIARIOS]})
+    await acumulados_db.delete_many({"usuario_id": usuario_id} if usuario_id else {})
+
+    coleccion, pipeline = _pipeline_acumulados(usuario_id)
+    pipeline = pipeline + [
+        {
+            "$merge": {
+                "into": COLECCION_GASTOS_DIARIOS,
+                "on": CLAVE_GASTOS_DIARIOS,
+                "whenMatched": "replace",
+                "whenNotMatched": "insert",
+            }
+        }
+    ]
+    await db[coleccion].aggregate(pipeline, allowDiskUse=True).to_list(length=None)
+
+
+def _expresion_mes(campo: str) -> dict:
+    return {"$dateFromParts": {"year": {"$year": campo}, "month": {"$month": campo}, "day": 1}}
+
+
+async def reconstruir_resumenes_mensuales(usuario_id: Optional[str] = None):
+    """
+    Reconstruye los resúmenes mensuales a partir de `gastos` e `ingresos`.
+    Si se indica un usuario solo se reconstruyen los suyos.
+    """
+    db = mongo_connection.database
+    resumenes_db: AsyncIOMotorCollection = db[COLECCION_RESUMENES_MENSUAL]
+
+    await sincronizar_indices(db, {COLECCION_RESUMENES_MENSUAL: INDICES[COLECCION_RESUMENES_MENSUAL]})
+    await resumenes_db.delete_many({"usuario_id": usuario_id} if usuario_id else {})
+
+    coleccion_gastos, etapas_gastos = transacciones_service.origen("gastos", usuario_id)
+    coleccion_ingresos, etapas_ingresos = transacciones_service.origen("ingresos", usuario_id)
+    coleccion_gastos_archivo, etapas_gastos_archivo = transacciones_service.origen_archivado("gastos", usuario_id)
+    coleccion_ingresos_archivo, etapas_ingresos_archivo = transacciones_service.origen_archivado("ingresos", usuario_id)
+    pipeline = etapas_gastos + [
+        {"$project": {"usuario_id": 1, "fecha": _expresion_mes("$fecha"), "gastos": "$monto", "ingresos": {"$literal": 0}}},
+        {
+            "$unionWith": {
+                "coll": coleccion_ingresos,
+                "pipeline": etapas_ingresos + [
+                    {"$project": {"usuario_id": 1, "fecha": _expresion_mes("$fecha"), "gastos": {"$literal": 0}, "ingresos": "$monto"}},
+                ],
+            }
+        },
+        {
+            "$unionWith": {
+                "coll": coleccion_gastos_archivo,
+                "pipeline": etapas_gastos_archivo + [
+                    {"$project": {"usuario_id": 1, "fecha": _expresion_mes("$fecha"), "gastos": "$monto", "ingresos": {"$literal": 0}}},
+                ],
+            }
+        },
+        {
+            "$unionWith": {
+                "coll": coleccion_ingresos_archivo,
+                "pipeline": etapas_ingresos_archivo + [
+                    {"$project": {"usuario_id": 1, "fecha": _expresion_mes("$fecha"), "gastos": {"$literal": 0}, "ingresos": "$monto"}},
+                ],
+            }
+        },
+        {
+            "$group": {
+                "_id": {"usuario_id": "$usuario_id", "fecha": "$fecha"},
+                "total_gastos": {"$sum": "$gastos"},
+                "total_ingresos": {"$sum": "$ingresos"},
+            }
+        },
+        {
+            "$project": {
+                "_id": 0,
+                "usuario_id": "$_id.usuario_id",
+                "fecha": "$_id.fecha",
+                "total_gastos": 1,
+                "total_ingresos": 1,
+                "balance": {"$subtract": ["$total_ingresos", "$total_gastos"]},
+            }
+        },
+        {
+            "$merge": {
+                "into": COLECCION_RESUMENES_MENSUAL,
+                "on": CLAVE_RESUMENES_MENSUAL,
+                "whenMatched": "replace",
+                "whenNotMatched": "insert",
+            }
+        },
+    ]
+    await db[coleccion_gastos].aggregate(pipeline, allowDiskUse=True).to_list(length=None)
+
+
+def _clave(documento: dict) -> tuple:
+    return tuple(documento[campo] for campo in CLAVE_GASTOS_DIARIOS)
+
+
+async def _siguiente(cursor) -> Optional[dict]:
+    documentos = await cursor.to_list(length=1)
+    return documentos[0] if documentos else None
+
+
+async def verificar_gastos_diarios(usuario_id: Optional[str] = None, tolerancia: float = 1e-6) -> list:
+    """
+    Compara los acumulados guardados con los recalculados desde `gastos`.
+    Devuelve la lista de diferencias encontradas.
+    """
+    db = mongo_connection.database
+    orden = [(campo, 1) for campo in CLAVE_GASTOS_DIARIOS]
+    match = {"usuario_id": usuario_id} if usuario_id else {}
+
+    coleccion, pipeline = _pipeline_acumulados(usuario_id)
+    esperados = db[coleccion].aggregate(pipeline + [{"$sort": dict(orden)}], allowDiskUse=True)
+    guardados = db[COLECCION_GASTOS_DIARIOS].find(match, {"_id": 0}).sort(orden)
+
+    diferencias = []
+    esperado = await _siguiente(esperados)
+    guardado = await _siguiente(guardados)
+
+    # Recorrido en paralelo de ambos cursores, ordenados por la misma clave
+    while esperado or guardado:
+        if guardado is None or (esperado is not None and _clave(esperado) < _clave(guardado)):
+            diferencias.append({"clave": _clave(esperado), "esperado": esperado["total"], "guardado": None})
+            esperado = await _siguiente(esperados)
+        elif esperado is None or _clave(guardado) < _clave(esperado):
+            diferencias.append({"clave": _clave(guardado), "esperado": None, "guardado": guardado["total"]})
+            guardado = await _siguiente(guardados)
+        else:
+            if (abs(esperado["total"] - guardado["total"]) > tolerancia
+                    or esperado["conteo"] != guardado.get("conteo")):
+                diferencias.append({
+                    "clave": _clave(esperado),
+                    "esperado": esperado["total"],
+                    "guardado": guardado["total"],
+                })
+            esperado = await _siguiente(esperados)
+            guardado = await _siguiente(guardados)
+
+    return diferencias
+
+
+async def _main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Mantenimiento de los acumulados de gastos e ingresos")
+    parser.add_argument("accion", choices=["backfill", "verificar"])
+    parser.add_argument("--usuario", default=None, help="Limita la operación a un usuario")
+    args = parser.parse_args(argv)
+
+    await mongo_connection.connect()
+    try:
+        if args.accion == "backfill":
+            await reconstruir_gastos_diarios(args.usuario)
+            await reconstruir_resumenes_mensuales(args.usuario)
+            print("Acumulados diarios y resúmenes mensuales reconstruidos")
+            return 0
+
+        diferencias = await verificar_gastos_diarios(args.usuario)
+        for diferencia in diferencias:
+            print(diferencia)
+        print(f"{len(diferencias)} diferencias encontradas")
+        return 1 if diferencias else 0
+    finally:
+        await mongo_connection.close()
+
+
+if __name__ == "__main__":
+    raise SystemExit(asyncio.run(_main()))
@@ -0,0 +1,638 @@
+"""
+Almacenamiento de gastos e ingresos.
+
+Con `TRANSACCIONES_LAYOUT=plano` (por defecto) cada transacción es un documento de
+`gastos` o `ingresos`. Con `TRANSACCIONES_LAYOUT=buckets` se guardan en `gastos_buckets`
+e `ingresos_buckets`: un documento por usuario y mes con las transacciones en forma
+compacta y los totales del bucket:
+
+    {"usuario_id": ..., "mes": 2024-05-01, "cantidad": 2, "total": 150.0,
+     "items": [{"_id": ObjectId, "m": 100.0, "f": fecha, "d": "descripción", "c": categoria_id}, ...]}
+
+En los ingresos la referencia a la meta va en `meta` en lugar de `c`. Un bucket admite
+hasta `TRANSACCIONES_BUCKET_MAX` transacciones; al llenarse se abre otro para el mismo mes.
+
+Con `ARCHIVO_ACTIVO=true`, `archivo_service` mueve las transacciones con más de
+`ARCHIVO_DIAS` días a `gastos_archivo` e `ingresos_archivo`, en bloques por usuario y mes
+con las transacciones comprimidas (zlib sobre BSON) y sus totales por día. Las lecturas
+cuyo rango llega más atrás del corte combinan ambas fuentes.
+
+Los controladores leen y escriben siempre a través de este módulo y reciben documentos
+con la forma plana, sin importar el layout.
+
+Uso como comando (migra los datos entre layouts, usuario por usuario):
+    python -m src.services.transacciones_service migrar buckets [--usuario USUARIO_ID] [--borrar-origen]
+    python -m src.services.transacciones_service migrar plano [--usuario USUARIO_ID] [--borrar-origen]
+"""
+import argparse
+import asyncio
+import os
+import zlib
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+import bson
+from bson import Binary, ObjectId
+from pymongo import DESCENDING, ReplaceOne, UpdateOne
+from pymongo.errors import BulkWriteError
+from dotenv import load_dotenv
+from src.db.mongodb.config import mongo_connection
+from src.db.mongodb.indexes import INDICES, sincronizar_indices
+from src.services import write_batcher
+from src.services.pagination_service import TAMANO_PAGINA_DEFECTO, armar_pagina, decodificar_cursor, filtro_pagina
+
+load_dotenv()
+
+LAYOUT_PLANO = "plano"
+LAYOUT_BUCKETS = "buckets"
+LAYOUT = os.getenv("TRANSACCIONES_LAYOUT", LAYOUT_PLANO).lower()
+BUCKET_MAX = int(os.getenv("TRANSACCIONES_BUCKET_MAX", "1000"))
+
+def get_archivo_activo() -> bool:
+    return os.getenv("ARCHIVO_ACTIVO", "false").lower() in ("1", "true", "yes")
+
+# Las transacciones con más de ARCHIVO_DIAS días se mueven al archivo comprimido
+ARCHIVO_ACTIVO = get_archivo_activo()
+ARCHIVO_DIAS = int(os.getenv("ARCHIVO_DIAS", "90"))
+
+# Colección plana, colección de buckets y campo de referencia de cada tipo de transacción
+GASTOS = "gastos"
+INGRESOS = "ingresos"
+COLECCIONES_BUCKETS = {GASTOS: "gastos_buckets", INGRESOS: "ingresos_buckets"}
+COLECCIONES_ARCHIVO = {GASTOS: "gastos_archivo", INGRESOS: "ingresos_archivo"}
+REFERENCIAS = {GASTOS: ("categoria_id", "c"), INGRESOS: ("meta_id", "meta")}
+
+
+def _layout(layout: Optional[str]) -> str:
+    return layout or LAYOUT
+
+
+def _mes(fecha: datetime) -> datetime:
+    return datetime(fecha.year, fecha.month, 1)
+
+
+def corte_archivo(ahora: Optional[datetime] = None) -> datetime:
+    """
+    Fecha a partir de la cual las transacciones siguen en las colecciones calientes.
+    """
+    return (ahora or datetime.now()) - timedelta(days=ARCHIVO_DIAS)
+
+
+def incluye_archivo(desde: Optional[datetime]) -> bool:
+    """
+    Indica si una lectura que empieza en `desde` puede necesitar datos archivados.
+    """
+    return ARCHIVO_ACTIVO and (desde is None or desde < corte_archivo())
+
+
+def comprimir_items(items: List[dict]) -> Binary:
+    return Binary(zlib.compress(bson.encode({"items": items})))
+
+
+def descomprimir_items(datos: bytes) -> List[dict]:
+    return bson.decode(zlib.decompress(datos))["items"]
+
+
+def _combinar(*listas: list) -> list:
+    """
+    Une listas de transacciones sin repetir `_id`, en orden (fecha, _id) descendente.
+    Una transacción puede estar a la vez en caliente y en el archivo si el
+    archivador se interrumpió antes de borrarla.
+    """
+    unicos = {}
+    for documentos in listas:
+        for documento in documentos:
+            unicos.setdefault(documento["_id"], documento)
+    return sorted(unicos.values(), key=lambda documento: (documento["fecha"], documento["_id"]), reverse=True)
+
+
+def item_compacto(tipo: str, documento: dict) -> dict:
+    campo, corto = REFERENCIAS[tipo]
+    return {
+        "_id": documento["_id"],
+        "m": documento["monto"],
+        "f": documento["fecha"],
+        "d": documento.get("descripcion", ""),
+        corto: documento[campo],
+    }
+
+
+def documento_plano(tipo: str, usuario_id: str, item: dict) -> dict:
+    campo, corto = REFERENCIAS[tipo]
+    return {
+        "_id": item["_id"],
+        "usuario_id": usuario_id,
+        "monto": item["m"],
+        "fecha": item["f"],
+        "descripcion": item["d"],
+        campo: item[corto],
+    }
+
+
+def _filtro_bucket(usuario_id: str, mes: datetime, cantidad: int) -> dict:
+    # Bucket del mes que todavía tenga lugar para `cantidad` transacciones más
+    return {"usuario_id": usuario_id, "mes": mes, "cantidad": {"$lte": BUCKET_MAX - cantidad}}
+
+
+def _push_bucket(items: List[dict]) -> dict:
+    return {
+        "$push": {"items": {"$each": items}},
+        "$inc": {"cantidad": len(items), "total": sum(item["m"] for item in items)},
+    }
+
+
+async def insertar(tipo: str, documento: dict, layout: Optional[str] = None):
+    """
+    Guarda una transacción con la forma plana (`usuario_id`, `monto`, `fecha`,
+    `descripcion` y `categoria_id` o `meta_id`). Devuelve su `_id`.
+    """
+    if _layout(layout) == LAYOUT_PLANO:
+        result = await write_batcher.insertar(tipo, documento)
+        return result.inserted_id
+
+    documento.setdefault("_id", ObjectId())
+    # Si no hay bucket con lugar para este mes, el upsert abre uno nuevo
+    await mongo_connection.database[COLECCIONES_BUCKETS[tipo]].update_one(
+        _filtro_bucket(documento["usuario_id"], _mes(documento["fecha"]), 1),
+        _push_bucket([item_compacto(tipo, documento)]),
+        upsert=True
+    )
+    return documento["_id"]
+
+
+async def insertar_en_lote(tipo: str, documentos: List[dict], layout: Optional[str] = None) -> Dict[int, str]:
+    """
+    Guarda varias transacciones (de uno o más usuarios) con escrituras en bloque.
+    Devuelve los índices de `documentos` que no se pudieron guardar con su error.
+    """
+    fallidos = {}
+    if not documentos:
+        return fallidos
+
+    if _layout(layout) == LAYOUT_PLANO:
+        try:
+            await mongo_connection.database[tipo].insert_many(documentos, ordered=False)
+        except BulkWriteError as error:
+            for fallo in error.details.get("writeErrors", []):
+                fallidos[fallo["index"]] = fallo.get("errmsg", "Error al guardar")
+        return fallidos
+
+    por_bucket: Dict[Tuple[str, datetime], List[int]] = {}
+    for indice, documento in enumerate(documentos):
+        documento.setdefault("_id", ObjectId())
+        por_bucket.setdefault((documento["usuario_id"], _mes(documento["fecha"])), []).append(indice)
+
+    operaciones, indices_operacion = [], []
+    for (usuario_id, mes), indices in por_bucket.items():
+        for inicio in range(0, len(indices), BUCKET_MAX):
+            tramo = indices[inicio:inicio + BUCKET_MAX]
+            operaciones.append(UpdateOne(
+                _filtro_bucket(usuario_id, mes, len(tramo)),
+                _push_bucket([item_compacto(tipo, documentos[indice]) for indice in tramo]),
+                upsert=True
+            ))
+            indices_operacion.append(tramo)
+
+    try:
+        await mongo_connection.database[COLECCIONES_BUCKETS[tipo]].bulk_write(operaciones, ordered=False)
+    except BulkWriteError as error:
+        for fallo in error.details.get("writeErrors", []):
+            for indice in indices_operacion[fallo["index"]]:
+                fallidos[indice] = fallo.get("errmsg", "Error al guardar")
+    return fallidos
+
+
+def _en_rango(documento: dict, desde: Optional[datetime], hasta: Optional[datetime], despues_de) -> bool:
+    fecha = documento["fecha"]
+    if desde is not None and fecha < desde:
+        return False
+    if hasta is not None and fecha >= hasta:
+        return False
+    if despues_de is not None and (fecha, documento["_id"]) >= despues_de:
+        return False
+    return True
+
+
+async def _pagina_buckets(
+    coleccion: str,
+    tipo: str,
+    usuario_id: str,
+    limite: int,
+    cursor: Optional[str],
+    desde: Optional[datetime],
+    hasta: Optional[datetime],
+    referencia: Optional[str],
+    archivado: bool = False
+) -> list:
+    """
+    Recorre los buckets (o bloques de archivo, con `archivado`) del usuario del mes
+    más reciente al más antiguo y junta las transacciones que cumplen el filtro. Se
+    detiene al terminar un mes en el que ya reunió `limite` documentos: los meses
+    anteriores son todos más antiguos.
+    """
+    campo, corto = REFERENCIAS[tipo]
+    despues_de = decodificar_cursor(cursor) if cursor else None
+
+    filtro_meses = {}
+    if desde is not None:
+        filtro_meses["$gte"] = _mes(desde)
+    topes = [fecha for fecha in (hasta, despues_de[0] if despues_de else None) if fecha is not None]
+    if topes:
+        filtro_meses["$lte"] = _mes(min(topes))
+
+    filtro = {"usuario_id": usuario_id}
+    if filtro_meses:
+        filtro["mes"] = filtro_meses
+    if archivado:
+        proyeccion = {"mes": 1, "datos": 1}
+        if referencia is not None:
+            filtro["referencias"] = referencia
+    else:
+        proyeccion = {"mes": 1, "items": 1}
+        if referencia is not None:
+            # Solo viajan las transacciones de la categoría o meta pedida
+            proyeccion["items"] = {"$filter": {"input": "$items", "cond": {"$eq": [f"$$this.{corto}", referencia]}}}
+
+    buckets = mongo_connection.database[coleccion].aggregate([
+        {"$match": filtro},
+        {"$sort": {"mes": -1}},
+        {"$project": proyeccion},
+    ])
+
+    documentos = []
+    mes_actual = None
+    async for bucket in buckets:
+        if bucket["mes"] != mes_actual:
+            if len(documentos) > limite:
+                break
+            mes_actual = bucket["mes"]
+        items = descomprimir_items(bucket["datos"]) if archivado else bucket["items"]
+        for item in items:
+            if referencia is not None and item[corto] != referencia:
+                continue
+            documento = documento_plano(tipo, usuario_id, item)
+            if _en_rango(documento, desde, hasta, despues_de):
+                documentos.append(documento)
+
+    documentos.sort(key=lambda documento: (documento["fecha"], documento["_id"]), reverse=True)
+    return documentos[:limite + 1]
+
+
+async def listar_pagina(
+    tipo: str,
+    usuario_id: str,
+    limite: Optional[int] = None,
+    cursor: Optional[str] = None,
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+    referencia: Optional[str] = None,
+    layout: Optional[str] = None
+) -> Tuple[list, Optional[str]]:
+    """
+    Una página de transacciones del usuario ordenada por (fecha, _id) descendente,
+    entre `desde` (inclusive) y `hasta` (exclusive), opcionalmente de una sola
+    categoría o meta (`referencia`). Devuelve (documentos, next_cursor).
+    """
+    limite = limite or TAMANO_PAGINA_DEFECTO
+
+    if _layout(layout) == LAYOUT_BUCKETS:
+        documentos = await _pagina_buckets(
+            COLECCIONES_BUCKETS[tipo], tipo, usuario_id, limite, cursor, desde, hasta, referencia
+        )
+    else:
+        documentos = await _pagina_plana(tipo, usuario_id, limite, cursor, desde, hasta, referencia)
+
+    # El archivo solo guarda transacciones anteriores al corte: hace falta si la
+    # página caliente quedó incompleta o si su transacción más antigua ya es anterior
+    if incluye_archivo(desde) and (len(documentos) <= limite or documentos[-1]["fecha"] < corte_archivo()):
+        archivados = await _pagina_buckets(
+            COLECCIONES_ARCHIVO[tipo], tipo, usuario_id, limite, cursor, desde, hasta, referencia, archivado=True
+        )
+        documentos = _combinar(documentos, archivados)[:limite + 1]
+
+    return armar_pagina(documentos, limite)
+
+
+async def _pagina_plana(
+    tipo: str,
+    usuario_id: str,
+    limite: int,
+    cursor: Optional[str],
+    desde: Optional[datetime],
+    hasta: Optional[datetime],
+    referencia: Optional[str]
+) -> list:
+    filtro = {"usuario_id": usuario_id}
+    rango = {}
+    if desde is not None:
+        rango["$gte"] = desde
+    if hasta is not None:
+        rango["$lt"] = hasta
+    if rango:
+        filtro["fecha"] = rango
+    if referencia is not None:
+        filtro[REFERENCIAS[tipo][0]] = referencia
+    filtro = filtro_pagina(filtro, cursor)
+
+    documentos_cursor = mongo_connection.database[tipo].find(filtro).sort([("fecha", -1), ("_id", -1)]).limit(limite + 1)
+    return await documentos_cursor.to_list(length=limite + 1)
+
+
+async def listar_abonos(meta_id: str, limite: Optional[int] = None, layout: Optional[str] = None) -> list:
+    """
+    Ingresos abonados a una meta, del más reciente al más antiguo.
+    """
+    if _layout(layout) == LAYOUT_PLANO:
+        # El índice `meta_fecha` devuelve los abonos ya ordenados
+        ingresos_cursor = mongo_connection.database[INGRESOS].find({"meta_id": meta_id}).sort("fecha", DESCENDING)
+        if limite:
+            ingresos_cursor = ingresos_cursor.limit(limite)
+        ingresos = await ingresos_cursor.to_list(length=None)
+    else:
+        pipeline = [
+            {"$match": {"items.meta": meta_id}},
+            {"$sort": {"mes": -1}},
+            {"$unwind": "$items"},
+            {"$match": {"items.meta": meta_id}},
+            {"$sort": {"items.f": -1, "items._id": -1}},
+        ]
+        if limite:
+            pipeline.append({"$limit": limite})
+        buckets = mongo_connection.database[COLECCIONES_BUCKETS[INGRESOS]].aggregate(pipeline)
+        ingresos = [documento_plano(INGRESOS, bucket["usuario_id"], bucket["items"]) async for bucket in buckets]
+
+    if not ARCHIVO_ACTIVO or (limite and len(ingresos) >= limite):
+        return ingresos
+
+    # Los abonos que faltan para completar el límite están en el archivo
+    bloques = mongo_connection.database[COLECCIONES_ARCHIVO[INGRESOS]].find(
+        {"referencias": meta_id}, {"usuario_id": 1, "datos": 1}
+    ).sort("mes", -1)
+    archivados = []
+    async for bloque in bloques:
+        archivados.extend(
+            documento_plano(INGRESOS, bloque["usuario_id"], item)
+            for item in descomprimir_items(bloque["datos"])
+            if item["meta"] == meta_id
+        )
+        if limite and len(archivados) >= limite:
+            break
+    return _combinar(ingresos, archivados)[:limite or None]
+
+
+def origen(
+    tipo: str,
+    usuario_id: Optional[str] = None,
+    layout: Optional[str] = None,
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None
+) -> Tuple[str, list]:
+    """
+    Colección y etapas iniciales de un pipeline que produce las transacciones con
+    la forma plana, para agregaciones que deben funcionar con cualquier layout.
+    Con `desde`/`hasta` se limita a las fechas en [desde, hasta).
+    """
+    match = {"usuario_id": usuario_id} if usuario_id else {}
+    rango = {}
+    if desde is not None:
+        rango["$gte"] = desde
+    if hasta is not None:
+        rango["$lt"] = hasta
+
+    if _layout(layout) == LAYOUT_PLANO:
+        if rango:
+            match["fecha"] = rango
+        return tipo, [{"$match": match}]
+
+    if rango:
+        # Primero se descartan los buckets de otros meses y luego las transacciones sueltas
+        meses = {}
+        if desde is not None:
+            meses["$gte"] = _mes(desde)
+        if hasta is not None:
+            meses["$lte"] = _mes(hasta)
+        match["mes"] = meses
+
+    campo, corto = REFERENCIAS[tipo]
+    etapas = [
+        {"$match": match},
+        {"$unwind": "$items"},
+        {
+            "$replaceWith": {
+                "_id": "$items._id",
+                "usuario_id": "$usuario_id",
+                "monto": "$items.m",
+                "fecha": "$items.f",
+                "descripcion": "$items.d",
+                campo: f"$items.{corto}",
+            }
+        },
+    ]
+    if rango:
+        etapas.append({"$match": {"fecha": rango}})
+    return COLECCIONES_BUCKETS[tipo], etapas
+
+
+def origen_archivado(tipo: str, usuario_id: Optional[str] = None) -> Tuple[str, list]:
+    """
+    Colección y etapas que producen los totales diarios guardados en el archivo
+    (`usuario_id`, `fecha` (el día), la categoría o meta, `monto` y `conteo`), para
+    que los acumulados se puedan reconstruir sin descomprimir las transacciones.
+    """
+    campo, _ = REFERENCIAS[tipo]
+    return COLECCIONES_ARCHIVO[tipo], [
+        {"$match": {"usuario_id": usuario_id} if usuario_id else {}},
+        {"$unwind": "$por_dia"},
+        {
+            "$replaceWith": {
+                "usuario_id": "$usuario_id",
+                "fecha": "$por_dia.dia",
+                campo: "$por_dia.r",
+                "monto": "$por_dia.total",
+                "conteo": "$por_dia.conteo",
+            }
+        },
+    ]
+
+
+def pipeline_totales_por_referencia(
+    tipo: str,
+    usuario_id: str,
+    desde: datetime,
+    layout: Optional[str] = None
+) -> Tuple[str, list]:
+    """
+    Colección y pipeline de `totales_por_referencia`.
+    """
+    campo, corto = REFERENCIAS[tipo]
+    if _layout(layout) == LAYOUT_PLANO:
+        coleccion = tipo
+        etapas = [{"$match": {"usuario_id": usuario_id, "fecha": {"$gte": desde}}}]
+    else:
+        coleccion = COLECCIONES_BUCKETS[tipo]
+        etapas = [
+            {"$match": {"usuario_id": usuario_id, "mes": {"$gte": _mes(desde)}}},
+            {"$unwind": "$items"},
+            {"$match": {"items.f": {"$gte": desde}}},
+            {"$project": {"fecha": "$items.f", "monto": "$items.m", campo: f"$items.{corto}"}},
+        ]
+
+    if incluye_archivo(desde):
+        coleccion_archivo, etapas_archivo = origen_archivado(tipo, usuario_id)
+        etapas.append({
+            "$unionWith": {
+                "coll": coleccion_archivo,
+                "pipeline": [{"$match": {"usuario_id": usuario_id, "mes": {"$gte": _mes(desde)}}}]
+                + etapas_archivo
+                + [{"$match": {"fecha": {"$gte": desde}}}],
+            }
+        })
+
+    etapas.append({
+        "$group": {
+            "_id": f"${campo}",
+            "total": {"$sum": "$monto"},
+            "conteo": {"$sum": {"$ifNull": ["$conteo", 1]}},
+            "ultima": {"$max": "$fecha"},
+        }
+    })
+    return coleccion, etapas
+
+
+async def totales_por_referencia(tipo: str, usuario_id: str, desde: datetime, layout: Optional[str] = None) -> dict:
+    """
+    Total, cantidad y fecha más reciente de las transacciones del usuario desde
+    `desde` (inicio de un día), por categoría o meta, en una sola agregación que
+    recorre solo ese rango de fechas. Devuelve {referencia: documento}.
+    """
+    coleccion, etapas = pipeline_totales_por_referencia(tipo, usuario_id, desde, layout)
+    resultados = await mongo_connection.database[coleccion].aggregate(etapas).to_list(length=None)
+    return {resultado["_id"]: resultado for resultado in resultados}
+
+
+async def eliminar(tipo: str, usuario_id: str, ids: List[ObjectId], layout: Optional[str] = None):
+    """
+    Borra transacciones de un usuario por `_id`. En el layout por buckets se
+    recalculan los totales de los buckets afectados y se borran los que quedan vacíos.
+    """
+    db = mongo_connection.database
+    for inicio in range(0, len(ids), 10_000):
+        tramo = ids[inicio:inicio + 10_000]
+        if _layout(layout) == LAYOUT_PLANO:
+            await db[tipo].delete_many({"usuario_id": usuario_id, "_id": {"$in": tramo}})
+            continue
+
+        buckets = db[COLECCIONES_BUCKETS[tipo]]
+        await buckets.update_many(
+            {"usuario_id": usuario_id, "items._id": {"$in": tramo}},
+            [
+                {"$set": {"items": {"$filter": {"input": "$items", "cond": {"$not": [{"$in": ["$$this._id", tramo]}]}}}}},
+                {"$set": {"cantidad": {"$size": "$items"}, "total": {"$sum": "$items.m"}}},
+            ]
+        )
+        await buckets.delete_many({"usuario_id": usuario_id, "cantidad": 0})
+
+
+async def _ids_en_buckets(tipo: str, usuario_id: str, documentos: List[dict]) -> set:
+    """
+    `_id`s de `documentos` que ya están en los buckets del usuario. Solo se miran
+    los meses del lote, con el índice `usuario_mes`.
+    """
+    ids = [documento["_id"] for documento in documentos]
+    meses = list({_mes(documento["fecha"]) for documento in documentos})
+    existentes = mongo_connection.database[COLECCIONES_BUCKETS[tipo]].aggregate([
+        {"$match": {"usuario_id": usuario_id, "mes": {"$in": meses}, "items._id": {"$in": ids}}},
+        {"$unwind": "$items"},
+        {"$match": {"items._id": {"$in": ids}}},
+        {"$project": {"_id": "$items._id"}},
+    ])
+    return {documento["_id"] async for documento in existentes}
+
+
+async def _copiar_lote(tipo: str, usuario_id: str, documentos: List[dict], destino: str) -> Tuple[int, list]:
+    """
+    Copia un lote al layout `destino` sin duplicar: en el plano se reemplaza por
+    `_id` y en buckets se omiten los `_id` que ya estén. Devuelve cuántas se
+    escribieron y los `_id` que quedaron en el destino.
+    """
+    if not documentos:
+        return 0, []
+
+    if destino == LAYOUT_PLANO:
+        fallidos = set()
+        try:
+            await mongo_connection.database[tipo].bulk_write(
+                [ReplaceOne({"_id": documento["_id"]}, documento, upsert=True) for documento in documentos],
+                ordered=False
+            )
+        except BulkWriteError as error:
+            fallidos = {fallo["index"] for fallo in error.details.get("writeErrors", [])}
+        escritas = [documento["_id"] for indice, documento in enumerate(documentos) if indice not in fallidos]
+        return len(escritas), escritas
+
+    existentes = await _ids_en_buckets(tipo, usuario_id, documentos)
+    nuevos = [documento for documento in documentos if documento["_id"] not in existentes]
+    fallidos = await insertar_en_lote(tipo, nuevos, layout=destino)
+    escritas = [documento["_id"] for indice, documento in enumerate(nuevos) if indice not in fallidos]
+    return len(escritas), list(existentes) + escritas
+
+
+async def migrar(destino: str, usuario_id: Optional[str] = None, borrar_origen: bool = False) -> Dict[str, int]:
+    """
+    Copia las transacciones al layout `destino`, usuario por usuario y conservando
+    los `_id`. La copia no duplica ni borra nada del destino, así que la migración
+    se puede repetir aunque ya se haya escrito en el layout nuevo. Con
+    `borrar_origen` se borran del origen solo las que quedaron en el destino.
+    Devuelve cuántas transacciones se escribieron de cada tipo.
+    """
+    anterior = LAYOUT_PLANO if destino == LAYOUT_BUCKETS else LAYOUT_BUCKETS
+    db = mongo_connection.database
+    copiadas = {}
+
+    for tipo in (GASTOS, INGRESOS):
+        coleccion_origen, etapas = origen(tipo, layout=anterior)
+        usuarios = [usuario_id] if usuario_id else await db[coleccion_origen].distinct("usuario_id")
+
+        copiadas[tipo] = 0
+        for usuario in usuarios:
+            _, etapas = origen(tipo, usuario, layout=anterior)
+            en_destino = []
+            lote = []
+            async for documento in db[coleccion_origen].aggregate(etapas, allowDiskUse=True):
+                lote.append(documento)
+                if len(lote) >= BUCKET_MAX:
+                    escritas, ids = await _copiar_lote(tipo, usuario, lote, destino)
+                    copiadas[tipo] += escritas
+                    en_destino.extend(ids)
+                    lote = []
+            escritas, ids = await _copiar_lote(tipo, usuario, lote, destino)
+            copiadas[tipo] += escritas
+            en_destino.extend(ids)
+
+            # Se borra al terminar de leer, para no modificar el origen mientras se recorre
+            if borrar_origen and en_destino:
+                await eliminar(tipo, usuario, en_destino, layout=anterior)
+
+    return copiadas
+
+
+async def _main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Migración de gastos e ingresos entre layouts")
+    parser.add_argument("accion", choices=["migrar"])
+    parser.add_argument("destino", choices=[LAYOUT_BUCKETS, LAYOUT_PLANO])
+    parser.add_argument("--usuario", default=None, help="Limita la migración a un usuario")
+    parser.add_argument("--borrar-origen", action="store_true", help="Borra los datos migrados del layout anterior")
+    args = parser.parse_args(argv)
+
+    await mongo_connection.connect()
+    try:
+        db = mongo_connection.database
+        await sincronizar_indices(db, {nombre: INDICES[nombre] for nombre in (GASTOS, INGRESOS, *COLECCIONES_BUCKETS.values())})
+        copiadas = await migrar(args.destino, args.usuario, args.borrar_origen)
+        print(f"{copiadas[GASTOS]} gastos y {copiadas[INGRESOS]} ingresos migrados al layout {args.destino}")
+        return 0
+    finally:
+        await mongo_connection.close()
+
+
+if __name__ == "__main__":
+    raise SystemExit(asyncio.run(_main()))
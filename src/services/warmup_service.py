@@ -0,0 +1,144 @@
+"""
+Calentamiento de la aplicación al arrancar.
+
+`calentar` se ejecuta en segundo plano desde el lifespan: abre conexiones en los pools
+de MongoDB y PostgreSQL, sincroniza los índices, ejercita los validadores de Pydantic
+y carga el catálogo geográfico. Mientras no termina, `/health/ready` responde 503; si
+una etapa falla se reintenta con espera creciente.
+"""
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Dict, Optional
+from bson import ObjectId
+from sqlalchemy import text
+from dotenv import load_dotenv
+from src.controllers.geo_controller import recargar_catalogo
+from src.db.mongodb.config import mongo_connection
+from src.db.mongodb.indexes import sincronizar_indices
+from src.db.postgresql.config import PG_POOL_SIZE, async_engine
+from src.schemas.financial_schemas import (
+    gastos_adapter, ingresos_adapter, metas_ahorro_adapter, usuarios_financieros_adapter
+)
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+WARMUP_CONEXIONES = int(os.getenv("WARMUP_CONEXIONES", "4"))
+WARMUP_ESPERA_MAXIMA = float(os.getenv("WARMUP_ESPERA_MAXIMA_SEGUNDOS", "30"))
+
+
+class EstadoArranque:
+    def __init__(self):
+        self.reiniciar()
+
+    def reiniciar(self):
+        """
+        Vuelve al estado inicial, para cuando el mismo proceso arranca la
+        aplicación más de una vez (p. ej. el benchmark, una vez por escala).
+        """
+        self.listo = False
+        self.intentos = 0
+        self.ultimo_error: Optional[str] = None
+        self.etapas: Dict[str, float] = {}
+        self.segundos_hasta_listo: Optional[float] = None
+
+    def resumen(self) -> dict:
+        return {
+            "listo": self.listo,
+            "intentos": self.intentos,
+            "ultimo_error": self.ultimo_error,
+            "etapas_segundos": self.etapas,
+            "segundos_hasta_listo": self.segundos_hasta_listo,
+        }
+
+
+estado = EstadoArranque()
+
+
+async def _ping_mongo():
+    await mongo_connection.database.command("ping")
+
+
+async def _calentar_mongo():
+    # Pings concurrentes para que el pool abra varias conexiones de una vez
+    await asyncio.gather(*(_ping_mongo() for _ in range(WARMUP_CONEXIONES)))
+
+
+async def _ping_postgres():
+    async with async_engine.connect() as conexion:
+        await conexion.execute(text("SELECT 1"))
+
+
+async def _calentar_postgres():
+    await asyncio.gather(*(_ping_postgres() for _ in range(min(WARMUP_CONEXIONES, PG_POOL_SIZE))))
+
+
+async def _calentar_validadores():
+    """
+    Valida y serializa un documento de ejemplo con cada adaptador, para que la
+    primera petición real no pague el costo de esas primeras llamadas.
+    """
+    ahora = datetime.now()
+    transaccion = {
+        "_id": ObjectId(),
+        "usuario_id": "warmup",
+        "monto": 1.0,
+        "fecha": ahora,
+        "descripcion": "warmup",
+    }
+    ejemplos = [
+        (metas_ahorro_adapter, {
+            "_id": ObjectId(), "usuario_id": "warmup", "nombre": "warmup", "monto_objetivo": 1.0,
+            "monto_actual": 0.0, "fecha_inicio": ahora, "fecha_objetivo": ahora,
+        }),
+        (gastos_adapter, {**transaccion, "categoria_id": str(ObjectId())}),
+        (ingresos_adapter, {**transaccion, "meta_id": str(ObjectId())}),
+        (usuarios_financieros_adapter, {
+            "_id": ObjectId(), "usuario_id": "warmup", "salario": 1.0, "divisa": "MXN",
+            "balance_objetivo": 1.0, "gasto_limite": 1.0,
+        }),
+    ]
+    for adapter, documento in ejemplos:
+        adapter.dump_json(adapter.validate_python([documento]), by_alias=True)
+
+
+ETAPAS = (
+    ("mongodb", _calentar_mongo),
+    ("indices", lambda: sincronizar_indices(mongo_connection.database)),
+    ("postgresql", _calentar_postgres),
+    ("validadores", _calentar_validadores),
+    ("catalogo_geo", recargar_catalogo),
+)
+
+
+async def calentar(inicio_proceso: Optional[float] = None):
+    """
+    Ejecuta las etapas de calentamiento hasta completarlas todas y marca la
+    aplicación como lista. Las etapas ya completadas no se repiten.
+    """
+    espera = 0.5
+    pendientes = list(ETAPAS)
+    while pendientes:
+        estado.intentos += 1
+        nombre, etapa = pendientes[0]
+        inicio = time.perf_counter()
+        try:
+            await etapa()
+        except Exception as error:
+            estado.ultimo_error = f"{nombre}: {error}"
+            logger.warning("Calentamiento: falló la etapa %s, reintentando en %.1fs", nombre, espera, exc_info=True)
+            await asyncio.sleep(espera)
+            espera = min(espera * 2, WARMUP_ESPERA_MAXIMA)
+            continue
+        estado.etapas[nombre] = time.perf_counter() - inicio
+        pendientes.pop(0)
+
+    estado.listo = True
+    estado.ultimo_error = None
+    if inicio_proceso is not None:
+        estado.segundos_hasta_listo = time.perf_counter() - inicio_proceso
+    logger.info("Aplicación lista: %s", estado.resumen())
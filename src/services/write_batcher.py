@@ -0,0 +1,225 @@
+"""
+Agrupación opcional de escrituras concurrentes en MongoDB.
+
+Con `WRITE_BATCHING=true`, los `insert_one`/`update_one` que los controladores hacen
+sobre `gastos`, `ingresos`, `categorias_gasto`, `metas_ahorro` y los acumulados
+(`gastos_diarios`, `resumenes_mensual`) se acumulan durante
+`WRITE_BATCH_VENTANA_MS` milisegundos (o hasta `WRITE_BATCH_MAX_OPS` operaciones) y se
+envían como un único `bulk_write` desordenado por colección. Cada petición sigue
+esperando el resultado confirmado de su propia operación y recibe su propio error.
+"""
+import asyncio
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+from bson import ObjectId
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError, WriteError
+from dotenv import load_dotenv
+from src.db.mongodb.config import mongo_connection
+from src.services.histogram_service import Histogram
+
+load_dotenv()
+
+def get_batching_activo() -> bool:
+    return os.getenv("WRITE_BATCHING", "false").lower() in ("1", "true", "yes")
+
+BATCHING_ACTIVO = get_batching_activo()
+VENTANA_SEGUNDOS = float(os.getenv("WRITE_BATCH_VENTANA_MS", "2")) / 1000
+MAX_OPERACIONES = int(os.getenv("WRITE_BATCH_MAX_OPS", "500"))
+
+BUCKETS_TAMANO = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+
+@dataclass
+class ResultadoEscritura:
+    """
+    Resultado de una operación agrupada, con los mismos atributos que usan los
+    controladores de `InsertOneResult` y `UpdateResult`.
+    """
+    inserted_id: Any = None
+    matched_count: int = 0
+
+
+@dataclass
+class _Pendiente:
+    operacion: Any
+    future: asyncio.Future
+    encolada: float
+    filtro: Optional[dict] = None
+    documento: Optional[dict] = None
+    upsert: bool = False
+
+
+def _coincide(documento: dict, filtro: dict) -> bool:
+    # Los filtros que pasan por aquí son de igualdad (p. ej. `_id` + `usuario_id`)
+    return all(documento.get(campo) == valor for campo, valor in filtro.items())
+
+
+class ColeccionBatcher:
+    """
+    Cola de escrituras pendientes de una colección.
+    """
+
+    def __init__(self, nombre: str, ventana: float = VENTANA_SEGUNDOS, max_operaciones: int = MAX_OPERACIONES):
+        self.nombre = nombre
+        self.ventana = ventana
+        self.max_operaciones = max_operaciones
+        self.tamano_lotes = Histogram(BUCKETS_TAMANO)
+        self.latencia = Histogram()
+        self._pendientes = []
+        self._temporizador: Optional[asyncio.TimerHandle] = None
+        self._tareas = set()
+
+    async def insertar(self, documento: dict) -> ResultadoEscritura:
+        # El _id se asigna aquí para poder devolverlo sin depender del driver
+        documento.setdefault("_id", ObjectId())
+        return await self._encolar(InsertOne(documento), documento=documento)
+
+    async def actualizar(self, filtro: dict, update: dict, upsert: bool = False) -> ResultadoEscritura:
+        return await self._encolar(UpdateOne(filtro, update, upsert=upsert), filtro, upsert=upsert)
+
+    async def _encolar(
+        self,
+        operacion,
+        filtro: Optional[dict] = None,
+        documento: Optional[dict] = None,
+        upsert: bool = False
+    ) -> ResultadoEscritura:
+        loop = asyncio.get_running_loop()
+        pendiente = _Pendiente(operacion, loop.create_future(), time.perf_counter(), filtro, documento, upsert)
+        self._pendientes.append(pendiente)
+
+        if len(self._pendientes) >= self.max_operaciones:
+            self._disparar()
+        elif self._temporizador is None:
+            self._temporizador = loop.call_later(self.ventana, self._disparar)
+
+        return await pendiente.future
+
+    def _disparar(self):
+        if self._temporizador is not None:
+            self._temporizador.cancel()
+            self._temporizador = None
+        if not self._pendientes:
+            return
+
+        lote, self._pendientes = self._pendientes, []
+        tarea = asyncio.ensure_future(self._enviar(lote))
+        self._tareas.add(tarea)
+        tarea.add_done_callback(self._tareas.discard)
+
+    async def _enviar(self, lote: list):
+        coleccion = mongo_connection.database[self.nombre]
+        self.tamano_lotes.observe(len(lote))
+
+        errores = {}
+        try:
+            resultado = await coleccion.bulk_write([pendiente.operacion for pendiente in lote], ordered=False)
+            encontrados = resultado.matched_count + resultado.upserted_count
+        except BulkWriteError as error:
+            for detalle in error.details.get("writeErrors", []):
+                errores[detalle["index"]] = detalle
+            encontrados = error.details.get("nMatched", 0) + error.details.get("nUpserted", 0)
+        except Exception as error:
+            for pendiente in lote:
+                if not pendiente.future.done():
+                    pendiente.future.set_exception(error)
+            return
+
+        sin_coincidencia = await self._updates_sin_coincidencia(coleccion, lote, errores, encontrados)
+
+        ahora = time.perf_counter()
+        for indice, pendiente in enumerate(lote):
+            self.latencia.observe(ahora - pendiente.encolada)
+            if pendiente.future.done():
+                continue
+            if indice in errores:
+                detalle = errores[indice]
+                pendiente.future.set_exception(WriteError(detalle.get("errmsg"), detalle.get("code"), detalle))
+            elif pendiente.filtro is None:
+                pendiente.future.set_result(ResultadoEscritura(inserted_id=pendiente.documento["_id"]))
+            else:
+                pendiente.future.set_result(ResultadoEscritura(matched_count=0 if indice in sin_coincidencia else 1))
+
+    async def _updates_sin_coincidencia(self, coleccion, lote: list, errores: dict, encontrados: int) -> set:
+        """
+        `bulk_write` solo informa el total de documentos encontrados. Si no
+        coincide con la cantidad de updates, se consulta cuáles no tenían documento.
+        Cada upsert cuenta siempre como encontrado o insertado, así que no se consulta.
+        """
+        updates = {}
+        upserts = 0
+        for indice, pendiente in enumerate(lote):
+            if pendiente.filtro is None or indice in errores:
+                continue
+            if pendiente.upsert:
+                upserts += 1
+            else:
+                updates[indice] = pendiente.filtro
+        if encontrados - upserts >= len(updates):
+            return set()
+
+        encontrados = await coleccion.find({"$or": list(updates.values())}).to_list(length=None)
+        return {
+            indice for indice, filtro in updates.items()
+            if not any(_coincide(documento, filtro) for documento in encontrados)
+        }
+
+    async def cerrar(self):
+        self._disparar()
+        if self._tareas:
+            await asyncio.gather(*self._tareas, return_exceptions=True)
+
+    def estadisticas(self) -> dict:
+        return {
+            "pendientes": len(self._pendientes),
+            "tamano_lote": self.tamano_lotes.snapshot(),
+            "latencia_segundos": self.latencia.snapshot(),
+        }
+
+
+_batchers: Dict[str, ColeccionBatcher] = {}
+
+
+def _batcher(nombre_coleccion: str) -> ColeccionBatcher:
+    batcher = _batchers.get(nombre_coleccion)
+    if batcher is None:
+        batcher = _batchers[nombre_coleccion] = ColeccionBatcher(nombre_coleccion)
+    return batcher
+
+
+async def insertar(nombre_coleccion: str, documento: dict):
+    """
+    `insert_one` que pasa por el agrupador cuando está activo.
+    """
+    if not BATCHING_ACTIVO:
+        return await mongo_connection.database[nombre_coleccion].insert_one(documento)
+    return await _batcher(nombre_coleccion).insertar(documento)
+
+
+async def actualizar(nombre_coleccion: str, filtro: dict, update: dict, upsert: bool = False):
+    """
+    `update_one` que pasa por el agrupador cuando está activo.
+    """
+    if not BATCHING_ACTIVO:
+        return await mongo_connection.database[nombre_coleccion].update_one(filtro, update, upsert=upsert)
+    return await _batcher(nombre_coleccion).actualizar(filtro, update, upsert)
+
+
+async def cerrar():
+    """
+    Envía las escrituras que siguen pendientes; se llama al apagar la aplicación.
+    """
+    for batcher in list(_batchers.values()):
+        await batcher.cerrar()
+
+
+def estadisticas() -> dict:
+    return {
+        "activo": BATCHING_ACTIVO,
+        "ventana_ms": VENTANA_SEGUNDOS * 1000,
+        "max_operaciones": MAX_OPERACIONES,
+        "colecciones": {nombre: batcher.estadisticas() for nombre, batcher in _batchers.items()},
+    }